@@ -0,0 +1,169 @@
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable
+
+# Lower value is served first.
+LANES = {"interactive": 0, "background": 1}
+
+
+class Overloaded(Exception):
+    """Raised when the admission queue for a model is full."""
+
+
+class AdmissionController:
+    """Admission control for outbound model calls.
+
+    - At most `max_concurrency` calls run at once; the rest wait in a queue
+      ordered by lane (interactive before background), then arrival.
+    - Admitted calls also draw from a token bucket refilled at
+      `rate_per_second` (0 disables rate limiting) holding up to `burst`
+      tokens, which keeps bursts under the provider's rate limit.
+    - `run` coalesces identical in-flight calls: callers using the same key
+      share one upstream call and its result.
+    - Once `max_queue` callers are waiting, new ones fail fast with
+      `Overloaded` instead of piling up.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        rate_per_second: float = 0,
+        burst: int = 1,
+        max_queue: int = 100,
+    ):
+        self.max_concurrency = max_concurrency
+        self.rate_per_second = rate_per_second
+        self.burst = max(burst, 1)
+        self.max_queue = max_queue
+        self.active = 0
+        self.queued = {lane: 0 for lane in LANES}
+        self.admitted = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.wait_seconds = 0.0
+        self._waiters: list = []
+        self._seq = itertools.count()
+        self._tokens = float(self.burst)
+        self._stamp = time.monotonic()
+        self._in_flight: dict[str, list] = {}
+
+    @classmethod
+    def from_env(cls) -> "AdmissionController":
+        """Builds a controller from the DOABLE_MODEL_* environment variables."""
+        return cls(
+            max_concurrency=int(os.getenv("DOABLE_MODEL_CONCURRENCY", "8")),
+            rate_per_second=float(os.getenv("DOABLE_MODEL_RPS", "0")),
+            burst=int(os.getenv("DOABLE_MODEL_BURST", "1")),
+            max_queue=int(os.getenv("DOABLE_MODEL_QUEUE", "100")),
+        )
+
+    async def _acquire(self, lane: str):
+        if self.active < self.max_concurrency and not any(self.queued.values()):
+            self.active += 1
+            return
+        if sum(self.queued.values()) >= self.max_queue:
+            self.rejected += 1
+            raise Overloaded(f"{sum(self.queued.values())} model calls already queued")
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (LANES[lane], next(self._seq), waiter))
+        self.queued[lane] += 1
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we were cancelled.
+                self._release()
+            raise
+        finally:
+            self.queued[lane] -= 1
+
+    def _release(self):
+        while self._waiters:
+            _, _, waiter = heapq.heappop(self._waiters)
+            if not waiter.done():
+                # Hand the slot straight to the next waiter.
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    async def _take_token(self):
+        if not self.rate_per_second:
+            return
+        while True:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate_per_second)
+            self._stamp = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate_per_second)
+
+    @asynccontextmanager
+    async def slot(self, lane: str = "interactive"):
+        """Holds one concurrency slot for the duration of the block."""
+        started = time.monotonic()
+        await self._acquire(lane)
+        try:
+            await self._take_token()
+            self.admitted += 1
+            self.wait_seconds += time.monotonic() - started
+            yield
+        finally:
+            self._release()
+
+    async def run(self, key: str, call: Callable[[], Awaitable[Any]], lane: str = "interactive") -> Any:
+        """Runs `call` in a slot, sharing the result with concurrent callers of the same key.
+
+        The upstream call is cancelled only when every caller waiting on it
+        has been cancelled.
+        """
+        entry = self._in_flight.get(key)
+        if entry is None:
+
+            async def admitted_call():
+                async with self.slot(lane):
+                    return await call()
+
+            task = asyncio.ensure_future(admitted_call())
+            entry = self._in_flight[key] = [task, 0]
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            self.coalesced += 1
+        task = entry[0]
+        entry[1] += 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            entry[1] -= 1
+            if entry[1] == 0:
+                task.cancel()
+            raise
+
+    def stats(self) -> dict:
+        return {
+            "active": self.active,
+            "queued": dict(self.queued),
+            "admitted": self.admitted,
+            "coalesced": self.coalesced,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(1000 * self.wait_seconds / self.admitted, 2) if self.admitted else 0.0,
+        }
+
+
+_controllers: dict[str, AdmissionController] = {}
+
+
+def for_model(model_id: str) -> AdmissionController:
+    """Returns the shared controller for a model, creating it on first use."""
+    controller = _controllers.get(model_id)
+    if controller is None:
+        controller = _controllers[model_id] = AdmissionController.from_env()
+    return controller
+
+
+def all_stats() -> dict:
+    return {model_id: controller.stats() for model_id, controller in _controllers.items()}
@@ -0,0 +1,321 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Iterator, Optional
+from uuid import uuid4
+
+from agno.models.base import Model
+from agno.models.response import ModelResponse
+
+# Load and latency harness for /chat, /chat/stream and the MCP tools.
+# Everything runs in-process against a stub model, so results measure this
+# server (admission, caches, tools, session DB) rather than the network.
+#
+#   python benchmark.py --sessions 50 --requests 4 --latency-ms 400
+
+
+@dataclass
+class StubGemini(Model):
+    """Offline stand-in for Gemini with a configurable latency profile.
+
+    Each reply waits `first_token_ms`, then emits `reply_tokens` words at
+    `tokens_per_second`. With probability `tool_call_rate` the first turn
+    requests a `get_calendar_events` call instead of answering, so tool
+    execution and the follow-up model turn are exercised too.
+    """
+
+    id: str = "stub-gemini"
+    name: str = "StubGemini"
+    provider: str = "Stub"
+    first_token_ms: float = 300.0
+    tokens_per_second: float = 50.0
+    reply_tokens: int = 40
+    tool_call_rate: float = 0.0
+
+    def _wants_tool(self, messages) -> bool:
+        return (
+            bool(messages)
+            and messages[-1].role != "tool"
+            and random.random() < self.tool_call_rate
+        )
+
+    def _tool_call(self) -> ModelResponse:
+        return ModelResponse(
+            role="assistant",
+            tool_calls=[
+                {
+                    "id": f"call_{uuid4().hex[:8]}",
+                    "type": "function",
+                    "function": {"name": "get_calendar_events", "arguments": json.dumps({"limit": 5})},
+                }
+            ],
+        )
+
+    def _words(self) -> list[str]:
+        return [f"token{i} " for i in range(self.reply_tokens)]
+
+    def invoke(self, messages=None, *args, **kwargs) -> ModelResponse:
+        time.sleep(self.first_token_ms / 1000 + self.reply_tokens / self.tokens_per_second)
+        if self._wants_tool(messages):
+            return self._tool_call()
+        return ModelResponse(role="assistant", content="".join(self._words()))
+
+    async def ainvoke(self, messages=None, *args, **kwargs) -> ModelResponse:
+        await asyncio.sleep(self.first_token_ms / 1000 + self.reply_tokens / self.tokens_per_second)
+        if self._wants_tool(messages):
+            return self._tool_call()
+        return ModelResponse(role="assistant", content="".join(self._words()))
+
+    def invoke_stream(self, messages=None, *args, **kwargs) -> Iterator[ModelResponse]:
+        time.sleep(self.first_token_ms / 1000)
+        if self._wants_tool(messages):
+            yield self._tool_call()
+            return
+        for word in self._words():
+            yield ModelResponse(role="assistant", content=word)
+            time.sleep(1 / self.tokens_per_second)
+
+    async def ainvoke_stream(self, messages=None, *args, **kwargs) -> AsyncIterator[ModelResponse]:
+        await asyncio.sleep(self.first_token_ms / 1000)
+        if self._wants_tool(messages):
+            yield self._tool_call()
+            return
+        for word in self._words():
+            yield ModelResponse(role="assistant", content=word)
+            await asyncio.sleep(1 / self.tokens_per_second)
+
+    def _parse_provider_response(self, response: Any, **kwargs) -> ModelResponse:
+        return response
+
+    def _parse_provider_response_delta(self, response: Any) -> ModelResponse:
+        return response
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile; 0.0 for an empty list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[rank]
+
+
+@dataclass
+class Report:
+    name: str
+    latencies_ms: list[float]
+    wall_seconds: float
+    errors: int = 0
+    first_token_ms: Optional[list[float]] = None
+
+    def to_dict(self) -> dict:
+        data = {
+            "target": self.name,
+            "requests": len(self.latencies_ms) + self.errors,
+            "errors": self.errors,
+            "throughput_rps": round(len(self.latencies_ms) / self.wall_seconds, 2) if self.wall_seconds else 0.0,
+            "p50_ms": round(percentile(self.latencies_ms, 50), 1),
+            "p95_ms": round(percentile(self.latencies_ms, 95), 1),
+            "p99_ms": round(percentile(self.latencies_ms, 99), 1),
+        }
+        if self.first_token_ms is not None:
+            data["ttft_p50_ms"] = round(percentile(self.first_token_ms, 50), 1)
+            data["ttft_p95_ms"] = round(percentile(self.first_token_ms, 95), 1)
+        return data
+
+
+async def _drive(name: str, sessions: int, requests: int, one_request) -> Report:
+    """Runs `sessions` concurrent sessions issuing `requests` sequential requests each."""
+    latencies, first_tokens, errors = [], [], 0
+
+    async def session(session_index: int):
+        nonlocal errors
+        session_id = f"bench-{uuid4().hex[:8]}"
+        for request_index in range(requests):
+            started = time.perf_counter()
+            try:
+                first_token = await one_request(session_id, session_index, request_index)
+            except Exception:
+                errors += 1
+                continue
+            latencies.append((time.perf_counter() - started) * 1000)
+            if first_token is not None:
+                first_tokens.append((first_token - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(session(i) for i in range(sessions)))
+    return Report(name, latencies, time.perf_counter() - started, errors, first_tokens or None)
+
+
+def _prompt(session_index: int, request_index: int, repeat_rate: float) -> str:
+    if random.random() < repeat_rate:
+        return "What's on my calendar today?"
+    return f"Session {session_index} request {request_index}: help me plan my afternoon."
+
+
+async def bench_chat(client, sessions: int, requests: int, repeat_rate: float) -> Report:
+    async def one(session_id, session_index, request_index):
+        response = await client.post(
+            "/chat",
+            json={"message": _prompt(session_index, request_index, repeat_rate), "session_id": session_id},
+        )
+        response.raise_for_status()
+        return None
+
+    return await _drive("chat", sessions, requests, one)
+
+
+async def bench_stream(client, sessions: int, requests: int, repeat_rate: float) -> Report:
+    async def one(session_id, session_index, request_index):
+        first_token = None
+        body = {"message": _prompt(session_index, request_index, repeat_rate), "session_id": session_id}
+        async with client.stream("POST", "/chat/stream?format=ndjson", json=body) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if first_token is None and '"type": "content"' in line:
+                    first_token = time.perf_counter()
+        return first_token
+
+    return await _drive("chat/stream", sessions, requests, one)
+
+
+async def bench_mcp(sessions: int, requests: int) -> Report:
+    import mcp_server
+
+    base = time.time() + 86400
+
+    async def one(session_id, session_index, request_index):
+        start = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(base + (session_index * requests + request_index) * 3600))
+        await mcp_server.mcp.call_tool(
+            "schedule_task", {"title": f"bench {request_index}", "start_time": start, "user_id": session_id}
+        )
+        await mcp_server.mcp.call_tool("list_calendar", {"user_id": session_id})
+        await mcp_server.mcp.call_tool("reflect_on_task", {"task": "bench", "steps": ["a", "b"]})
+        return None
+
+    return await _drive("mcp tools", sessions, requests, one)
+
+
+class _DbTimer:
+    """Times session writes, which is where SQLite contention shows up."""
+
+    def __init__(self, db):
+        self.samples: list[float] = []
+        original = db.upsert_session
+
+        async def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await original(*args, **kwargs)
+            finally:
+                self.samples.append((time.perf_counter() - started) * 1000)
+
+        db.upsert_session = timed
+
+    def to_dict(self) -> dict:
+        return {
+            "target": "session writes",
+            "requests": len(self.samples),
+            "p50_ms": round(percentile(self.samples, 50), 1),
+            "p95_ms": round(percentile(self.samples, 95), 1),
+            "p99_ms": round(percentile(self.samples, 99), 1),
+            "max_ms": round(max(self.samples), 1) if self.samples else 0.0,
+        }
+
+
+async def _start_local_server():
+    """Serves the app with uvicorn on a free local port inside this event loop.
+
+    A real socket is needed: in-memory ASGI transports buffer the whole
+    response, which would hide time-to-first-token.
+    """
+    import uvicorn
+
+    import index
+
+    server = uvicorn.Server(uvicorn.Config(index.app, host="127.0.0.1", port=0, log_level="warning", lifespan="off"))
+    asyncio.get_running_loop().create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    return f"http://127.0.0.1:{port}", server
+
+
+async def run(args) -> list[dict]:
+    import httpx
+
+    import core
+
+    assistant = core.get_assistant()
+    assistant.model = core.prepare_model(StubGemini(
+        first_token_ms=args.latency_ms,
+        tokens_per_second=args.tokens_per_second,
+        reply_tokens=args.reply_tokens,
+        tool_call_rate=args.tool_call_rate,
+    ))
+    db_timer = _DbTimer(assistant.db)
+
+    reports = []
+    targets = {"chat", "stream", "mcp"} if args.target == "all" else {args.target}
+    if targets & {"chat", "stream"}:
+        server = None
+        base_url = args.url
+        if not base_url:
+            base_url, server = await _start_local_server()
+        try:
+            async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+                if "chat" in targets:
+                    reports.append(await bench_chat(client, args.sessions, args.requests, args.repeat_rate))
+                if "stream" in targets:
+                    reports.append(await bench_stream(client, args.sessions, args.requests, args.repeat_rate))
+        finally:
+            if server is not None:
+                server.should_exit = True
+    if "mcp" in targets:
+        reports.append(await bench_mcp(args.sessions, args.requests))
+    results = [report.to_dict() for report in reports]
+    if not args.url:
+        results.append(db_timer.to_dict())
+    return results
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the Doable agent server against a stub model.")
+    parser.add_argument("--target", choices=["chat", "stream", "mcp", "all"], default="all")
+    parser.add_argument("--sessions", type=int, default=20, help="Concurrent sessions.")
+    parser.add_argument("--requests", type=int, default=5, help="Sequential requests per session.")
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="Stub model time to first token.")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0, help="Stub model token rate.")
+    parser.add_argument("--reply-tokens", type=int, default=40, help="Tokens per stub reply.")
+    parser.add_argument("--tool-call-rate", type=float, default=0.0, help="Share of runs that call a tool first.")
+    parser.add_argument("--repeat-rate", type=float, default=0.0, help="Share of prompts that repeat a common question.")
+    parser.add_argument("--url", help="Benchmark a running server instead of the in-process app (chat targets only).")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    # Keep benchmark sessions and events out of the real database.
+    os.environ.setdefault("DOABLE_DB_FILE", os.path.join(tempfile.mkdtemp(prefix="doable-bench-"), "bench.db"))
+    results = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    columns = ["target", "requests", "errors", "throughput_rps", "p50_ms", "p95_ms", "p99_ms", "ttft_p50_ms", "ttft_p95_ms", "max_ms"]
+    columns = [c for c in columns if any(c in row for row in results)]
+    print("  ".join(f"{c:>14}" for c in columns))
+    for row in results:
+        print("  ".join(f"{str(row.get(c, '')):>14}" for c in columns))
+    reply_ms = args.latency_ms + 1000 * args.reply_tokens / args.tokens_per_second
+    print(f"\nstub model: {args.latency_ms:.0f} ms to first token, {reply_ms:.0f} ms per full reply")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,322 @@
+import os
+import sqlite3
+import threading
+import time
+from bisect import bisect_left, insort
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional
+
+from storage import apply_sqlite_pragmas
+
+DEFAULT_USER = "default"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS doable_calendar_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    title TEXT NOT NULL,
+    start_ts REAL NOT NULL,
+    end_ts REAL NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS doable_calendar_events_user_start
+    ON doable_calendar_events (user_id, start_ts);
+CREATE TABLE IF NOT EXISTS doable_calendar_meta (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    changes INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO doable_calendar_meta (id, changes) VALUES (0, 0);
+CREATE TRIGGER IF NOT EXISTS doable_calendar_events_insert AFTER INSERT ON doable_calendar_events
+BEGIN UPDATE doable_calendar_meta SET changes = changes + 1 WHERE id = 0; END;
+CREATE TRIGGER IF NOT EXISTS doable_calendar_events_update AFTER UPDATE ON doable_calendar_events
+BEGIN UPDATE doable_calendar_meta SET changes = changes + 1 WHERE id = 0; END;
+CREATE TRIGGER IF NOT EXISTS doable_calendar_events_delete AFTER DELETE ON doable_calendar_events
+BEGIN UPDATE doable_calendar_meta SET changes = changes + 1 WHERE id = 0; END;
+"""
+
+
+def parse_time(value: str) -> datetime:
+    """Parses an ISO-8601 timestamp. Naive values are treated as UTC."""
+    parsed = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def format_time(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
+
+
+@dataclass(frozen=True)
+class CalendarEvent:
+    id: int
+    user_id: str
+    title: str
+    start_ts: float
+    end_ts: float
+
+    @property
+    def duration_minutes(self) -> int:
+        return round((self.end_ts - self.start_ts) / 60)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "event": self.title,
+            "time": format_time(self.start_ts),
+            "end": format_time(self.end_ts),
+            "duration_minutes": self.duration_minutes,
+        }
+
+
+# Events longer than this are kept out of the overlap window, so one all-day
+# or multi-day event does not turn every range query into a full scan.
+LONG_EVENT_SECONDS = 24 * 3600.0
+
+
+class _UserIndex:
+    """Events of one user, sorted by start time.
+
+    Overlap queries only need to look at events starting in
+    `[lo - max_duration, hi)`, which `bisect` finds in O(log n); the scan is
+    then proportional to the number of candidates, not the calendar size.
+    `max_duration` is the longest current event of at most a day (durations
+    are kept sorted, so it shrinks again when that event is removed). Longer
+    events are few and are checked one by one.
+    """
+
+    def __init__(self):
+        self.keys: list[tuple[float, int]] = []
+        self.events: dict[int, CalendarEvent] = {}
+        self._durations: list[float] = []
+        self._long: set[int] = set()
+
+    @property
+    def max_duration(self) -> float:
+        return self._durations[-1] if self._durations else 0.0
+
+    def add(self, event: CalendarEvent):
+        insort(self.keys, (event.start_ts, event.id))
+        self.events[event.id] = event
+        duration = event.end_ts - event.start_ts
+        if duration > LONG_EVENT_SECONDS:
+            self._long.add(event.id)
+        else:
+            insort(self._durations, duration)
+
+    def remove(self, event_id: int) -> Optional[CalendarEvent]:
+        event = self.events.pop(event_id, None)
+        if event is not None:
+            del self.keys[bisect_left(self.keys, (event.start_ts, event.id))]
+            if event_id in self._long:
+                self._long.discard(event_id)
+            else:
+                del self._durations[bisect_left(self._durations, event.end_ts - event.start_ts)]
+        return event
+
+    def overlapping(self, lo: float, hi: float) -> list[CalendarEvent]:
+        window = lo - self.max_duration
+        start = bisect_left(self.keys, (window,))
+        stop = bisect_left(self.keys, (hi,))
+        found = []
+        for _, event_id in self.keys[start:stop]:
+            event = self.events[event_id]
+            if event.end_ts > lo:
+                found.append(event)
+        # Long events that started before the window; they all sort ahead of `found`.
+        early = [
+            event
+            for event in map(self.events.__getitem__, self._long)
+            if event.start_ts < window and event.end_ts > lo
+        ]
+        return sorted(early, key=lambda event: (event.start_ts, event.id)) + found
+
+    def starting_between(self, lo: float, hi: float) -> list[tuple[float, int]]:
+        return self.keys[bisect_left(self.keys, (lo,)) : bisect_left(self.keys, (hi,))]
+
+
+class CalendarStore:
+    """SQLite-backed calendar with an in-memory sorted index per user.
+
+    SQLite is the source of truth; each user's events are loaded into the
+    index on first access and kept in sync by every write. Writes made by
+    other processes (e.g. other server workers) are picked up through
+    `PRAGMA data_version`, which drops the stale indexes. The file is shared
+    with sessions and other tables, so a trigger-maintained change counter
+    tells calendar writes apart from unrelated ones.
+
+    `version` increases on every change, local or external, and callbacks
+    registered with `subscribe` are invoked after it does.
+    """
+
+    def __init__(self, db_file: str):
+        self.db_file = db_file
+        self.version = 0
+        self._lock = threading.RLock()
+        self._indexes: dict[str, _UserIndex] = {}
+        self._listeners: list[Callable[[], None]] = []
+        self._conn = sqlite3.connect(db_file, check_same_thread=False, timeout=30)
+        apply_sqlite_pragmas(self._conn)
+        self._conn.executescript(SCHEMA)
+        self._data_version = self._read_data_version()
+        self._changes = self._read_changes()
+
+    def _read_data_version(self) -> int:
+        return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _read_changes(self) -> int:
+        return self._conn.execute("SELECT changes FROM doable_calendar_meta WHERE id = 0").fetchone()[0]
+
+    def subscribe(self, callback: Callable[[], None]):
+        """Registers a callback invoked whenever the calendar changes."""
+        self._listeners.append(callback)
+
+    def _changed(self):
+        self.version += 1
+        for callback in self._listeners:
+            callback()
+
+    def refresh(self):
+        """Drops cached indexes if another connection changed the calendar."""
+        with self._lock:
+            data_version = self._read_data_version()
+            if data_version != self._data_version:
+                self._data_version = data_version
+                changes = self._read_changes()
+                if changes != self._changes:
+                    self._changes = changes
+                    self._indexes.clear()
+                    self._changed()
+
+    def _index(self, user_id: str) -> _UserIndex:
+        self.refresh()
+        index = self._indexes.get(user_id)
+        if index is None:
+            index = _UserIndex()
+            rows = self._conn.execute(
+                "SELECT id, user_id, title, start_ts, end_ts FROM doable_calendar_events WHERE user_id = ?",
+                (user_id,),
+            )
+            for row in rows:
+                index.add(CalendarEvent(*row))
+            self._indexes[user_id] = index
+        return index
+
+    def add_event(self, title: str, start: datetime, duration_minutes: int, user_id: str = DEFAULT_USER) -> CalendarEvent:
+        """Stores a new event and returns it."""
+        if duration_minutes <= 0:
+            raise ValueError("duration_minutes must be positive")
+        start_ts = start.timestamp()
+        end_ts = start_ts + duration_minutes * 60
+        with self._lock:
+            index = self._index(user_id)
+            with self._conn:
+                cursor = self._conn.execute(
+                    "INSERT INTO doable_calendar_events (user_id, title, start_ts, end_ts, created_at)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (user_id, title, start_ts, end_ts, time.time()),
+                )
+            # Our own write; a counter further ahead means another process wrote too.
+            self._changes += 1
+            event = CalendarEvent(cursor.lastrowid, user_id, title, start_ts, end_ts)
+            index.add(event)
+            self._changed()
+            return event
+
+    def remove_event(self, event_id: int, user_id: str = DEFAULT_USER) -> bool:
+        """Deletes an event. Returns False if the user has no such event."""
+        with self._lock:
+            if self._index(user_id).remove(event_id) is None:
+                return False
+            with self._conn:
+                self._conn.execute("DELETE FROM doable_calendar_events WHERE id = ?", (event_id,))
+            self._changes += 1
+            self._changed()
+            return True
+
+    def conflicts(self, start: datetime, end: datetime, user_id: str = DEFAULT_USER) -> list[CalendarEvent]:
+        """Events overlapping the half-open range [start, end)."""
+        with self._lock:
+            return self._index(user_id).overlapping(start.timestamp(), end.timestamp())
+
+    def find_event(
+        self,
+        title: Optional[str] = None,
+        start: Optional[datetime] = None,
+        user_id: str = DEFAULT_USER,
+    ) -> Optional[CalendarEvent]:
+        """Returns an event with this title (case-insensitive) and/or start time, if there is one."""
+        wanted = title.casefold() if title else None
+        with self._lock:
+            index = self._index(user_id)
+            if start is not None:
+                ts = start.timestamp()
+                candidates = [index.events[event_id] for _, event_id in index.starting_between(ts, ts + 1)]
+            else:
+                candidates = index.events.values()
+            for event in candidates:
+                if wanted is None or event.title.casefold() == wanted:
+                    return event
+        return None
+
+    def list_events(
+        self,
+        user_id: str = DEFAULT_USER,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        limit: int = 50,
+        offset: int = 0,
+    ) -> dict:
+        """Returns one page of the events starting in [start, end).
+
+        Returns:
+            dict: `events`, the `total` number in range and the `next_offset`
+            to pass for the following page (None on the last page).
+        """
+        lo = start.timestamp() if start else float("-inf")
+        hi = end.timestamp() if end else float("inf")
+        with self._lock:
+            index = self._index(user_id)
+            keys = index.starting_between(lo, hi)
+            page = [index.events[event_id] for _, event_id in keys[offset : offset + limit]]
+        next_offset = offset + limit if offset + limit < len(keys) else None
+        return {
+            "events": [event.to_dict() for event in page],
+            "total": len(keys),
+            "next_offset": next_offset,
+        }
+
+    def free_slots(
+        self,
+        start: datetime,
+        end: datetime,
+        min_minutes: int = 30,
+        user_id: str = DEFAULT_USER,
+    ) -> list[tuple[datetime, datetime]]:
+        """Gaps of at least `min_minutes` between events inside [start, end)."""
+        lo, hi = start.timestamp(), end.timestamp()
+        slots = []
+        cursor = lo
+        for event in self.conflicts(start, end, user_id):
+            if event.start_ts - cursor >= min_minutes * 60:
+                slots.append((cursor, event.start_ts))
+            cursor = max(cursor, event.end_ts)
+        if hi - cursor >= min_minutes * 60:
+            slots.append((cursor, hi))
+        return [
+            (datetime.fromtimestamp(a, timezone.utc), datetime.fromtimestamp(b, timezone.utc))
+            for a, b in slots
+        ]
+
+
+def slot_to_dict(slot: tuple[datetime, datetime]) -> dict:
+    start, end = slot
+    return {
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "minutes": int((end - start) / timedelta(minutes=1)),
+    }
+
+
+calendar_store = CalendarStore(os.getenv("DOABLE_DB_FILE", "my_os.db"))
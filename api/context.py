@@ -0,0 +1,189 @@
+import functools
+import json
+import os
+from typing import Optional
+
+from agno.models.message import Message
+from agno.session.summary import SessionSummary, SessionSummaryManager
+
+# Keeps the prompt sent to the model bounded however long a session runs.
+# The most recent turns of a session are sent verbatim while they fit in a
+# token budget; turns that fall out of that window are folded into the
+# session summary, which agno places in the system message. The summary is
+# stored on the session and only updated, from the previous summary plus the
+# newly evicted turns, when turns actually leave the window.
+
+CHARS_PER_TOKEN = 4
+SUPERSEDED = "[superseded by a later call with the same arguments]"
+# Cap on evicted turns folded in by one summary update (e.g. the first update of an old session).
+MAX_TURNS_PER_UPDATE = 20
+_STATE_KEY = "doable_context"
+
+
+def estimate_tokens(message: Message) -> int:
+    """Rough token count of a message (about four characters per token)."""
+    content = message.content
+    size = len(content) if isinstance(content, str) else len(json.dumps(content, default=str)) if content else 0
+    if message.tool_calls:
+        size += len(json.dumps(message.tool_calls, default=str))
+    return size // CHARS_PER_TOKEN + 4
+
+
+def split_turns(messages: list[Message]) -> list[list[Message]]:
+    """Groups conversation messages into turns, each starting at a user message."""
+    turns: list[list[Message]] = []
+    for message in messages:
+        if message.role == "system":
+            continue
+        if message.role == "user" or not turns:
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+
+def drop_superseded_results(turns: list[list[Message]]) -> list[list[Message]]:
+    """Replaces tool results made stale by a later call of the same tool with the same arguments.
+
+    Repeated `get_calendar_events` dumps are the usual case. Messages are
+    copied before being changed, so the stored session is left intact.
+    """
+    seen = set()
+    compacted = []
+    for turn in reversed(turns):
+        kept = []
+        for message in reversed(turn):
+            if message.role == "tool" and message.tool_name:
+                key = (message.tool_name, json.dumps(message.tool_args, sort_keys=True, default=str))
+                if key in seen:
+                    message = message.model_copy(update={"content": SUPERSEDED})
+                seen.add(key)
+            kept.append(message)
+        compacted.append(kept[::-1])
+    return compacted[::-1]
+
+
+class ContextBudget:
+    """Chooses which turns of a session are sent to the model verbatim.
+
+    Args:
+        max_tokens (int): Token budget for verbatim history. 0 disables history.
+        max_turns (int): Most recent turns considered for the verbatim window.
+    """
+
+    def __init__(self, max_tokens: int = 3000, max_turns: int = 10):
+        self.max_tokens = max_tokens
+        self.max_turns = max_turns
+
+    @classmethod
+    def from_env(cls) -> "ContextBudget":
+        """Builds a budget from the DOABLE_CONTEXT_* environment variables."""
+        return cls(
+            max_tokens=int(os.getenv("DOABLE_CONTEXT_TOKENS", "3000")),
+            max_turns=int(os.getenv("DOABLE_CONTEXT_TURNS", "10")),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_tokens > 0 and self.max_turns > 0
+
+    def window(self, turns: list[list[Message]]) -> list[list[Message]]:
+        """Returns the most recent turns, compacted, that fit in the budget."""
+        turns = drop_superseded_results(turns[-self.max_turns:])
+        used = kept = 0
+        for turn in reversed(turns):
+            cost = sum(estimate_tokens(message) for message in turn)
+            if used + cost > self.max_tokens:
+                break
+            used += cost
+            kept += 1
+        return turns[len(turns) - kept:]
+
+    def compact(self, messages: list[Message]) -> list[Message]:
+        """Replaces the history part of a model request with its budgeted window."""
+        history = [message for message in messages if message.from_history]
+        if not history:
+            return messages
+        window = [message for turn in self.window(split_turns(history)) for message in turn]
+        start = next(i for i, message in enumerate(messages) if message.from_history)
+        rest = [message for message in messages[start:] if not message.from_history]
+        return messages[:start] + window + rest
+
+    def wrap_model(self, model):
+        """Applies `compact` to every async model call."""
+        ainvoke = model.ainvoke
+        ainvoke_stream = model.ainvoke_stream
+
+        @functools.wraps(ainvoke)
+        async def compacted_ainvoke(messages, *args, **kwargs):
+            return await ainvoke(self.compact(messages), *args, **kwargs)
+
+        @functools.wraps(ainvoke_stream)
+        async def compacted_ainvoke_stream(messages, *args, **kwargs):
+            async for chunk in ainvoke_stream(self.compact(messages), *args, **kwargs):
+                yield chunk
+
+        model.ainvoke = compacted_ainvoke
+        model.ainvoke_stream = compacted_ainvoke_stream
+        return model
+
+    def summary_manager(self) -> "RollingSummaryManager":
+        return RollingSummaryManager(budget=self)
+
+
+class RollingSummaryManager(SessionSummaryManager):
+    """Session summaries updated incrementally from the turns evicted by a `ContextBudget`.
+
+    agno calls the manager after every run. When no turn has left the
+    verbatim window since the last update, no model call is made and the
+    stored summary is kept as is.
+    """
+
+    def __init__(self, budget: ContextBudget, **kwargs):
+        super().__init__(**kwargs)
+        self.budget = budget
+
+    def _prepare_summary_messages(self, session=None) -> Optional[list[Message]]:
+        if not session:
+            return None
+        turns = split_turns(session.get_messages())
+        evicted = len(turns) - len(self.budget.window(turns))
+        state = (session.session_data or {}).get(_STATE_KEY, {})
+        start = max(state.get("summarized_turns", 0), evicted - MAX_TURNS_PER_UPDATE)
+        if start >= evicted:
+            return None
+
+        from agno.models.utils import get_model
+
+        self.model = get_model(self.model)
+        if self.model is None:
+            return None
+        new_turns = [message for turn in turns[start:evicted] for message in turn]
+        system_message = self.get_system_message(new_turns, self.get_response_format(self.model))
+        request = self.summary_request_message
+        if session.summary is not None:
+            request = (
+                "Here is the summary of the conversation before the part above:\n"
+                f"<previous_summary>\n{session.summary.summary}\n</previous_summary>\n"
+                "Provide the summary of the whole conversation, updating the previous summary with the part above."
+            )
+        if session.session_data is None:
+            session.session_data = {}
+        session.session_data[_STATE_KEY] = {**state, "pending_turns": evicted}
+        return [system_message, Message(role="user", content=request)]
+
+    def _mark_summarized(self, session):
+        state = (session.session_data or {}).get(_STATE_KEY)
+        if state and "pending_turns" in state:
+            state["summarized_turns"] = state.pop("pending_turns")
+
+    def create_session_summary(self, session) -> Optional[SessionSummary]:
+        summary = super().create_session_summary(session)
+        if summary is not None:
+            self._mark_summarized(session)
+        return summary
+
+    async def acreate_session_summary(self, session) -> Optional[SessionSummary]:
+        summary = await super().acreate_session_summary(session)
+        if summary is not None:
+            self._mark_summarized(session)
+        return summary
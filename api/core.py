@@ -0,0 +1,145 @@
+from datetime import datetime, timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from admission import for_model
+from calendar_store import calendar_store
+from dotenv import load_dotenv
+from response_cache import ResponseCache, normalize_prompt
+from router import route
+from serving import InFlightRuns
+from tools import TOOLS
+
+# Shared core of the agent server and the MCP server. Only cheap state is
+# created at import time; the agent, its model and its sessions DB are built
+# by `get_assistant()` on first use.
+
+load_dotenv("../.env")
+
+# Replies to repeated prompts are served from here instead of a model round trip.
+response_cache = ResponseCache.from_env()
+calendar_store.subscribe(response_cache.invalidate)
+
+in_flight = InFlightRuns()
+
+INSTRUCTIONS = [
+    "You are the Doable AI Productivity Agent.",
+    "You help users manage their tasks, goals, and schedule.",
+    "You can schedule meetings and retrieve calendar events.",
+    "To schedule several tasks at once, use 'plan_schedule' instead of calling 'schedule_meeting' repeatedly.",
+    "When you need several independent lookups, request them in the same turn; they run in parallel.",
+    "Tool results are compact tables: columns are named once, and times like 'd+1 09:30' are days after d0 (given in the header, UTC). Use ISO times when calling tools.",
+    "Use 'search_memory' to recall what you know about the user or their tasks instead of asking again.",
+    "Use the 'verify_task_completion' tool before finishing complex requests to ensure quality; pass only the steps taken since your last check.",
+    "Be concise, motivational, and helpful.",
+    "Always refer back to the user's 'Why' if they seem discouraged.",
+]
+
+
+def prepare_model(model):
+    """Wraps a model with history compaction and instrumentation."""
+    from context import ContextBudget
+    from telemetry import instrument_model
+
+    return instrument_model(ContextBudget.from_env().wrap_model(model))
+
+
+@lru_cache(maxsize=None)
+def get_assistant():
+    """Builds the Doable Assistant on first call and returns the same instance afterwards."""
+    from agno.agent import Agent
+    from agno.models.google import Gemini
+    from context import ContextBudget
+    from storage import create_db
+    from telemetry import instrument_db, tool_span
+    from vector_index import mirror_memories
+
+    # Recent turns are replayed within a token budget; older ones live on in the session summary.
+    context = ContextBudget.from_env()
+    return Agent(
+        name="Doable Assistant",
+        model=prepare_model(Gemini(id="gemini-2.0-flash-exp")),  # Using flash for speed
+        db=instrument_db(mirror_memories(create_db())),
+        instructions=INSTRUCTIONS,
+        tools=TOOLS,
+        tool_hooks=[tool_span],
+        add_history_to_context=context.enabled,
+        num_history_runs=context.max_turns or None,
+        session_summary_manager=context.summary_manager() if context.enabled else None,
+        markdown=True,
+        # Observability is local (see telemetry.py); nothing is sent to agno's hosted service.
+        telemetry=False,
+    )
+
+
+@lru_cache(maxsize=None)
+def get_notifier():
+    """Builds the notification pipeline on first call; its copy is written by the assistant's model.
+
+    The assistant is only built when the first flush needs a model, so starting
+    the pipeline stays cheap.
+    """
+    from notifications import NotificationPipeline
+    from task_timers import task_timers
+
+    notifier = NotificationPipeline.from_env(lambda: get_assistant().model)
+    task_timers.subscribe(notifier.submit_task_events)
+    return notifier
+
+
+def cache_scope(user_id: str | None, session_id: str | None, timezone_name: str | None = None) -> str | None:
+    """Returns the scope a reply is cached under, or None if it must not be cached.
+
+    A reply within a session depends on the session's history and has to be
+    recorded in it, so only prompts without a session are cached. The user's
+    local date is part of the scope, so "today" is not answered with
+    yesterday's reply.
+    """
+    if session_id:
+        return None
+    try:
+        zone = ZoneInfo(timezone_name) if timezone_name else timezone.utc
+    except (ZoneInfoNotFoundError, ValueError):
+        zone = timezone.utc
+    return f"{user_id or ''}:{datetime.now(zone).date().isoformat()}"
+
+
+async def ask(
+    message: str,
+    user_id: str | None = None,
+    session_id: str | None = None,
+    lane: str = "interactive",
+    timezone_name: str | None = None,
+    commit: bool = False,
+) -> tuple[str, bool]:
+    """Runs the assistant, answering simple commands and repeated prompts without it.
+
+    Model calls go through the admission controller of the assistant's model,
+    so identical concurrent prompts share one upstream call and `lane` decides
+    who is served first when calls queue up. `timezone_name` and `commit` are
+    passed to the router (see router.py). Only prompts without a session are
+    answered from the cache (see `cache_scope`).
+
+    Returns:
+        tuple[str, bool]: The reply and whether it came from the cache.
+    """
+    calendar_store.refresh()
+    routed = route(message, user_id, timezone_name, commit)
+    if routed is not None:
+        return routed, False
+    scope = cache_scope(user_id, session_id, timezone_name)
+    cached = response_cache.get(message, scope) if scope else None
+    if cached is not None:
+        return cached, True
+    generation = response_cache.generation
+    assistant = get_assistant()
+    admission = for_model(assistant.model.id)
+    async with in_flight.track():
+        response = await admission.run(
+            f"{user_id or ''}:{session_id or ''}\x00{normalize_prompt(message)}",
+            lambda: assistant.arun(message, user_id=user_id, session_id=session_id),
+            lane,
+        )
+    if scope:
+        response_cache.put(message, response.content, scope, generation=generation)
+    return response.content, False
@@ -1,86 +1,341 @@
-from agno.agent import Agent
-from agno.models.google import Gemini
-from agno.tools.cal import CalendarTools
-from agno.db.sqlite import AsyncSqliteDb
 from agno.os import AgentOS
-from dotenv import load_dotenv
+from agno.run.agent import RunEvent
+from admission import Overloaded, all_stats, for_model
+from calendar_store import calendar_store
+from core import ask, cache_scope, get_assistant, get_notifier, in_flight, response_cache
+from jobs import InvalidJobPayload, UnknownJobKind, job_queue
+from notifications import notification_from_dict
+from router import route
+from serving import serve
+from task_timers import task_timers
+from telemetry import add_http_metrics, registry, span
+from tool_cache import all_stats as tool_cache_stats
+from tool_output import stats as tool_output_stats
+from contextlib import asynccontextmanager
+from uuid import uuid4
+import asyncio
+import json
 import os
+import sys
 
-load_dotenv("../.env")
+assistant = get_assistant()
+notifier = get_notifier()
 
-# Mock Calendar tool using a local file or just memory for now
-# For a real implementation, we would use Google Calendar API
-# But for the challenge, a mock or tool that simulates it is fine
 
+@asynccontextmanager
+async def lifespan(app):
+    from vector_index import backfill_memories
 
-def schedule_meeting(event_name: str, start_time: str, duration_minutes: int = 30):
-    """Schedules a meeting in the calendar.
-    Args:
-        event_name (str): Name of the event.
-        start_time (str): Start time of the event (ISO format).
-        duration_minutes (int): Duration in minutes.
-    """
-    return f"Meeting '{event_name}' scheduled for {start_time} (Duration: {duration_minutes} mins)."
-
-
-def get_calendar_events():
-    """Retrieves all calendar events."""
-    return [
-        {"event": "Project Standup", "time": "2025-12-30T10:00:00"},
-        {"event": "Code Review", "time": "2025-12-30T14:00:00"},
-    ]
+    # Memories stored before the index existed; new ones are mirrored as they are written.
+    backfill = asyncio.create_task(backfill_memories(assistant.db))
+    job_queue.start()
+    notifier.start()
+    task_timers.start()
+    yield
+    backfill.cancel()
+    await task_timers.stop()
+    await notifier.stop()
+    await job_queue.stop()
+    await in_flight.drain(float(os.getenv("DOABLE_DRAIN_TIMEOUT", "30")))
+    await assistant.db.close()
 
 
-def verify_task_completion(task_description: str, steps_taken: list[str]):
-    """Self-reflection tool to verify if all steps of a task were completed.
-    Args:
-        task_description (str): The initial task.
-        steps_taken (list[str]): The steps the agent has performed.
-    """
-    # This is a mock self-reflection logic
-    return {
-        "verified": True,
-        "reflection": f"Target: {task_description}. Checked steps: {', '.join(steps_taken)}. Everything seems correct.",
-    }
-
-
-assistant = Agent(
-    name="Doable Assistant",
-    model=Gemini(id="gemini-2.0-flash-exp"),  # Using flash for speed
-    db=AsyncSqliteDb(db_file="my_os.db"),
-    instructions=[
-        "You are the Doable AI Productivity Agent.",
-        "You help users manage their tasks, goals, and schedule.",
-        "You can schedule meetings and retrieve calendar events.",
-        "Use the 'verify_task_completion' tool before finishing complex requests to ensure quality.",
-        "Be concise, motivational, and helpful.",
-        "Always refer back to the user's 'Why' if they seem discouraged.",
-    ],
-    tools=[schedule_meeting, get_calendar_events, verify_task_completion],
-    markdown=True,
-    monitoring=True,  # Enable built-in monitoring/observability
-)
-
 agent_os = AgentOS(
     id="doable-os",
     description="Doable Agentic OS",
     agents=[assistant],
+    lifespan=lifespan,
+    telemetry=False,
 )
 
+from typing import Literal
+
+from fastapi import HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 
 app = agent_os.get_app()
+add_http_metrics(app)
 
 
 class ChatRequest(BaseModel):
     message: str
+    user_id: str | None = None
+    session_id: str | None = None
+    # The user's IANA time zone, for "today"/"tomorrow" in routed commands.
+    timezone: str | None = None
+    # Book simple scheduling commands right away instead of asking the agent.
+    commit: bool = False
+
+
+class TrackTasksRequest(BaseModel):
+    tasks: list[dict]
+    user_id: str | None = None
+
+
+class NotifyRequest(BaseModel):
+    notifications: list[dict]
+    user_id: str | None = None
+
+
+class JobRequest(BaseModel):
+    kind: str
+    payload: dict = {}
+    user_id: str | None = None
+    max_attempts: int | None = None
+
+
+@app.exception_handler(Overloaded)
+async def overloaded(request: Request, exc: Overloaded):
+    return JSONResponse({"detail": str(exc)}, status_code=503, headers={"Retry-After": "1"})
+
+
+@app.exception_handler(UnknownJobKind)
+@app.exception_handler(InvalidJobPayload)
+async def invalid_job(request: Request, exc: ValueError):
+    return JSONResponse({"detail": str(exc)}, status_code=422)
+
+
+@app.get("/prometheus", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Prometheus scrape endpoint. (`/metrics` is taken by AgentOS' own usage metrics.)"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/admission")
+async def admission_stats():
+    """Queue depth, concurrency and coalescing counters per model."""
+    return all_stats()
+
+
+@app.get("/tool-cache")
+async def tool_cache():
+    """Hit/miss, invalidation and eviction counters of the memoized read-only tools."""
+    return tool_cache_stats()
+
+
+@app.get("/tool-output")
+async def tool_output():
+    """Tokens per result of each agent tool, compact encoding vs. JSON."""
+    return tool_output_stats.report()
 
 
 @app.post("/chat")
 async def chat(request: ChatRequest):
-    response = await assistant.arun(request.message)
-    return {"response": response.content}
+    content, cached = await ask(
+        request.message, request.user_id, request.session_id, timezone_name=request.timezone, commit=request.commit
+    )
+    return {"response": content, "cached": cached}
+
+
+@app.post("/chat/jobs", status_code=202)
+async def chat_job(request: ChatRequest):
+    """Runs the prompt as a background job; poll `/jobs/{id}` for the reply."""
+    return await job_queue.submit("ask", request.model_dump(), request.user_id)
+
+
+# Agent run events forwarded to streaming clients, keyed by the short type name
+# they are emitted under. Everything else (hooks, memory updates) is dropped.
+STREAM_EVENTS = {
+    RunEvent.run_started.value: "start",
+    RunEvent.run_content.value: "content",
+    RunEvent.tool_call_started.value: "tool_call",
+    RunEvent.tool_call_completed.value: "tool_result",
+    RunEvent.tool_call_error.value: "tool_error",
+    RunEvent.run_completed.value: "done",
+    RunEvent.run_error.value: "error",
+    RunEvent.run_cancelled.value: "cancelled",
+}
+
+STREAM_MEDIA_TYPES = {
+    "sse": "text/event-stream",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def _event_payload(event) -> dict | None:
+    """Maps an agno run event onto the compact payload sent to the client."""
+    kind = STREAM_EVENTS.get(getattr(event, "event", None))
+    if kind is None:
+        return None
+    payload = {"type": kind, "run_id": event.run_id}
+    if kind == "content":
+        if not event.content:
+            return None
+        payload["content"] = event.content
+    elif kind in ("tool_call", "tool_result", "tool_error"):
+        tool = event.tool
+        payload["tool"] = tool.tool_name if tool else None
+        payload["args"] = tool.tool_args if tool else None
+        if kind == "tool_result":
+            payload["result"] = tool.result if tool else event.content
+        elif kind == "tool_error":
+            payload["error"] = event.error
+    elif kind == "error":
+        payload["error"] = event.content
+    return payload
+
+
+def _encode_event(payload: dict, fmt: str) -> str:
+    with span("serialize", "stream_event"):
+        data = json.dumps(payload, default=str)
+    if fmt == "ndjson":
+        return data + "\n"
+    return f"event: {payload['type']}\ndata: {data}\n\n"
+
+
+async def _stream_chat(http_request: Request, request: ChatRequest, fmt: str):
+    """Relays agent run events as they are produced.
+
+    The run is cancelled as soon as the client goes away, so abandoned
+    generations stop consuming model tokens.
+    """
+    calendar_store.refresh()
+    routed = route(request.message, request.user_id, request.timezone, request.commit)
+    if routed is not None:
+        yield _encode_event({"type": "content", "run_id": None, "content": routed, "routed": True}, fmt)
+        yield _encode_event({"type": "done", "run_id": None, "routed": True}, fmt)
+        return
+    scope = cache_scope(request.user_id, request.session_id, request.timezone)
+    cached = response_cache.get(request.message, scope) if scope else None
+    if cached is not None:
+        yield _encode_event({"type": "content", "run_id": None, "content": cached, "cached": True}, fmt)
+        yield _encode_event({"type": "done", "run_id": None, "cached": True}, fmt)
+        return
+
+    run_id = str(uuid4())
+    generation = response_cache.generation
+    finished = False
+    chunks = []
+    events = assistant.arun(
+        request.message,
+        stream=True,
+        stream_events=True,
+        run_id=run_id,
+        user_id=request.user_id,
+        session_id=request.session_id,
+    )
+    try:
+        async with in_flight.track(), for_model(assistant.model.id).slot("interactive"):
+            async for event in events:
+                if await http_request.is_disconnected():
+                    break
+                payload = _event_payload(event)
+                if payload is None:
+                    continue
+                if payload["type"] == "content":
+                    chunks.append(payload["content"])
+                elif payload["type"] == "done" and scope:
+                    response_cache.put(request.message, "".join(chunks), scope, generation=generation)
+                finished = payload["type"] in ("done", "error", "cancelled")
+                yield _encode_event(payload, fmt)
+    except Overloaded as exc:
+        yield _encode_event({"type": "error", "run_id": run_id, "error": str(exc)}, fmt)
+    finally:
+        if not finished:
+            assistant.cancel_run(run_id)
+        await events.aclose()
+
+
+@app.post("/chat/stream")
+async def chat_stream(
+    request: ChatRequest,
+    http_request: Request,
+    format: Literal["sse", "ndjson"] = "sse",
+):
+    """Streams the assistant reply as Server-Sent Events or NDJSON."""
+    return StreamingResponse(
+        _stream_chat(http_request, request, format),
+        media_type=STREAM_MEDIA_TYPES[format],
+        # Keep reverse proxies from buffering the stream.
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/jobs", status_code=202)
+async def submit_job(request: JobRequest):
+    """Queues a job (`ask`, `plan_schedule` or `parse_tasks`) and returns it with its id."""
+    return await job_queue.submit(request.kind, request.payload, request.user_id, request.max_attempts)
+
+
+@app.get("/jobs")
+async def list_jobs(user_id: str | None = None, status: str | None = None, limit: int = 50):
+    return job_queue.list(user_id, status, limit)
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(404, "Job not found")
+    return job
+
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    if not await job_queue.cancel(job_id):
+        raise HTTPException(409, "Job not found or already finished")
+    return job_queue.get(job_id)
+
+
+async def _stream_job(job_id: str, fmt: str):
+    async for job in job_queue.watch(job_id):
+        yield _encode_event({"type": "job", **job}, fmt)
+
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str, format: Literal["sse", "ndjson"] = "sse"):
+    """Streams the job's status and progress until it finishes."""
+    if job_queue.get(job_id) is None:
+        raise HTTPException(404, "Job not found")
+    return StreamingResponse(
+        _stream_job(job_id, format),
+        media_type=STREAM_MEDIA_TYPES[format],
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/task-timers")
+async def track_tasks(request: TrackTasksRequest):
+    """Tracks due dates and delays of tasks for Reverse Pomodoro transitions."""
+    tracked = await asyncio.to_thread(task_timers.track, request.tasks, request.user_id)
+    return {"tracked": tracked}
+
+
+@app.get("/task-timers")
+async def task_timer_status(task_id: list[str] = Query(default=[])):
+    return task_timers.status(task_id)
+
+
+@app.delete("/task-timers/{task_id}")
+async def untrack_task(task_id: str):
+    return {"removed": await asyncio.to_thread(task_timers.untrack, [task_id])}
+
+
+@app.get("/task-timers/events")
+async def task_timer_events(user_id: str | None = None, since: int = 0, limit: int = 100):
+    """Fired transitions (`delayed`, `reverse_pomodoro`, `overdue`) after the `since` cursor."""
+    return task_timers.events(user_id, since, limit)
+
+
+@app.post("/notifications", status_code=202)
+async def notify(request: NotifyRequest):
+    """Queues motivational notifications (`taskId`, `title`, `kind`, `why`, `goal`) for batched delivery."""
+    try:
+        notifications = [notification_from_dict(item, request.user_id) for item in request.notifications]
+    except (KeyError, ValueError) as exc:
+        raise HTTPException(422, str(exc))
+    return {"accepted": notifier.submit(notifications)}
+
+
+@app.get("/notifications/stats")
+async def notification_stats():
+    return notifier.stats()
 
 
 if __name__ == "__main__":
-    agent_os.serve(app="index:app", reload=True, port=8000)
+    if "--profile-startup" in sys.argv:
+        from startup_profile import profile_startup
+
+        sys.exit(profile_startup("index"))
+    serve(agent_os, "index:app")
@@ -0,0 +1,526 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+from uuid import uuid4
+
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from calendar_store import DEFAULT_USER, format_time, parse_time
+from scheduler import parse_workdays, parse_working_hours
+from storage import apply_sqlite_pragmas
+from telemetry import span
+
+# Background jobs for long agent runs (project decomposition, goal breakdown,
+# bulk imports). A job is submitted, gets an id right away and runs on a small
+# worker pool; clients poll it or subscribe to its progress.
+#
+# The queue is a SQLite table in the sessions database, so jobs survive
+# restarts and every server process (agent server, MCP server, other
+# workers) can submit to it and take work from it. A worker claims a job with
+# a lease it keeps renewing; a job whose lease ran out (its process died) is
+# picked up again. Failed attempts are retried with exponential backoff, and
+# finished jobs are kept for `retention` seconds. Payloads are checked when a
+# job is submitted; a job whose input turns out unusable fails right away
+# instead of being retried.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS doable_jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    run_after REAL NOT NULL,
+    lease_until REAL,
+    progress TEXT,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS doable_jobs_status_run_after ON doable_jobs (status, run_after);
+CREATE INDEX IF NOT EXISTS doable_jobs_user_created ON doable_jobs (user_id, created_at);
+"""
+
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = "queued", "running", "succeeded", "failed", "cancelled"
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+_COLUMNS = (
+    "id, kind, user_id, payload, status, attempts, max_attempts, progress, result, error,"
+    " created_at, started_at, finished_at"
+)
+
+# A handler gets the job's payload and a `report(**progress)` callback, and returns a JSON-serializable result.
+Handler = Callable[[dict, Callable[..., None]], Awaitable[Any]]
+# A validator raises InvalidJobPayload for a payload its handler cannot run.
+Validator = Callable[[dict], None]
+
+
+class UnknownJobKind(ValueError):
+    """Raised when a job is submitted for a kind without a handler."""
+
+
+class InvalidJobPayload(ValueError):
+    """Raised for a payload that cannot run; jobs failing with it are not retried."""
+
+
+def _load(value: Optional[str]):
+    return json.loads(value) if value is not None else None
+
+
+def _row_to_dict(row: tuple) -> dict:
+    job = dict(zip([name.strip() for name in _COLUMNS.split(",")], row))
+    job["payload"] = _load(job["payload"])
+    job["progress"] = _load(job["progress"])
+    job["result"] = _load(job["result"])
+    for field in ("created_at", "started_at", "finished_at"):
+        if job[field] is not None:
+            job[field] = format_time(job[field])
+    return job
+
+
+class JobQueue:
+    """SQLite-backed job queue with a bounded pool of async workers.
+
+    Args:
+        db_file (str): SQLite file holding the `doable_jobs` table.
+        workers (int): Jobs run at the same time in this process.
+        max_attempts (int): Default number of attempts per job.
+        backoff (float): Seconds before the first retry; doubles with every further attempt.
+        lease (float): Seconds a claimed job stays reserved without a heartbeat.
+        retention (float): Seconds finished jobs are kept.
+        poll_interval (float): Seconds between checks for jobs submitted by other processes or due for retry.
+    """
+
+    def __init__(
+        self,
+        db_file: str,
+        workers: int = 2,
+        max_attempts: int = 3,
+        backoff: float = 5.0,
+        lease: float = 60.0,
+        retention: float = 7 * 24 * 3600,
+        poll_interval: float = 1.0,
+    ):
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.lease = lease
+        self.retention = retention
+        self.poll_interval = poll_interval
+        self.handlers: dict[str, Handler] = {}
+        self.validators: dict[str, Validator] = {}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_file, check_same_thread=False, timeout=30)
+        apply_sqlite_pragmas(self._conn)
+        self._conn.executescript(SCHEMA)
+        self._tasks: list[asyncio.Task] = []
+        self._stopping = False
+        self._running: dict[str, asyncio.Task] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._updated: Optional[asyncio.Condition] = None
+
+    @classmethod
+    def from_env(cls) -> "JobQueue":
+        """Builds a queue from DOABLE_DB_FILE and the DOABLE_JOB_* environment variables."""
+        return cls(
+            os.getenv("DOABLE_DB_FILE", "my_os.db"),
+            workers=int(os.getenv("DOABLE_JOB_WORKERS", "2")),
+            max_attempts=int(os.getenv("DOABLE_JOB_ATTEMPTS", "3")),
+            backoff=float(os.getenv("DOABLE_JOB_BACKOFF", "5")),
+            retention=float(os.getenv("DOABLE_JOB_RETENTION", str(7 * 24 * 3600))),
+        )
+
+    def register(self, kind: str, handler: Handler, validate: Optional[Validator] = None):
+        """Registers the coroutine function that runs jobs of `kind`, and the check `submit` runs on their payloads."""
+        self.handlers[kind] = handler
+        if validate is not None:
+            self.validators[kind] = validate
+
+    # -- storage -----------------------------------------------------------
+
+    def _execute(self, sql: str, params: tuple = ()) -> list[tuple]:
+        with self._lock:
+            with self._conn:
+                return self._conn.execute(sql, params).fetchall()
+
+    def _insert(self, kind: str, payload: dict, user_id: str, max_attempts: int) -> str:
+        job_id = uuid4().hex
+        now = time.time()
+        self._execute(
+            "INSERT INTO doable_jobs (id, kind, user_id, payload, status, max_attempts, run_after, created_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (job_id, kind, user_id, json.dumps(payload), QUEUED, max_attempts, now, now),
+        )
+        return job_id
+
+    def _claim(self) -> Optional[tuple[str, str, dict, int, int]]:
+        now = time.time()
+        rows = self._execute(
+            "UPDATE doable_jobs SET status = ?, attempts = attempts + 1, lease_until = ?,"
+            " started_at = COALESCE(started_at, ?)"
+            " WHERE id = (SELECT id FROM doable_jobs"
+            "   WHERE (status = ? AND run_after <= ?) OR (status = ? AND lease_until < ?)"
+            "   ORDER BY run_after LIMIT 1)"
+            " RETURNING id, kind, payload, attempts, max_attempts",
+            (RUNNING, now + self.lease, now, QUEUED, now, RUNNING, now),
+        )
+        if not rows:
+            return None
+        job_id, kind, payload, attempt, max_attempts = rows[0]
+        return job_id, kind, json.loads(payload), attempt, max_attempts
+
+    def _finish(
+        self,
+        job_id: str,
+        attempt: int,
+        status: str,
+        result=None,
+        error: Optional[str] = None,
+        progress: Optional[dict] = None,
+    ) -> bool:
+        """Stores the outcome of an attempt unless the job was cancelled or re-claimed meanwhile."""
+        rows = self._execute(
+            "UPDATE doable_jobs SET status = ?, result = ?, error = ?, finished_at = ?, lease_until = NULL,"
+            " progress = COALESCE(?, progress)"
+            " WHERE id = ? AND status = ? AND attempts = ? RETURNING id",
+            (
+                status,
+                json.dumps(result, default=str),
+                error,
+                time.time(),
+                json.dumps(progress, default=str) if progress else None,
+                job_id,
+                RUNNING,
+                attempt,
+            ),
+        )
+        return bool(rows)
+
+    def _retry(self, job_id: str, attempt: int, error: str, delay: float) -> bool:
+        rows = self._execute(
+            "UPDATE doable_jobs SET status = ?, error = ?, run_after = ?, lease_until = NULL"
+            " WHERE id = ? AND status = ? AND attempts = ? RETURNING id",
+            (QUEUED, error, time.time() + delay, job_id, RUNNING, attempt),
+        )
+        return bool(rows)
+
+    def _heartbeat(self, job_id: str, attempt: int, progress: Optional[dict] = None) -> bool:
+        """Renews the lease (and stores progress). False if the job is no longer ours."""
+        sql = "UPDATE doable_jobs SET lease_until = ?"
+        params: tuple = (time.time() + self.lease,)
+        if progress is not None:
+            sql += ", progress = ?"
+            params += (json.dumps(progress, default=str),)
+        rows = self._execute(sql + " WHERE id = ? AND status = ? AND attempts = ? RETURNING id", params + (job_id, RUNNING, attempt))
+        return bool(rows)
+
+    def _purge(self) -> int:
+        rows = self._execute(
+            "DELETE FROM doable_jobs WHERE status IN (?, ?, ?) AND finished_at < ? RETURNING id",
+            FINISHED + (time.time() - self.retention,),
+        )
+        return len(rows)
+
+    # -- public API ----------------------------------------------------------
+
+    async def submit(
+        self,
+        kind: str,
+        payload: dict,
+        user_id: Optional[str] = None,
+        max_attempts: Optional[int] = None,
+    ) -> dict:
+        """Queues a job and returns it (with its `id`) without waiting for it to run.
+
+        The job's user is also put into the payload as `user_id`, so handlers act
+        for the user who submitted it.
+
+        Raises:
+            UnknownJobKind: No handler is registered for `kind`.
+            InvalidJobPayload: The payload fails the kind's validator.
+        """
+        if kind not in self.handlers:
+            raise UnknownJobKind(f"Unknown job kind '{kind}'. Known kinds: {', '.join(sorted(self.handlers))}")
+        if kind in self.validators:
+            self.validators[kind](payload)
+        user_id = user_id or payload.get("user_id") or DEFAULT_USER
+        job_id = await asyncio.to_thread(
+            self._insert, kind, {**payload, "user_id": user_id}, user_id, max_attempts or self.max_attempts
+        )
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(f"SELECT {_COLUMNS} FROM doable_jobs WHERE id = ?", (job_id,)).fetchone()
+        return _row_to_dict(row) if row else None
+
+    def list(self, user_id: Optional[str] = None, status: Optional[str] = None, limit: int = 50) -> list[dict]:
+        """Most recent jobs first, optionally of one user and/or status."""
+        sql = f"SELECT {_COLUMNS} FROM doable_jobs WHERE 1 = 1"
+        params: tuple = ()
+        if user_id is not None:
+            sql += " AND user_id = ?"
+            params += (user_id,)
+        if status is not None:
+            sql += " AND status = ?"
+            params += (status,)
+        with self._lock:
+            rows = self._conn.execute(sql + " ORDER BY created_at DESC LIMIT ?", params + (limit,)).fetchall()
+        return [_row_to_dict(row) for row in rows]
+
+    async def cancel(self, job_id: str) -> bool:
+        """Cancels a queued or running job. False if it had already finished or does not exist."""
+        rows = await asyncio.to_thread(
+            self._execute,
+            "UPDATE doable_jobs SET status = ?, finished_at = ?, lease_until = NULL"
+            " WHERE id = ? AND status IN (?, ?) RETURNING id",
+            (CANCELLED, time.time(), job_id, QUEUED, RUNNING),
+        )
+        task = self._running.get(job_id)
+        if task is not None:
+            task.cancel()
+        await self._notify()
+        return bool(rows)
+
+    async def watch(self, job_id: str) -> AsyncIterator[dict]:
+        """Yields the job whenever its status or progress changes, until it finishes."""
+        last = None
+        while True:
+            job = self.get(job_id)
+            if job is None:
+                return
+            snapshot = (job["status"], job["attempts"], job["progress"])
+            if snapshot != last:
+                last = snapshot
+                yield job
+            if job["status"] in FINISHED:
+                return
+            # Local updates wake us up at once; the timeout catches other processes' workers.
+            async with self._condition():
+                try:
+                    await asyncio.wait_for(self._updated.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT status, COUNT(*) FROM doable_jobs GROUP BY status").fetchall())
+        return {"workers": self.workers, "running_here": len(self._running), "jobs": counts}
+
+    # -- workers -------------------------------------------------------------
+
+    def _condition(self) -> asyncio.Condition:
+        if self._updated is None:
+            self._updated = asyncio.Condition()
+        return self._updated
+
+    async def _notify(self):
+        async with self._condition():
+            self._updated.notify_all()
+
+    def start(self):
+        """Starts the workers on the running event loop."""
+        if self._tasks:
+            return
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._housekeeping()))
+
+    async def stop(self):
+        """Stops the workers. Interrupted jobs are picked up again once their lease runs out."""
+        self._stopping = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _work(self):
+        while True:
+            claimed = await asyncio.to_thread(self._claim)
+            if claimed is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run(*claimed)
+
+    async def _run(self, job_id: str, kind: str, payload: dict, attempt: int, max_attempts: int):
+        progress: dict = {}
+        dirty = False
+
+        def report(**update):
+            nonlocal dirty
+            progress.update(update)
+            dirty = True
+
+        async def heartbeat():
+            nonlocal dirty
+            renewed = time.monotonic()
+            while True:
+                await asyncio.sleep(self.poll_interval)
+                # Progress is flushed every poll interval; the lease only needs renewing now and then.
+                if not dirty and time.monotonic() - renewed < self.lease / 3:
+                    continue
+                renewed = time.monotonic()
+                snapshot = dict(progress) if dirty else None
+                dirty = False
+                if not await asyncio.to_thread(self._heartbeat, job_id, attempt, snapshot):
+                    # Cancelled (possibly from another process).
+                    task.cancel()
+                    return
+                if snapshot is not None:
+                    await self._notify()
+
+        handler = self.handlers.get(kind)
+        task = asyncio.ensure_future(handler(payload, report)) if handler else None
+        if task is None:
+            await asyncio.to_thread(self._finish, job_id, attempt, FAILED, error=f"No handler for job kind '{kind}'")
+            await self._notify()
+            return
+        self._running[job_id] = task
+        beat = asyncio.create_task(heartbeat())
+        await self._notify()
+        try:
+            with span("job", kind):
+                result = await task
+            await asyncio.to_thread(self._finish, job_id, attempt, SUCCEEDED, result, progress=progress)
+        except asyncio.CancelledError:
+            if self._stopping:
+                # The worker itself is being stopped: leave the job to be re-claimed.
+                raise
+        except Exception as exc:
+            error = f"{type(exc).__name__}: {exc}"
+            if attempt < max_attempts and not isinstance(exc, InvalidJobPayload):
+                await asyncio.to_thread(self._retry, job_id, attempt, error, self.backoff * 2 ** (attempt - 1))
+            else:
+                await asyncio.to_thread(self._finish, job_id, attempt, FAILED, error=error, progress=progress)
+        finally:
+            beat.cancel()
+            self._running.pop(job_id, None)
+            await self._notify()
+
+    async def _housekeeping(self):
+        while True:
+            await asyncio.to_thread(self._purge)
+            await asyncio.sleep(min(self.retention, 600))
+
+
+async def _ask_job(payload: dict, report: Callable[..., None]):
+    from core import ask
+
+    report(stage="running")
+    content, cached = await ask(
+        payload["message"],
+        payload.get("user_id"),
+        payload.get("session_id"),
+        lane="background",
+        timezone_name=payload.get("timezone"),
+        commit=bool(payload.get("commit")),
+    )
+    return {"response": content, "cached": cached}
+
+
+def _check_ask(payload: dict):
+    if not isinstance(payload.get("message"), str) or not payload["message"].strip():
+        raise InvalidJobPayload("ask jobs need a non-empty 'message'")
+
+
+# plan_schedule payload keys and the plan_tasks argument they map to. Both
+# tools' time zone names are accepted (MCP `timezone`, agent `timezone_name`).
+_PLAN_ARGUMENTS = {
+    "tasks": "tasks",
+    "start": "start",
+    "days": "days",
+    "working_hours": "working_hours",
+    "timezone": "tz",
+    "timezone_name": "tz",
+    "tz": "tz",
+    "mode": "mode",
+    "commit": "commit",
+    "workdays": "workdays",
+}
+
+
+def _plan_arguments(payload: dict) -> dict:
+    """Maps a plan_schedule payload to plan_tasks arguments and checks them."""
+    unknown = set(payload) - set(_PLAN_ARGUMENTS) - {"user_id"}
+    if unknown:
+        raise InvalidJobPayload(f"Unknown plan_schedule arguments: {', '.join(sorted(unknown))}")
+    arguments = {}
+    for key, value in payload.items():
+        if key == "user_id":
+            continue
+        name = _PLAN_ARGUMENTS[key]
+        if name in arguments:
+            raise InvalidJobPayload(f"'{key}' repeats another time zone argument")
+        arguments[name] = value
+    tasks = arguments.get("tasks")
+    if not isinstance(tasks, list) or not all(isinstance(task, dict) and task.get("title") for task in tasks):
+        raise InvalidJobPayload("plan_schedule jobs need 'tasks', a list of tasks with a title")
+    try:
+        if arguments.get("start"):
+            parse_time(arguments["start"])
+        if "days" in arguments:
+            int(arguments["days"])
+        if "working_hours" in arguments:
+            parse_working_hours(arguments["working_hours"])
+        if "workdays" in arguments:
+            parse_workdays(arguments["workdays"])
+        if "tz" in arguments:
+            ZoneInfo(arguments["tz"])
+    except (TypeError, ValueError, AttributeError, ZoneInfoNotFoundError) as exc:
+        raise InvalidJobPayload(f"Invalid plan_schedule arguments: {exc}") from None
+    if arguments.get("mode", "greedy") not in ("greedy", "optimize"):
+        raise InvalidJobPayload("mode must be 'greedy' or 'optimize'")
+    return arguments
+
+
+async def _plan_job(payload: dict, report: Callable[..., None]):
+    from tools import TOOL_POOL, plan_tasks
+
+    report(stage="planning", tasks=len(payload.get("tasks") or []))
+    arguments = _plan_arguments(payload)
+    return await asyncio.get_running_loop().run_in_executor(
+        TOOL_POOL, lambda: plan_tasks(payload.get("user_id") or DEFAULT_USER, **arguments)
+    )
+
+
+def _check_parse(payload: dict):
+    if not isinstance(payload.get("text"), str):
+        raise InvalidJobPayload("parse_tasks jobs need 'text', one task per line")
+    projects = payload.get("projects") or []
+    if not isinstance(projects, list) or not all(isinstance(p, dict) and "_id" in p and "title" in p for p in projects):
+        raise InvalidJobPayload("'projects' must be a list of {_id, title} records")
+
+
+async def _parse_job(payload: dict, report: Callable[..., None]):
+    from task_parser import parse_tasks
+    from tool_pool import TOOL_POOL
+
+    lines = payload["text"].splitlines()
+    report(stage="parsing", lines=len(lines))
+    # A large paste takes a while to parse; keep it off the event loop.
+    return await asyncio.get_running_loop().run_in_executor(
+        TOOL_POOL, lambda: [task.to_dict() for task in parse_tasks(lines, payload.get("projects") or ())]
+    )
+
+
+job_queue = JobQueue.from_env()
+# "ask" runs an assistant prompt in the background lane of the model's admission
+# queue, so interactive chats are served first.
+job_queue.register("ask", _ask_job, _check_ask)
+job_queue.register("plan_schedule", _plan_job, _plan_arguments)
+job_queue.register("parse_tasks", _parse_job, _check_parse)
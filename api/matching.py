@@ -0,0 +1,124 @@
+from typing import Optional
+
+import numpy as np
+
+from response_cache import hashing_embedder
+
+# Matches project tasks to employees without sending the roster to the model.
+# Tasks and employees are embedded into the same hashed feature space, one
+# matrix product gives every task/employee similarity, and a capacity-aware
+# assignment picks an owner per task. The model then only needs the top few
+# candidates of each task.
+
+# Weight of the fit between a task and an employee's traits vs. their track record.
+FIT_WEIGHT = 0.8
+DEFAULT_EFFORT_MINS = 60
+
+
+def _task_text(task: dict) -> str:
+    traits = " ".join(task.get("recommendedTraits") or [])
+    # Traits are what the match is about, so they count twice.
+    return " ".join([traits, traits, task.get("title", ""), task.get("description") or "", task.get("requirements") or ""])
+
+
+def _employee_text(employee: dict) -> str:
+    psychology = employee.get("psychology") or {}
+    strengths = " ".join(psychology.get("strengths") or [])
+    motivation = " ".join(psychology.get("motivationFactors") or [])
+    return " ".join([strengths, strengths, motivation, psychology.get("personalityType") or ""])
+
+
+def _unit_rows(texts: list[str]) -> np.ndarray:
+    matrix = np.array([hashing_embedder(text) for text in texts], dtype=float).reshape(len(texts), -1)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _completion_rates(employees: list[dict]) -> np.ndarray:
+    rates = np.array([employee.get("pastCompletionRate") or 0 for employee in employees], dtype=float)
+    # A percentage (0-100), as in lib/schemas/employee.ts.
+    return np.clip(rates / 100, 0.0, 1.0)
+
+
+def score_matrix(tasks: list[dict], employees: list[dict]) -> np.ndarray:
+    """Returns a (tasks x employees) matrix of match scores in [0, 1]."""
+    fit = np.clip(_unit_rows([_task_text(t) for t in tasks]) @ _unit_rows([_employee_text(e) for e in employees]).T, 0, 1)
+    return FIT_WEIGHT * fit + (1 - FIT_WEIGHT) * _completion_rates(employees)
+
+
+def assign(scores: np.ndarray, efforts: np.ndarray, capacities: np.ndarray) -> np.ndarray:
+    """Greedy capacity-aware assignment: best-scoring pairs first.
+
+    Every (task, employee) pair is visited in order of decreasing score; a
+    task goes to the employee of its first pair that still has room for its
+    effort.
+
+    Returns:
+        np.ndarray: Employee index per task, -1 where nobody had capacity left.
+    """
+    owners = np.full(scores.shape[0], -1)
+    remaining = capacities.astype(float).copy()
+    left = scores.shape[0]
+    for flat in np.argsort(-scores, axis=None, kind="stable"):
+        if not left:
+            break
+        task, employee = divmod(int(flat), scores.shape[1])
+        if owners[task] == -1 and remaining[employee] >= efforts[task]:
+            owners[task] = employee
+            remaining[employee] -= efforts[task]
+            left -= 1
+    return owners
+
+
+def match_tasks(
+    tasks: list[dict],
+    employees: list[dict],
+    top_k: int = 3,
+    capacity_mins: Optional[float] = None,
+) -> dict:
+    """Suggests an owner and the top candidates for every task.
+
+    Args:
+        tasks (list[dict]): Tasks with `title` and optionally `_id`, `description`, `requirements`, `recommendedTraits` and `effortEstimateMins`.
+        employees (list[dict]): Employees with `_id`, `name`, `psychology` (`strengths`, `motivationFactors`, `personalityType`), `pastCompletionRate` (0-100) and optionally `capacityMins`.
+        top_k (int): Candidates listed per task.
+        capacity_mins (float): Default workload limit for employees without `capacityMins`. Unlimited if omitted.
+
+    Returns:
+        dict: `assignments` (one entry per task, in input order) and `workload` (assigned minutes per employee).
+    """
+    if not tasks or not employees:
+        return {"assignments": [], "workload": []}
+    scores = score_matrix(tasks, employees)
+    efforts = np.array([task.get("effortEstimateMins") or DEFAULT_EFFORT_MINS for task in tasks], dtype=float)
+    default_capacity = np.inf if capacity_mins is None else capacity_mins
+    capacities = np.array([employee.get("capacityMins") or default_capacity for employee in employees], dtype=float)
+    owners = assign(scores, efforts, capacities)
+
+    k = min(top_k, len(employees))
+    top = np.argsort(-scores, axis=1, kind="stable")[:, :k]
+
+    def person(employee_index: int, task_index: int) -> dict:
+        employee = employees[employee_index]
+        return {
+            "_id": employee.get("_id"),
+            "name": employee.get("name"),
+            "score": round(float(scores[task_index, employee_index]), 3),
+        }
+
+    assignments = [
+        {
+            "_id": task.get("_id"),
+            "title": task.get("title"),
+            "assignee": person(int(owners[i]), i) if owners[i] >= 0 else None,
+            "candidates": [person(int(j), i) for j in top[i]],
+        }
+        for i, task in enumerate(tasks)
+    ]
+    assigned = np.bincount(owners[owners >= 0], weights=efforts[owners >= 0], minlength=len(employees))
+    workload = [
+        {"_id": employee.get("_id"), "name": employee.get("name"), "assigned_mins": int(assigned[j])}
+        for j, employee in enumerate(employees)
+    ]
+    return {"assignments": assignments, "workload": workload}
@@ -1,39 +1,390 @@
+import asyncio
+import sys
+from contextlib import asynccontextmanager
+from typing import Callable
+
 from mcp.server.fastmcp import FastMCP
-from index import (
-    assistant,
-    schedule_meeting,
-    get_calendar_events,
-    verify_task_completion,
-)
+from tool_pool import TOOL_POOL, run_in_pool
+
+# Only FastMCP and the tool pool are imported up front: the stores (each opens
+# SQLite), the calendar tools and the agent core (which pulls in agno) are
+# imported by the tools that use them, so a server spawned per client session
+# can list its tools without paying for them.
+
+
+def _user(user_id: str | None) -> str:
+    from calendar_store import DEFAULT_USER
+
+    return user_id or DEFAULT_USER
+
+
+def _parse_time(value: str | None):
+    from calendar_store import parse_time
+
+    return parse_time(value) if value else None
+
+
+@asynccontextmanager
+async def lifespan(server):
+    from core import get_notifier
+    from jobs import job_queue
+    from task_timers import task_timers
+
+    # Jobs submitted here (or by the agent server) are worked on by whichever process is up.
+    notifier = get_notifier()
+    job_queue.start()
+    notifier.start()
+    task_timers.start()
+    try:
+        yield
+    finally:
+        await task_timers.stop()
+        await notifier.stop()
+        await job_queue.stop()
+
 
 # Create an MCP server
-mcp = FastMCP("Doable Assistant")
+mcp = FastMCP("Doable Assistant", lifespan=lifespan)
+
+# Upper bound on items of one batch call that run at the same time.
+BATCH_CONCURRENCY = 16
+
+
+async def run_batch(call: Callable[[dict], object], items: list[dict]) -> list[dict]:
+    """Runs `call` for every item concurrently on the tool thread pool.
+
+    One failing item does not fail the batch: each result carries the item's
+    `index` and either `ok: True` with its `result` or `ok: False` with the
+    `error`.
+    """
+    limit = asyncio.Semaphore(BATCH_CONCURRENCY)
+    loop = asyncio.get_running_loop()
+
+    async def run_one(index: int, item: dict) -> dict:
+        async with limit:
+            try:
+                return {"index": index, "ok": True, "result": await loop.run_in_executor(TOOL_POOL, call, item)}
+            except Exception as exc:
+                return {"index": index, "ok": False, "error": f"{type(exc).__name__}: {exc}"}
+
+    return list(await asyncio.gather(*(run_one(i, item) for i, item in enumerate(items))))
 
 
 @mcp.tool()
 async def ask_assistant(message: str) -> str:
     """Ask the Doable Assistant anything about tasks, goals, or schedule."""
-    response = await assistant.arun(message)
-    return response.content
+    from core import ask
+
+    content, _ = await ask(message, lane="background")
+    return content
 
 
 @mcp.tool()
-def schedule_task(title: str, start_time: str, duration: int = 30) -> str:
+@run_in_pool
+def schedule_task(title: str, start_time: str, duration: int = 30, user_id: str | None = None) -> str:
     """Schedule a task or meeting in the calendar."""
-    return schedule_meeting(title, start_time, duration)
+    from tools import book_meeting
+
+    return book_meeting(_user(user_id), title, start_time, duration)
+
+
+@mcp.tool()
+@run_in_pool
+def list_calendar(
+    start: str | None = None,
+    end: str | None = None,
+    limit: int = 20,
+    offset: int = 0,
+    user_id: str | None = None,
+) -> dict:
+    """List scheduled events starting in [start, end), one page at a time."""
+    from tools import calendar_page
+
+    return calendar_page(_user(user_id), start, end, limit, offset)
+
+
+@mcp.tool()
+@run_in_pool
+def find_free_time(start: str, end: str, min_minutes: int = 30, user_id: str | None = None) -> list:
+    """Find free slots of at least min_minutes between start and end."""
+    from tools import free_time
+
+    return free_time(_user(user_id), start, end, min_minutes)
+
+
+@mcp.tool()
+@run_in_pool
+def plan_schedule(
+    tasks: list[dict],
+    start: str | None = None,
+    days: int = 7,
+    working_hours: str = "09:00-17:00",
+    timezone: str = "UTC",
+    mode: str = "greedy",
+    commit: bool = False,
+    user_id: str | None = None,
+    workdays: str | None = None,
+) -> dict:
+    """Pack many tasks (title, effortEstimateMins, priority, dueDate) into free working time.
+
+    mode is "greedy" (fast first-fit) or "optimize" (local search for a better plan,
+    bounded to about half a second). workdays are the days the user works, e.g.
+    "mon-fri" (the default), "sun-thu" or "mon,wed,fri". Set commit=True to book the
+    planned blocks in the calendar.
+    """
+    from scheduler import DEFAULT_WORKDAYS
+    from tools import plan_tasks
+
+    return plan_tasks(
+        _user(user_id), tasks, start, days, working_hours, timezone, mode, commit, workdays or DEFAULT_WORKDAYS
+    )
+
+
+@mcp.tool()
+@run_in_pool
+def reflect_on_task(task: str, steps: list[str], user_id: str | None = None) -> dict:
+    """Verify if a task was completed successfully.
+
+    Only steps not checked before for this task are verified; sending the full
+    list again is fine. Steps claiming a meeting was scheduled are checked
+    against the calendar.
+    """
+    from reflection import reflection_store
+
+    return reflection_store.verify(task, steps, _user(user_id))
 
 
 @mcp.tool()
-def list_calendar() -> list:
-    """List all scheduled events."""
-    return get_calendar_events()
+@run_in_pool
+def parse_tasks(text: str, projects: list[dict] | None = None, now: str | None = None) -> list[dict]:
+    """Parse quick-add task lines (one task per line) without calling the model.
+
+    Each line uses the quick-add grammar: "+project", "#tag", "@date" (today, tomorrow,
+    a day name or YYYY-MM-DD, optionally followed by a time like 4pm or 10:30am) and an
+    estimate like 1h30m. List markers and blank lines are ignored. projects are
+    {_id, title} records used to resolve +project; now (ISO, with the user's UTC offset) anchors relative dates.
+    """
+    from task_parser import parse_tasks as parse_task_lines
+
+    tasks = parse_task_lines(text.splitlines(), projects or (), _parse_time(now))
+    return [task.to_dict() for task in tasks]
 
 
 @mcp.tool()
-def reflect_on_task(task: str, steps: list[str]) -> dict:
-    """Verify if a task was completed successfully."""
-    return verify_task_completion(task, steps)
+@run_in_pool
+def prioritize_tasks(
+    tasks: list[dict],
+    user_why: str | None = None,
+    now: str | None = None,
+    limit: int | None = None,
+) -> list[dict]:
+    """Rank a task list and assign Eisenhower quadrants and priorities in one call.
+
+    tasks use the Task fields (_id, title, why, priority, dueDate, effortEstimateMins,
+    lastDelayedAt, isCompleted). Urgency comes from due-date slack and recent delays,
+    importance from priority and how well each task fits user_why. Completed tasks are
+    skipped; limit keeps only the top of the ranking.
+    """
+    # NumPy is only imported once a ranking is requested.
+    from prioritize import rank_tasks
+
+    return rank_tasks(tasks, user_why, _parse_time(now), limit)
+
+
+@mcp.tool()
+@run_in_pool
+def match_employees(
+    tasks: list[dict],
+    employees: list[dict],
+    top_k: int = 3,
+    capacity_mins: float | None = None,
+) -> dict:
+    """Suggest an owner and the top_k best-fitting employees for each project task.
+
+    tasks have title, description, requirements, recommendedTraits and effortEstimateMins;
+    employees have _id, name, psychology (strengths, motivationFactors, personalityType),
+    pastCompletionRate (0-100) and optionally capacityMins. Owners are assigned best match first
+    without exceeding anyone's capacity (capacity_mins applies to employees without
+    capacityMins). Pass only the candidates on to the model, not the whole roster.
+    """
+    from matching import match_tasks
+
+    return match_tasks(tasks, employees, top_k, capacity_mins)
+
+
+@mcp.tool()
+@run_in_pool
+def index_tasks(tasks: list[dict], user_id: str | None = None) -> dict:
+    """Add or update tasks in the local retrieval index; completed tasks are removed.
+
+    tasks use the Task fields (_id, userId, title, description, why, substeps, isCompleted);
+    user_id applies to tasks without userId.
+    """
+    from vector_index import get_index, task_item
+
+    index = get_index()
+    done = [f"task:{task['_id']}" for task in tasks if task.get("isCompleted")]
+    indexed = index.upsert(task_item(task, _user(user_id)) for task in tasks if not task.get("isCompleted"))
+    return {"indexed": indexed, "removed": index.remove(done)}
+
+
+@mcp.tool()
+@run_in_pool
+def unindex_tasks(task_ids: list[str]) -> dict:
+    """Remove tasks from the local retrieval index by _id."""
+    from vector_index import get_index
+
+    return {"removed": get_index().remove(f"task:{task_id}" for task_id in task_ids)}
+
+
+@mcp.tool()
+@run_in_pool
+def search_index(
+    query: str,
+    user_id: str | None = None,
+    kinds: list[str] | None = None,
+    limit: int = 5,
+) -> list[dict]:
+    """Find a user's memories and tasks related to the query (kinds: "memory", "task")."""
+    from vector_index import get_index
+
+    return get_index().search(query, limit, _user(user_id), kinds)
+
+
+@mcp.tool()
+async def schedule_tasks(events: list[dict], user_id: str | None = None) -> list[dict]:
+    """Schedule many events at once.
+
+    Each event has title, start_time (ISO) and optionally duration (minutes, default 30)
+    and user_id. Returns one result or error per event, in input order.
+    """
+    from tools import book_meeting
+
+    return await run_batch(
+        lambda event: book_meeting(
+            _user(event.get("user_id", user_id)), event["title"], event["start_time"], event.get("duration", 30)
+        ),
+        events,
+    )
+
+
+@mcp.tool()
+async def list_calendars(queries: list[dict]) -> list[dict]:
+    """List events for many users and/or date ranges at once.
+
+    Each query may set user_id, start, end, limit and offset, as in list_calendar.
+    """
+    from tools import calendar_page
+
+    return await run_batch(
+        lambda query: calendar_page(
+            _user(query.get("user_id")),
+            query.get("start"),
+            query.get("end"),
+            query.get("limit", 20),
+            query.get("offset", 0),
+        ),
+        queries,
+    )
+
+
+@mcp.tool()
+async def reflect_on_tasks(items: list[dict]) -> list[dict]:
+    """Verify many tasks at once. Each item has task, steps and optionally user_id, as in reflect_on_task."""
+    from reflection import reflection_store
+
+    return await run_batch(
+        lambda item: reflection_store.verify(item["task"], item["steps"], _user(item.get("user_id"))),
+        items,
+    )
+
+
+@mcp.tool()
+async def submit_job(kind: str, payload: dict, user_id: str | None = None, max_attempts: int | None = None) -> dict:
+    """Start a long-running job in the background and return its id right away.
+
+    kind is "ask" (payload: message, session_id), "plan_schedule" (payload: the
+    plan_schedule arguments) or "parse_tasks" (payload: text, projects). Use
+    get_job to follow it.
+    """
+    from jobs import job_queue
+
+    return await job_queue.submit(kind, payload, _user(user_id), max_attempts)
+
+
+@mcp.tool()
+async def get_job(job_id: str) -> dict | None:
+    """Get a background job's status, progress and, once finished, its result or error."""
+    from jobs import job_queue
+
+    return job_queue.get(job_id)
+
+
+@mcp.tool()
+async def cancel_job(job_id: str) -> bool:
+    """Cancel a queued or running background job."""
+    from jobs import job_queue
+
+    return await job_queue.cancel(job_id)
+
+
+@mcp.tool()
+@run_in_pool
+def track_tasks(tasks: list[dict], user_id: str | None = None) -> dict:
+    """Track tasks (_id, title, dueDate, lastDelayedAt, isCompleted) for Reverse Pomodoro.
+
+    A task is delayed once its due date passes; a day later Reverse Pomodoro
+    turns on, and two days after that the task counts as overdue. Completed
+    tasks stop being tracked. Returns the current state of each task.
+    """
+    from task_timers import task_timers
+
+    task_timers.track(tasks, _user(user_id))
+    return {"tasks": task_timers.status(task["_id"] for task in tasks)}
+
+
+@mcp.tool()
+@run_in_pool
+def untrack_tasks(task_ids: list[str]) -> int:
+    """Stop tracking tasks, e.g. after they were deleted."""
+    from task_timers import task_timers
+
+    return task_timers.untrack(task_ids)
+
+
+@mcp.tool()
+@run_in_pool
+def task_events(user_id: str | None = None, since: int = 0, limit: int = 100) -> dict:
+    """List task transitions (delayed, reverse_pomodoro, overdue) with motivational messages.
+
+    Pass the returned cursor as since to get only newer events.
+    """
+    from task_timers import task_timers
+
+    return task_timers.events(user_id, since, limit)
+
+
+@mcp.tool()
+async def send_notifications(notifications: list[dict], user_id: str | None = None) -> dict:
+    """Queue motivational notifications for ignored or delayed tasks.
+
+    Each item has taskId, title and optionally kind (delayed, reverse_pomodoro,
+    overdue or ignored), why, goal (the user's overarching goal, used for an
+    impact line) and userId. Copy is written in batches and repeats of the same
+    task and kind within the dedup window are dropped.
+    """
+    from core import get_notifier
+    from notifications import notification_from_dict
+
+    notifier = get_notifier()
+    accepted = notifier.submit([notification_from_dict(item, _user(user_id)) for item in notifications])
+    return {"accepted": accepted, "stats": notifier.stats()}
 
 
 if __name__ == "__main__":
+    if "--profile-startup" in sys.argv:
+        from startup_profile import profile_startup
+
+        # Ready means the tool list can be served to a client.
+        sys.exit(profile_startup("mcp_server", ready="import asyncio; asyncio.run(mcp_server.mcp.list_tools())"))
     mcp.run()
@@ -0,0 +1,381 @@
+import asyncio
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from typing import Optional, Protocol
+
+from calendar_store import DEFAULT_USER, format_time
+from response_cache import normalize_prompt
+from telemetry import span
+
+# Delivery pipeline for motivational notifications.
+#
+#   submit -> dedup window -> per-user buckets -> copy writer -> sinks
+#
+# Notifications are collected for up to `flush_interval` seconds (or until
+# `batch_size` are waiting), grouped per user, and their copy is written by
+# the model in batched prompts covering many tasks at once. Copy for a
+# (kind, task, goal) already written recently comes from a template cache, so
+# recurring tasks cost no model call at all. Each user then gets one delivery
+# per flush on every sink. The number of model calls follows the number of
+# batches, not the number of tasks.
+
+KINDS = ("delayed", "reverse_pomodoro", "overdue", "ignored")
+
+_JSON_ARRAY = re.compile(r"\[.*\]", re.DOTALL)
+
+COPY_INSTRUCTIONS = (
+    "You write short motivational push notifications for a productivity app. "
+    "For each numbered item write one or two sentences (at most 200 characters) "
+    "that nudge the user to start the task. When the user's goal is given, say "
+    "how skipping the task sets that goal back, e.g. \"Skipping this task delays "
+    "your goal of becoming a Senior Dev by 2 weeks.\" Item kinds: delayed (just "
+    "missed its due date), reverse_pomodoro (delayed a day: suggest working 5 "
+    "minutes, then resting 20), overdue (several days late), ignored (keeps being "
+    "put off). Answer with a JSON array of strings only, one per item, in order."
+)
+
+
+@dataclass
+class Notification:
+    user_id: str
+    task_id: str
+    kind: str
+    title: str
+    # The task's own "why" and the user's overarching goal, used for the impact line.
+    why: Optional[str] = None
+    goal: Optional[str] = None
+    # Used when no model copy is available.
+    fallback: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    message: Optional[str] = None
+
+    @property
+    def dedup_key(self) -> tuple[str, str, str]:
+        return self.user_id, self.task_id, self.kind
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data["created_at"] = format_time(self.created_at)
+        return data
+
+
+class Sink(Protocol):
+    async def deliver(self, user_id: str, notifications: list[dict]): ...
+
+
+class FileSink:
+    """Appends one JSON line per delivery; a local stand-in for a push queue."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _append(self, line: str):
+        with self._lock, open(self.path, "a", encoding="utf-8") as handle:
+            handle.write(line + "\n")
+
+    async def deliver(self, user_id: str, notifications: list[dict]):
+        line = json.dumps({"user_id": user_id, "notifications": notifications}, default=str)
+        await asyncio.to_thread(self._append, line)
+
+
+class WebhookSink:
+    """POSTs `{"user_id", "notifications"}` to a URL, retrying once on failure."""
+
+    def __init__(self, url: str, timeout: float = 10.0):
+        self.url = url
+        self.timeout = timeout
+        self._client = None
+
+    async def deliver(self, user_id: str, notifications: list[dict]):
+        import httpx
+
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=self.timeout)
+        body = {"user_id": user_id, "notifications": notifications}
+        for attempt in range(2):
+            try:
+                response = await self._client.post(self.url, json=body)
+                response.raise_for_status()
+                return
+            except httpx.HTTPError:
+                if attempt:
+                    raise
+                await asyncio.sleep(1)
+
+
+class CopyWriter:
+    """Writes notification copy with the model, many notifications per prompt.
+
+    Args:
+        model: agno model used for the copy, or a callable returning it on the first
+            flush that needs it. Without one, the fallback messages are used.
+        items_per_prompt (int): Notifications covered by one model call.
+        cache_size (int): Copies kept in the template cache.
+    """
+
+    def __init__(self, model=None, items_per_prompt: int = 25, cache_size: int = 2048):
+        self.model = None if callable(model) else model
+        self._model_factory = model if callable(model) else None
+        self.items_per_prompt = items_per_prompt
+        self.cache_size = cache_size
+        self.model_calls = 0
+        self.cache_hits = 0
+        self.fallbacks = 0
+        self._cache: "OrderedDict[tuple, str]" = OrderedDict()
+
+    @staticmethod
+    def _cache_key(notification: Notification) -> tuple:
+        return (
+            notification.kind,
+            normalize_prompt(notification.title),
+            normalize_prompt(notification.why or ""),
+            normalize_prompt(notification.goal or ""),
+        )
+
+    def _prompt(self, batch: list[Notification]) -> str:
+        lines = []
+        for number, notification in enumerate(batch, start=1):
+            line = f"{number}. [{notification.kind}] {notification.title}"
+            if notification.why:
+                line += f" | why: {notification.why}"
+            if notification.goal:
+                line += f" | goal: {notification.goal}"
+            lines.append(line)
+        return "\n".join(lines)
+
+    async def _complete(self, batch: list[Notification]) -> list[Optional[str]]:
+        from admission import for_model
+        from agno.models.message import Message
+
+        messages = [
+            Message(role="system", content=COPY_INSTRUCTIONS),
+            Message(role="user", content=self._prompt(batch)),
+        ]
+        try:
+            async with for_model(self.model.id).slot("background"):
+                self.model_calls += 1
+                response = await self.model.aresponse(messages=messages)
+            match = _JSON_ARRAY.search(response.content or "")
+            copies = json.loads(match.group(0)) if match else []
+        except Exception:
+            copies = []
+        copies = [copy.strip() if isinstance(copy, str) and copy.strip() else None for copy in copies]
+        return (copies + [None] * len(batch))[: len(batch)]
+
+    async def write(self, notifications: list[Notification]):
+        """Fills in `message` for every notification."""
+        missing: dict[tuple, list[Notification]] = {}
+        for notification in notifications:
+            key = self._cache_key(notification)
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+                notification.message = cached
+            else:
+                # Identical notifications in one flush share a single prompt item.
+                missing.setdefault(key, []).append(notification)
+        keys = list(missing)
+        if self._model_factory is not None and keys:
+            # Building the model can import and construct the whole agent; keep it off the loop.
+            try:
+                self.model = await asyncio.to_thread(self._model_factory)
+                self._model_factory = None
+            except Exception:
+                pass  # fallback messages this time; the next flush tries again
+        if self.model is not None and keys:
+            chunks = [keys[i : i + self.items_per_prompt] for i in range(0, len(keys), self.items_per_prompt)]
+            results = await asyncio.gather(*(self._complete([missing[key][0] for key in chunk]) for chunk in chunks))
+            for chunk, copies in zip(chunks, results):
+                for key, copy in zip(chunk, copies):
+                    if copy is None:
+                        continue
+                    self._cache[key] = copy
+                    for notification in missing[key]:
+                        notification.message = copy
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        for notification in notifications:
+            if notification.message is None:
+                self.fallbacks += 1
+                notification.message = notification.fallback or f"'{notification.title}' is waiting for you."
+
+
+class NotificationPipeline:
+    """Dedups, batches and delivers notifications.
+
+    Args:
+        writer (CopyWriter): Writes the copy.
+        sinks (list[Sink]): Every delivery goes to each sink.
+        flush_interval (float): Seconds notifications wait to be batched.
+        batch_size (int): Waiting notifications that trigger an early flush.
+        dedup_window (float): Seconds in which a repeat of the same (user, task, kind) is dropped.
+    """
+
+    def __init__(
+        self,
+        writer: CopyWriter,
+        sinks: list[Sink],
+        flush_interval: float = 2.0,
+        batch_size: int = 200,
+        dedup_window: float = 6 * 3600,
+    ):
+        self.writer = writer
+        self.sinks = sinks
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.dedup_window = dedup_window
+        self.submitted = 0
+        self.duplicates = 0
+        self.delivered = 0
+        self.failed_deliveries = 0
+        self._lock = threading.Lock()
+        self._pending: dict[str, list[Notification]] = {}
+        self._count = 0
+        self._seen: "OrderedDict[tuple, float]" = OrderedDict()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_env(cls, model=None) -> "NotificationPipeline":
+        """Builds a pipeline from the DOABLE_NOTIFY_* environment variables.
+
+        Deliveries go to DOABLE_NOTIFY_WEBHOOK if set, and to the DOABLE_NOTIFY_FILE
+        JSON-lines file (default `notifications.jsonl` next to DOABLE_DB_FILE; empty
+        disables it).
+        DOABLE_NOTIFY_MODEL=0 skips the model and sends the fallback messages.
+        """
+        if os.getenv("DOABLE_NOTIFY_MODEL", "1") == "0":
+            model = None
+        sinks: list[Sink] = []
+        if os.getenv("DOABLE_NOTIFY_WEBHOOK"):
+            sinks.append(WebhookSink(os.environ["DOABLE_NOTIFY_WEBHOOK"]))
+        data_dir = os.path.dirname(os.path.abspath(os.getenv("DOABLE_DB_FILE", "my_os.db")))
+        path = os.getenv("DOABLE_NOTIFY_FILE", os.path.join(data_dir, "notifications.jsonl"))
+        if path:
+            sinks.append(FileSink(path))
+        return cls(
+            CopyWriter(model, items_per_prompt=int(os.getenv("DOABLE_NOTIFY_ITEMS_PER_PROMPT", "25"))),
+            sinks,
+            flush_interval=float(os.getenv("DOABLE_NOTIFY_FLUSH_INTERVAL", "2")),
+            dedup_window=float(os.getenv("DOABLE_NOTIFY_DEDUP_WINDOW", str(6 * 3600))),
+        )
+
+    def submit(self, notifications: list[Notification]) -> int:
+        """Queues notifications; safe to call from any thread.
+
+        Returns:
+            int: Notifications accepted (not dropped as duplicates).
+        """
+        now = time.time()
+        accepted = 0
+        with self._lock:
+            while self._seen and next(iter(self._seen.values())) <= now:
+                self._seen.popitem(last=False)
+            for notification in notifications:
+                self.submitted += 1
+                if notification.dedup_key in self._seen:
+                    self.duplicates += 1
+                    continue
+                self._seen[notification.dedup_key] = now + self.dedup_window
+                self._pending.setdefault(notification.user_id, []).append(notification)
+                accepted += 1
+            self._count += accepted
+            full = self._count >= self.batch_size
+        if full and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+        return accepted
+
+    def submit_task_events(self, events: list[dict]):
+        """`task_timers` subscriber: turns fired transitions into notifications."""
+        self.submit(
+            [
+                Notification(
+                    user_id=event["userId"],
+                    task_id=event["taskId"],
+                    kind=event["type"],
+                    title=event["title"],
+                    fallback=event.get("message"),
+                )
+                for event in events
+            ]
+        )
+
+    async def flush(self) -> int:
+        """Writes and delivers everything pending. Returns the number of users served."""
+        with self._lock:
+            pending, self._pending, self._count = self._pending, {}, 0
+        if not pending:
+            return 0
+        with span("notify", "flush"):
+            await self.writer.write([n for batch in pending.values() for n in batch])
+            deliveries = [
+                sink.deliver(user_id, [n.to_dict() for n in batch])
+                for user_id, batch in pending.items()
+                for sink in self.sinks
+            ]
+            for result in await asyncio.gather(*deliveries, return_exceptions=True):
+                if isinstance(result, BaseException):
+                    self.failed_deliveries += 1
+                else:
+                    self.delivered += 1
+        return len(pending)
+
+    def start(self):
+        """Starts the periodic flush on the running event loop."""
+        if self._task is None:
+            self._loop = asyncio.get_running_loop()
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stops the flush loop after delivering what is pending."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = self._loop = None
+        await self.flush()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "submitted": self.submitted,
+            "duplicates": self.duplicates,
+            "pending": self._count,
+            "delivered": self.delivered,
+            "failed_deliveries": self.failed_deliveries,
+            "model_calls": self.writer.model_calls,
+            "cache_hits": self.writer.cache_hits,
+            "fallbacks": self.writer.fallbacks,
+        }
+
+
+def notification_from_dict(data: dict, user_id: Optional[str] = None) -> Notification:
+    """Builds a notification from a `{taskId|_id, title, kind, why, goal}` record."""
+    kind = data.get("kind", "ignored")
+    if kind not in KINDS:
+        raise ValueError(f"Unknown notification kind '{kind}'. Known kinds: {', '.join(KINDS)}")
+    return Notification(
+        user_id=str(data.get("userId") or user_id or DEFAULT_USER),
+        task_id=str(data.get("taskId") or data["_id"]),
+        kind=kind,
+        title=data["title"],
+        why=data.get("why"),
+        goal=data.get("goal"),
+        fallback=data.get("message"),
+    )
@@ -0,0 +1,128 @@
+from datetime import datetime, timezone
+from typing import Optional
+
+import numpy as np
+
+from calendar_store import parse_time
+from response_cache import hashing_embedder
+
+# Scores a whole task list at once: every feature is a NumPy column, so a
+# 10k-task backlog is ranked in one vectorized pass instead of one model
+# prompt per task. Tasks use the field names of the `Task` model.
+
+QUADRANTS = (
+    "Urgent & Important",
+    "Not Urgent & Important",
+    "Urgent & Not Important",
+    "Not Urgent & Not Important",
+)
+HOUR = 3600.0
+# Slack (hours left after doing the work) at which due-date urgency is 0.5.
+URGENT_SLACK_HOURS = 48.0
+# Urgency of tasks without a due date.
+UNDATED_URGENCY = 0.1
+# Urgency added by a recent delay, halving every DELAY_HALF_LIFE_DAYS.
+DELAY_BOOST = 0.25
+DELAY_HALF_LIFE_DAYS = 3.0
+THRESHOLD = 0.5
+# Suggested `priority` (5 is highest) per quadrant, so priorities agree with the ranking.
+QUADRANT_PRIORITY = np.array([5, 4, 2, 1])
+
+
+def _timestamps(tasks: list[dict], field: str) -> np.ndarray:
+    return np.array(
+        [parse_time(task[field]).timestamp() if task.get(field) else np.nan for task in tasks],
+        dtype=float,
+    )
+
+
+def _why_similarity(tasks: list[dict], user_why: str) -> np.ndarray:
+    """Cosine similarity of each task's title and "why" to the user's stated why, clipped at 0."""
+    goal = np.array(hashing_embedder(user_why))
+    goal /= np.linalg.norm(goal) or 1.0
+    texts = np.array([hashing_embedder(f"{task.get('title', '')} {task.get('why') or ''}") for task in tasks])
+    norms = np.linalg.norm(texts, axis=1)
+    norms[norms == 0] = 1.0
+    return np.clip(texts @ goal / norms, 0.0, 1.0)
+
+
+def score_tasks(tasks: list[dict], user_why: Optional[str] = None, now: Optional[datetime] = None) -> dict:
+    """Computes urgency, importance, Eisenhower quadrant and a suggested priority per task.
+
+    - Urgency rises as the slack before `dueDate`, after `effortEstimateMins`
+      of work, shrinks (a logistic curve, 0.5 at two days), and gets a boost
+      that fades over a few days after `lastDelayedAt`.
+    - Importance combines the task's `priority`, whether it has a `why`, and
+      how close its title and why are to the user's stated why.
+
+    Args:
+        tasks (list[dict]): Open tasks with `title` and optionally `_id`, `priority`, `dueDate`, `effortEstimateMins`, `lastDelayedAt` and `why`.
+        user_why (str): The user's overarching "why"; tasks aligned with it count as more important.
+        now (datetime): Reference time. Defaults to the current time.
+
+    Returns:
+        dict: Column arrays `urgency`, `importance`, `score`, `quadrant` (index into QUADRANTS), `priority` and `order` (task indexes, best first).
+    """
+    now_ts = (now or datetime.now(timezone.utc)).timestamp()
+    count = len(tasks)
+    due = _timestamps(tasks, "dueDate")
+    delayed = _timestamps(tasks, "lastDelayedAt")
+    effort_hours = np.array([task.get("effortEstimateMins") or 30 for task in tasks], dtype=float) / 60
+    priority = np.clip(np.array([task.get("priority") or 3 for task in tasks], dtype=float), 1, 5)
+    has_why = np.array([bool(task.get("why")) for task in tasks], dtype=float)
+
+    slack = (due - now_ts) / HOUR - effort_hours
+    with np.errstate(over="ignore", invalid="ignore"):
+        urgency = 1.0 / (1.0 + np.exp((slack - URGENT_SLACK_HOURS) / (URGENT_SLACK_HOURS / 4)))
+    urgency = np.where(np.isnan(due), UNDATED_URGENCY, urgency)
+    days_since_delay = (now_ts - delayed) / (24 * HOUR)
+    delay = np.where(np.isnan(delayed), 0.0, DELAY_BOOST * np.exp2(-np.clip(days_since_delay, 0, None) / DELAY_HALF_LIFE_DAYS))
+    urgency = np.clip(urgency + delay, 0.0, 1.0)
+
+    alignment = _why_similarity(tasks, user_why) if user_why and count else 0.5 * has_why
+    importance = np.clip(0.7 * (priority - 1) / 4 + 0.1 * has_why + 0.2 * alignment, 0.0, 1.0)
+
+    urgent = urgency >= THRESHOLD
+    important = importance >= THRESHOLD
+    quadrant = np.where(important, np.where(urgent, 0, 1), np.where(urgent, 2, 3))
+    score = 0.55 * importance + 0.45 * urgency
+    # Quadrant first (do, schedule, delegate, drop), then score; ties keep input order.
+    order = np.lexsort((np.arange(count), -score, quadrant))
+    return {
+        "urgency": urgency,
+        "importance": importance,
+        "score": score,
+        "quadrant": quadrant,
+        "priority": QUADRANT_PRIORITY[quadrant],
+        "order": order,
+    }
+
+
+def rank_tasks(
+    tasks: list[dict],
+    user_why: Optional[str] = None,
+    now: Optional[datetime] = None,
+    limit: Optional[int] = None,
+) -> list[dict]:
+    """Returns tasks in ranked order with their quadrant, suggested priority and scores.
+
+    Completed tasks are left out.
+    """
+    open_tasks = [task for task in tasks if not task.get("isCompleted")]
+    scores = score_tasks(open_tasks, user_why, now)
+    ranked = []
+    for rank, index in enumerate(scores["order"][:limit].tolist(), start=1):
+        task = open_tasks[index]
+        ranked.append(
+            {
+                "rank": rank,
+                "_id": task.get("_id"),
+                "title": task.get("title"),
+                "eisenhowerQuadrant": QUADRANTS[scores["quadrant"][index]],
+                "priority": int(scores["priority"][index]),
+                "urgency": round(float(scores["urgency"][index]), 3),
+                "importance": round(float(scores["importance"][index]), 3),
+                "score": round(float(scores["score"][index]), 3),
+            }
+        )
+    return ranked
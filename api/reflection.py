@@ -0,0 +1,170 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+from calendar_store import DEFAULT_USER, calendar_store, format_time, parse_time
+from storage import apply_sqlite_pragmas
+
+# Incremental self-reflection for `verify_task_completion`.
+#
+# Each task (per user) keeps its reflection state in the sessions database:
+# how many steps were checked, a hash chain over them, the side-effect claims
+# found in them and the last verdict. A call only checks the steps added since
+# the previous one; if nothing was added and the calendar has not changed, the
+# stored verdict is returned as is. Claims are re-checked only when the
+# calendar changed, so the cost follows the delta, not the run's history.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS doable_reflections (
+    key TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    task TEXT NOT NULL,
+    steps INTEGER NOT NULL,
+    digest TEXT NOT NULL,
+    claims TEXT NOT NULL,
+    verdict TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+# A step claims a calendar write when it says something was scheduled, booked
+# or added to the calendar (or names a booking tool) and names the event
+# ('quoted') and/or its start time (ISO format). "Add" alone is too common
+# ("added a note") to count without the calendar next to it.
+_BOOKING = re.compile(
+    r"\b(?:(?:re)?schedul(?:ed|ing)|book(?:ed|ing)|schedule_(?:meeting|tasks?))\b"
+    r"|\badd(?:ed|ing)?\b[^.;\n]{0,80}?\b(?:to|in|on|onto)\s+(?:the\s+|your\s+|my\s+|their\s+)?calendar\b",
+    re.IGNORECASE,
+)
+_QUOTED = re.compile(r"'([^']+)'|\"([^\"]+)\"")
+_ISO_TIME = re.compile(r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:Z|[+-]\d{2}:?\d{2})?")
+
+
+def _chain(digest: str, steps: list[str]) -> str:
+    for step in steps:
+        digest = hashlib.sha1(f"{digest}\0{step}".encode()).hexdigest()
+    return digest
+
+
+def extract_claim(step: str) -> Optional[dict]:
+    """Returns the calendar event a step claims to have created, or None."""
+    if not _BOOKING.search(step):
+        return None
+    quoted = _QUOTED.search(step)
+    title = (quoted.group(1) or quoted.group(2)) if quoted else None
+    timestamp = _ISO_TIME.search(step)
+    start = None
+    if timestamp:
+        try:
+            start = parse_time(timestamp.group(0)).timestamp()
+        except ValueError:
+            pass
+    if title is None and start is None:
+        return None
+    return {"title": title, "start": start}
+
+
+def _check(claim: dict, user_id: str) -> bool:
+    start = datetime.fromtimestamp(claim["start"], timezone.utc) if claim["start"] is not None else None
+    return calendar_store.find_event(claim["title"], start, user_id) is not None
+
+
+def _describe(claim: dict) -> str:
+    parts = []
+    if claim["title"]:
+        parts.append(f"'{claim['title']}'")
+    if claim["start"] is not None:
+        parts.append(f"at {format_time(claim['start'])}")
+    return " ".join(parts)
+
+
+class ReflectionStore:
+    """Per-task reflection state in SQLite.
+
+    The verdict for a task is cached in memory together with the step hash
+    chain and `calendar_store.version` it was computed for; the row is still
+    read on every call, so steps recorded by other processes are noticed.
+    """
+
+    def __init__(self, db_file: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_file, check_same_thread=False, timeout=30)
+        apply_sqlite_pragmas(self._conn)
+        self._conn.executescript(SCHEMA)
+        self._checked: dict[str, tuple[str, int]] = {}
+
+    @staticmethod
+    def key(task: str, user_id: str) -> str:
+        return hashlib.sha1(f"{user_id}\0{task.strip()}".encode()).hexdigest()
+
+    def verify(self, task: str, steps: list[str], user_id: str = DEFAULT_USER) -> dict:
+        """Checks the steps added since the last call for this task.
+
+        `steps` may be just the new steps or the full list again: when it
+        starts with the steps already checked, those are skipped.
+
+        Returns:
+            dict: `verified`, a short `reflection`, the `issues` found so far,
+            `checked_steps` (new in this call), `total_steps` and `cached`.
+        """
+        key = self.key(task, user_id)
+        calendar_store.refresh()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT steps, digest, claims, verdict FROM doable_reflections WHERE key = ?", (key,)
+            ).fetchone()
+            total, digest, claims, verdict = (row[0], row[1], json.loads(row[2]), json.loads(row[3])) if row else (0, "", [], None)
+
+            new_steps = steps
+            if total and len(steps) >= total and _chain("", steps[:total]) == digest:
+                new_steps = steps[total:]
+            version = calendar_store.version
+            if not new_steps and verdict is not None and self._checked.get(key) == (digest, version):
+                return {**verdict, "checked_steps": 0, "cached": True}
+
+            if self._checked.get(key, (None, None))[1] != version:
+                # The calendar changed since the last check: earlier claims may no longer hold.
+                for claim in claims:
+                    claim["ok"] = _check(claim, user_id)
+            for offset, step in enumerate(new_steps):
+                claim = extract_claim(step)
+                if claim is not None:
+                    claim["step"] = total + offset + 1
+                    claim["ok"] = _check(claim, user_id)
+                    claims.append(claim)
+            total += len(new_steps)
+            digest = _chain(digest, new_steps)
+
+            issues = [
+                f"Step {claim['step']} says {_describe(claim)} was scheduled, but it is not in the calendar."
+                for claim in claims
+                if not claim["ok"]
+            ]
+            if not total:
+                issues.append("No steps were reported.")
+            verdict = {
+                "verified": not issues,
+                "reflection": f"Target: {task}. {total} step(s) checked; "
+                + (" ".join(issues) if issues else "everything checks out."),
+                "issues": issues,
+                "total_steps": total,
+            }
+            with self._conn:
+                self._conn.execute(
+                    "INSERT INTO doable_reflections (key, user_id, task, steps, digest, claims, verdict, updated_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+                    " ON CONFLICT (key) DO UPDATE SET steps = excluded.steps, digest = excluded.digest,"
+                    " claims = excluded.claims, verdict = excluded.verdict, updated_at = excluded.updated_at",
+                    (key, user_id, task, total, digest, json.dumps(claims), json.dumps(verdict), time.time()),
+                )
+            self._checked[key] = (digest, version)
+            return {**verdict, "checked_steps": len(new_steps), "cached": False}
+
+
+reflection_store = ReflectionStore(os.getenv("DOABLE_DB_FILE", "my_os.db"))
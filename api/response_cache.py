@@ -0,0 +1,183 @@
+import hashlib
+import math
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Optional, Sequence
+
+# An embedder maps a prompt to a dense vector. Anything local works here
+# (sentence-transformers, fastembed, ...); `hashing_embedder` is the
+# dependency-free default.
+Embedder = Callable[[str], Sequence[float]]
+
+_WHITESPACE = re.compile(r"\s+")
+_TRAILING_PUNCTUATION = re.compile(r"[\s?!.,;:]+$")
+_WORD = re.compile(r"\w+")
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Case-folds the prompt and collapses whitespace and trailing punctuation."""
+    prompt = _WHITESPACE.sub(" ", prompt.casefold()).strip()
+    return _TRAILING_PUNCTUATION.sub("", prompt)
+
+
+def hashing_embedder(text: str, dimensions: int = 256) -> list[float]:
+    """Embeds text by hashing its words and word bigrams into a fixed vector.
+
+    Args:
+        text (str): Text to embed.
+        dimensions (int): Size of the output vector.
+    """
+    words = _WORD.findall(text.casefold())
+    features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    vector = [0.0] * dimensions
+    for feature in features:
+        digest = hashlib.blake2b(feature.encode(), digest_size=8).digest()
+        bucket = int.from_bytes(digest[:4], "little") % dimensions
+        vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+    return vector
+
+
+def _unit(vector: Sequence[float]) -> list[float]:
+    norm = math.sqrt(sum(v * v for v in vector))
+    return [v / norm for v in vector] if norm else list(vector)
+
+
+@dataclass
+class _Entry:
+    scope: str
+    response: str
+    expires_at: float
+    vector: Optional[list[float]] = None
+
+
+class ResponseCache:
+    """LRU + TTL cache for assistant replies.
+
+    Entries are keyed on the normalized prompt, the caller's scope
+    (user/session) and the cache generation. The generation is bumped by
+    `invalidate()` whenever a tool mutates state the answers may depend on
+    (e.g. the calendar), which drops every cached reply at once.
+
+    When an embedder is configured, a miss on the exact key falls back to the
+    most similar cached prompt in the same scope, if its cosine similarity is
+    at least `similarity_threshold`.
+
+    Safe to use from several threads: calendar listeners call `invalidate()`
+    from the tool pool while the event loop serves lookups.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        ttl_seconds: float = 300.0,
+        embedder: Optional[Embedder] = None,
+        similarity_threshold: float = 0.92,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.embedder = embedder
+        self.similarity_threshold = similarity_threshold
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+
+    @classmethod
+    def from_env(cls) -> "ResponseCache":
+        """Builds a cache from the DOABLE_CACHE_* environment variables."""
+        threshold = os.getenv("DOABLE_CACHE_SIMILARITY")
+        return cls(
+            max_entries=int(os.getenv("DOABLE_CACHE_SIZE", "512")),
+            ttl_seconds=float(os.getenv("DOABLE_CACHE_TTL", "300")),
+            embedder=hashing_embedder if threshold else None,
+            similarity_threshold=float(threshold) if threshold else 0.92,
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
+    def _key(self, prompt: str, scope: str) -> str:
+        raw = f"{self.generation}\x00{scope}\x00{normalize_prompt(prompt)}"
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def get(self, prompt: str, scope: str = "") -> Optional[str]:
+        """Returns a cached reply for the prompt, or None on a miss."""
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            key = self._key(prompt, scope)
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= now:
+                del self._entries[key]
+                entry = None
+            if entry is not None or self.embedder is None:
+                return self._record(key, entry)
+        # Embedding is the slow part; other threads keep using the cache meanwhile.
+        query = _unit(self.embedder(normalize_prompt(prompt)))
+        with self._lock:
+            return self._record(*self._nearest(query, scope, now))
+
+    def _record(self, key: Optional[str], entry: Optional[_Entry]) -> Optional[str]:
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.response
+
+    def _nearest(self, query: list[float], scope: str, now: float):
+        best_key, best_entry, best_score = None, None, self.similarity_threshold
+        for key, entry in self._entries.items():
+            if entry.scope != scope or entry.vector is None or entry.expires_at <= now:
+                continue
+            score = sum(a * b for a, b in zip(query, entry.vector))
+            if score >= best_score:
+                best_key, best_entry, best_score = key, entry, score
+        return best_key, best_entry
+
+    def put(self, prompt: str, response: str, scope: str = "", generation: Optional[int] = None):
+        """Caches a reply.
+
+        Args:
+            prompt (str): The user prompt.
+            response (str): The assistant reply.
+            scope (str): User/session context the reply belongs to.
+            generation (int): Generation observed before the run started. If
+                state was invalidated while the run was in flight the reply is
+                not cached.
+        """
+        if not self.enabled or not response:
+            return
+        vector = None
+        if self.embedder is not None:
+            vector = _unit(self.embedder(normalize_prompt(prompt)))
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            key = self._key(prompt, scope)
+            self._entries[key] = _Entry(scope, response, time.monotonic() + self.ttl_seconds, vector)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self):
+        """Drops every cached reply, e.g. after the calendar changed."""
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "generation": self.generation,
+            }
@@ -0,0 +1,130 @@
+import os
+import re
+from datetime import datetime, timedelta, timezone, tzinfo
+from typing import Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from calendar_store import DEFAULT_USER, format_time, parse_time
+from task_parser import parse_task_input
+from telemetry import span
+from tools import book_meeting, calendar_page
+
+# Deterministic fast path in front of the agent. Messages that are clearly one
+# of a few structured commands are answered straight from the calendar tools
+# in well under a millisecond; anything ambiguous returns None and goes to the
+# model. Routed turns are not written to the agent's session history.
+#
+# "Today" and "tomorrow" are the user's, in the time zone the request names
+# (UTC if it names none). Booking commands are only executed here when the
+# request says `commit`; otherwise they go to the agent, which confirms first.
+
+ENABLED = os.getenv("DOABLE_FAST_PATH", "1") != "0"
+
+_LIST = re.compile(
+    r"^(?:please\s+)?(?:list|show|get|what(?:'s| is) on)\s+(?:me\s+)?(?:my\s+)?"
+    r"(?:calendar|schedule|events|agenda|meetings)"
+    r"(?:\s+(?:for\s+)?(today|tomorrow|this week))?\s*[?.!]*$",
+    re.IGNORECASE,
+)
+_SCHEDULE = re.compile(r"^(?:please\s+)?(?:schedule|book)\s+(.+?)\s*[.!]*$", re.IGNORECASE)
+
+# Rewrites of everyday phrasing into the quick-add grammar of task_parser.
+_BARE_DATE = re.compile(
+    r"(?<![@\w])(?:on\s+)?(today|tomorrow|\d{4}-\d{2}-\d{2}|(?:mon|tue|wed|thu|fri|sat|sun)(?:[a-z]*day)?)\b",
+    re.IGNORECASE,
+)
+_AT_TIME = re.compile(r"(@\S+)\s+at\s+(?=\d)", re.IGNORECASE)
+_FOR_DURATION = re.compile(r"\bfor\s+(?=\d+\s*(?:h|hrs?|hours?|m|mins?|minutes?)(?![a-z]))", re.IGNORECASE)
+
+DEFAULT_MEETING_MINS = 30
+MAX_LISTED = 20
+
+
+def _zone(name: Optional[str]) -> Optional[tzinfo]:
+    if not name:
+        return timezone.utc
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return None
+
+
+def _list_events(user_id: str, period: Optional[str], zone: tzinfo) -> str:
+    now = datetime.now(zone)
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    period = (period or "").lower()
+    if period == "today":
+        start, end, label = today, today + timedelta(days=1), "today"
+    elif period == "tomorrow":
+        start, end, label = today + timedelta(days=1), today + timedelta(days=2), "tomorrow"
+    elif period == "this week":
+        start, end, label = today, today + timedelta(days=7), "this week"
+    else:
+        start, end, label = now, None, "from now on"
+    page = calendar_page(
+        user_id,
+        format_time(start.timestamp()),
+        format_time(end.timestamp()) if end else None,
+        limit=MAX_LISTED,
+    )
+    if not page["events"]:
+        return f"Your calendar is clear {label}."
+    lines = [f"Your calendar {label}:"]
+    lines += [
+        f"- **{e['event']}**: {parse_time(e['time']).astimezone(zone).isoformat()} ({e['duration_minutes']} min)"
+        for e in page["events"]
+    ]
+    if page["total"] > len(page["events"]):
+        lines.append(f"...and {page['total'] - len(page['events'])} more.")
+    return "\n".join(lines)
+
+
+def _schedule(user_id: str, text: str, zone: tzinfo) -> Optional[str]:
+    text = _BARE_DATE.sub(lambda m: "@" + m.group(1), text, count=1)
+    text = _FOR_DURATION.sub("", _AT_TIME.sub(r"\1 ", text))
+    task = parse_task_input(text, now=datetime.now(zone))
+    # Only a title plus a date and an explicit clock time is unambiguous enough to book directly.
+    if task.due_date is None or not task.has_time or task.title == "Untitled Task":
+        return None
+    return book_meeting(
+        user_id,
+        task.title,
+        task.due_date.astimezone(zone).isoformat(),
+        task.effort_estimate_mins or DEFAULT_MEETING_MINS,
+    )
+
+
+def route(
+    message: str,
+    user_id: Optional[str] = None,
+    timezone_name: Optional[str] = None,
+    commit: bool = False,
+) -> Optional[str]:
+    """Answers simple calendar commands without the model.
+
+    Args:
+        message (str): The user's message.
+        user_id (str): Whose calendar to use.
+        timezone_name (str): IANA time zone of the user, e.g. "Europe/Berlin". Defaults to UTC.
+        commit (bool): Book scheduling commands directly. Without it they go to the agent.
+
+    Returns:
+        Optional[str]: The reply, or None when the message needs the agent.
+    """
+    if not ENABLED:
+        return None
+    zone = _zone(timezone_name)
+    if zone is None:
+        # An unknown time zone makes "today" ambiguous; let the agent sort it out.
+        return None
+    user_id = user_id or DEFAULT_USER
+    message = message.strip()
+    match = _LIST.match(message)
+    if match:
+        with span("router", "list_calendar"):
+            return _list_events(user_id, match.group(1), zone)
+    match = _SCHEDULE.match(message)
+    if match and commit:
+        with span("router", "schedule"):
+            return _schedule(user_id, match.group(1), zone)
+    return None
@@ -0,0 +1,262 @@
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta, timezone
+from time import perf_counter
+from typing import Iterable, Optional
+from zoneinfo import ZoneInfo
+
+from calendar_store import parse_time
+
+DEFAULT_EFFORT_MINS = 30
+DEFAULT_PRIORITY = 3
+DEFAULT_WORKDAYS = "mon-fri"
+# Wall-clock budget of the `optimize` local search; the best plan found by then is returned.
+OPTIMIZE_SECONDS = 0.5
+
+_DAY_NAMES = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+
+@dataclass
+class PlanTask:
+    title: str
+    minutes: int
+    priority: int = DEFAULT_PRIORITY
+    due_ts: Optional[float] = None
+
+    @classmethod
+    def from_dict(cls, task: dict) -> "PlanTask":
+        """Reads a task shaped like the `Task` model (`effortEstimateMins`, `priority`, `dueDate`)."""
+        due = task.get("dueDate")
+        return cls(
+            title=task["title"],
+            minutes=int(task.get("effortEstimateMins") or DEFAULT_EFFORT_MINS),
+            priority=int(task.get("priority") or DEFAULT_PRIORITY),
+            due_ts=parse_time(due).timestamp() if due else None,
+        )
+
+
+def parse_working_hours(spec: str) -> tuple[time, time]:
+    """Parses "HH:MM-HH:MM" into a (start, end) pair."""
+    start, end = (time.fromisoformat(part.strip()) for part in spec.split("-"))
+    if end <= start:
+        raise ValueError(f"working hours must end after they start: {spec!r}")
+    return start, end
+
+
+def parse_workdays(spec: str) -> set[int]:
+    """Parses working days such as "mon-fri", "sun-thu" or "mon,wed,fri" into weekday numbers (Monday is 0)."""
+    days = set()
+    for part in spec.lower().replace(" ", "").split(","):
+        if not part:
+            continue
+        first, _, last = part.partition("-")
+        try:
+            a = _DAY_NAMES.index(first[:3])
+            b = _DAY_NAMES.index(last[:3]) if last else a
+        except ValueError:
+            raise ValueError(f"unknown working days {spec!r}, expected e.g. 'mon-fri' or 'mon,wed,fri'") from None
+        # Ranges may wrap around the week, e.g. "sat-wed".
+        days.update((a + i) % 7 for i in range((b - a) % 7 + 1))
+    if not days:
+        raise ValueError(f"no working days in {spec!r}")
+    return days
+
+
+def free_intervals(
+    window_start: datetime,
+    window_end: datetime,
+    busy: Iterable[tuple[float, float]],
+    working_hours: str = "09:00-17:00",
+    tz: str = "UTC",
+    weekdays: Iterable[int] = (0, 1, 2, 3, 4),
+) -> list[list[float]]:
+    """Sweeps working hours against busy intervals and returns the free gaps.
+
+    Args:
+        window_start (datetime): Start of the planning window.
+        window_end (datetime): End of the planning window.
+        busy (Iterable[tuple[float, float]]): Busy (start, end) timestamps, sorted by start.
+        working_hours (str): Daily working hours as "HH:MM-HH:MM" in `tz`.
+        tz (str): IANA time zone the working hours are expressed in.
+        weekdays (Iterable[int]): Working days, Monday is 0.
+    """
+    zone = ZoneInfo(tz)
+    day_start, day_end = parse_working_hours(working_hours)
+    weekdays = set(weekdays)
+    lo, hi = window_start.timestamp(), window_end.timestamp()
+
+    work = []
+    day = window_start.astimezone(zone).date()
+    while datetime.combine(day, day_start, zone).timestamp() < hi:
+        if day.weekday() in weekdays:
+            a = max(lo, datetime.combine(day, day_start, zone).timestamp())
+            b = min(hi, datetime.combine(day, day_end, zone).timestamp())
+            if b > a:
+                work.append((a, b))
+        day += timedelta(days=1)
+
+    busy = iter(busy)
+    current = next(busy, None)
+    free = []
+    for a, b in work:
+        cursor = a
+        while current is not None and current[0] < b:
+            if current[1] <= cursor:
+                current = next(busy, None)
+                continue
+            if current[0] > cursor:
+                free.append([cursor, current[0]])
+            cursor = max(cursor, current[1])
+            if current[1] >= b:
+                break
+            current = next(busy, None)
+        if cursor < b:
+            free.append([cursor, b])
+    return free
+
+
+class _Gaps:
+    """Free gaps in time order with a max-tree over their lengths.
+
+    `first_fit` finds the earliest gap holding a block in O(log m) instead of
+    scanning all m gaps, and taking a block from the front of a gap updates
+    the tree in O(log m).
+    """
+
+    def __init__(self, free: list[list[float]]):
+        self.starts = [a for a, _ in free]
+        self.ends = [b for _, b in free]
+        size = 1
+        while size < len(free):
+            size *= 2
+        self.size = size
+        self.tree = [0.0] * (2 * size)
+        for i, (a, b) in enumerate(free):
+            self.tree[size + i] = b - a
+        for node in range(size - 1, 0, -1):
+            self.tree[node] = max(self.tree[2 * node], self.tree[2 * node + 1])
+
+    def first_fit(self, needed: float) -> Optional[int]:
+        if self.tree[1] < needed:
+            return None
+        node = 1
+        while node < self.size:
+            node = 2 * node if self.tree[2 * node] >= needed else 2 * node + 1
+        return node - self.size
+
+    def take(self, i: int, needed: float) -> float:
+        start = self.starts[i]
+        self.starts[i] = start + needed
+        node = self.size + i
+        self.tree[node] = self.ends[i] - self.starts[i]
+        node //= 2
+        while node:
+            self.tree[node] = max(self.tree[2 * node], self.tree[2 * node + 1])
+            node //= 2
+        return start
+
+
+def _greedy(tasks: list[PlanTask], free: list[list[float]]):
+    """First-fit: each task takes the earliest gap that holds it.
+
+    The earliest fitting gap is also the one that ends the task soonest, so
+    no other gap could meet a due date it misses.
+    """
+    gaps = _Gaps(free)
+    placed, unplaced = [], []
+    for task in tasks:
+        needed = task.minutes * 60
+        choice = gaps.first_fit(needed)
+        if choice is None:
+            unplaced.append(task)
+            continue
+        start = gaps.take(choice, needed)
+        placed.append((task, start, start + needed))
+    return placed, unplaced
+
+
+def _score(placed, window_start: float) -> float:
+    score = 0.0
+    for task, start, end in placed:
+        late = task.due_ts is not None and end > task.due_ts
+        score += task.priority * (4 if late else 10)
+        # Prefer doing important work earlier in the window.
+        score -= task.priority * (start - window_start) / 3600 * 0.01
+    return score
+
+
+def _default_order(task: PlanTask):
+    return (task.due_ts if task.due_ts is not None else float("inf"), -task.priority, -task.minutes)
+
+
+def plan(
+    tasks: list[dict],
+    window_start: datetime,
+    window_end: datetime,
+    busy: Iterable[tuple[float, float]] = (),
+    working_hours: str = "09:00-17:00",
+    tz: str = "UTC",
+    mode: str = "greedy",
+    max_iterations: int = 2000,
+    workdays: str = DEFAULT_WORKDAYS,
+    max_seconds: float = OPTIMIZE_SECONDS,
+) -> dict:
+    """Packs tasks into the free working time of a window.
+
+    `greedy` orders tasks by due date, then priority, and places each one in
+    the earliest gap that fits. `optimize` starts from the greedy plan and
+    improves it by local search over the task order (adjacent swaps and
+    moves to the front), keeping the best-scoring plan found within
+    `max_iterations` evaluations or `max_seconds`, whichever comes first.
+    Working hours only count on `workdays` (see `parse_workdays`).
+
+    Returns:
+        dict: `scheduled` blocks, `unscheduled` tasks with a reason, and the plan `score`.
+    """
+    if mode not in ("greedy", "optimize"):
+        raise ValueError(f"unknown mode {mode!r}, expected 'greedy' or 'optimize'")
+    items = sorted((PlanTask.from_dict(task) for task in tasks), key=_default_order)
+    free = free_intervals(window_start, window_end, busy, working_hours, tz, parse_workdays(workdays))
+    origin = window_start.timestamp()
+
+    placed, unplaced = _greedy(items, free)
+    best = _score(placed, origin)
+    if mode == "optimize":
+        deadline = perf_counter() + max_seconds
+        order, iterations, improved = items, 0, True
+        while improved and iterations < max_iterations and perf_counter() < deadline:
+            improved = False
+            for i in range(1, len(order)):
+                for candidate in (
+                    order[: i - 1] + [order[i], order[i - 1]] + order[i + 1 :],
+                    [order[i]] + order[:i] + order[i + 1 :],
+                ):
+                    iterations += 1
+                    trial = _greedy(candidate, free)
+                    score = _score(trial[0], origin)
+                    if score > best + 1e-9:
+                        order, (placed, unplaced), best, improved = candidate, trial, score, True
+                        break
+                if improved or iterations >= max_iterations or perf_counter() >= deadline:
+                    break
+
+    def fmt(ts: float) -> str:
+        return datetime.fromtimestamp(ts, timezone.utc).isoformat()
+
+    return {
+        "scheduled": [
+            {
+                "title": task.title,
+                "start": fmt(start),
+                "end": fmt(end),
+                "duration_minutes": task.minutes,
+                "priority": task.priority,
+                "late": task.due_ts is not None and end > task.due_ts,
+            }
+            for task, start, end in sorted(placed, key=lambda block: block[1])
+        ],
+        "unscheduled": [
+            {"title": task.title, "reason": f"no free slot of {task.minutes} mins in the window"}
+            for task in unplaced
+        ],
+        "score": round(best, 3),
+    }
@@ -0,0 +1,91 @@
+import argparse
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+
+logger = logging.getLogger("doable.serving")
+
+
+class InFlightRuns:
+    """Counts agent runs in progress so shutdown can wait for them."""
+
+    def __init__(self):
+        self.count = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    @asynccontextmanager
+    async def track(self):
+        self.count += 1
+        self._idle.clear()
+        try:
+            yield
+        finally:
+            self.count -= 1
+            if self.count == 0:
+                self._idle.set()
+
+    async def drain(self, timeout: float) -> bool:
+        """Waits up to `timeout` seconds for in-flight runs to finish.
+
+        Returns:
+            bool: True if every run finished in time.
+        """
+        if not self.count:
+            return True
+        logger.info("Draining %d in-flight agent run(s)", self.count)
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            logger.warning("Shutting down with %d agent run(s) still in flight", self.count)
+            return False
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run the Doable agent server.")
+    parser.add_argument("--host", default=os.getenv("DOABLE_HOST", "localhost"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("DOABLE_PORT", "8000")))
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.getenv("DOABLE_WORKERS", "0")),
+        help="Number of worker processes. 0 runs a single reloading dev server.",
+    )
+    parser.add_argument(
+        "--drain-timeout",
+        type=float,
+        default=float(os.getenv("DOABLE_DRAIN_TIMEOUT", "30")),
+        help="Seconds to wait for in-flight agent runs on shutdown.",
+    )
+    return parser.parse_args(argv)
+
+
+def serve(agent_os, app: str, argv=None):
+    """Starts uvicorn in dev (single reloading process) or production mode.
+
+    Production mode runs `--workers` processes without reload. Each worker
+    drains its in-flight runs on SIGTERM before exiting; uvicorn's graceful
+    shutdown timeout is set a little above the drain timeout so it does not
+    cut the drain short.
+    """
+    args = parse_args(argv)
+    # Workers re-import the app and only see the environment.
+    os.environ["DOABLE_DRAIN_TIMEOUT"] = str(args.drain_timeout)
+    if args.workers <= 0:
+        agent_os.serve(app=app, host=args.host, port=args.port, reload=True)
+        return
+    if args.workers > 1 and not os.getenv("DOABLE_DB_URL"):
+        logger.warning(
+            "Running %d workers on SQLite; set DOABLE_DB_URL to a Postgres database "
+            "for deployments that span several hosts.",
+            args.workers,
+        )
+    agent_os.serve(
+        app=app,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        timeout_graceful_shutdown=args.drain_timeout + 5,
+    )
@@ -0,0 +1,87 @@
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+# "import time:  self [us] | cumulative | imported package", as printed by -X importtime.
+_IMPORT_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+_READY_MARKER = "DOABLE_READY_MS="
+
+# Code run in the child interpreter: import the entry module, run its
+# readiness step, then report how long that took.
+_PROBE = """
+import time
+started = time.perf_counter()
+import {module}
+{ready}
+print("{marker}%.3f" % ((time.perf_counter() - started) * 1000))
+"""
+
+
+def _parse_importtime(stderr: str):
+    """Returns (per-module self/cumulative microseconds, per-top-level-package self microseconds)."""
+    modules = {}
+    packages: dict[str, int] = defaultdict(int)
+    for line in stderr.splitlines():
+        match = _IMPORT_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, _, name = match.groups()
+        modules[name] = (int(self_us), int(cumulative_us))
+        packages[name.split(".")[0]] += int(self_us)
+    return modules, packages
+
+
+def profile_startup(module: str, ready: str = "", top: int = 15) -> int:
+    """Profiles a cold start of `module` in a fresh interpreter.
+
+    Prints the time-to-ready, the most expensive top-level packages (by
+    self time, so nested imports are not double counted) and the modules
+    with the largest cumulative import time. If `DOABLE_STARTUP_BUDGET_MS`
+    is set, the exit status is 1 when time-to-ready exceeds it, so the
+    budget can be enforced in CI.
+
+    Args:
+        module (str): Entry module to import, e.g. "mcp_server".
+        ready (str): Statement run after the import that completes startup.
+        top (int): Number of rows in each table.
+
+    Returns:
+        int: Process exit status.
+    """
+    probe = _PROBE.format(module=module, ready=ready, marker=_READY_MARKER)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", probe],
+        capture_output=True,
+        text=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    ready_ms = None
+    for line in result.stdout.splitlines():
+        if line.startswith(_READY_MARKER):
+            ready_ms = float(line[len(_READY_MARKER):])
+    if result.returncode != 0 or ready_ms is None:
+        print(result.stderr[-4000:], file=sys.stderr)
+        print(f"{module} failed to start (exit status {result.returncode})", file=sys.stderr)
+        return result.returncode or 1
+
+    modules, packages = _parse_importtime(result.stderr)
+    total_ms = sum(packages.values()) / 1000
+    print(f"Startup profile for {module}")
+    print(f"  time to ready:   {ready_ms:9.1f} ms")
+    print(f"  import time:     {total_ms:9.1f} ms across {len(modules)} modules")
+    print()
+    print(f"  {'package':<32}{'self ms':>10}{'share':>8}")
+    for name, self_us in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        print(f"  {name:<32}{self_us / 1000:10.1f}{self_us / 1000 / total_ms:8.0%}")
+    print()
+    print(f"  {'module':<48}{'cumulative ms':>14}")
+    for name, (_, cumulative_us) in sorted(modules.items(), key=lambda item: -item[1][1])[:top]:
+        print(f"  {name:<48}{cumulative_us / 1000:14.1f}")
+
+    budget = os.getenv("DOABLE_STARTUP_BUDGET_MS")
+    if budget and ready_ms > float(budget):
+        print(f"\nOver budget: {ready_ms:.1f} ms > {float(budget):.1f} ms", file=sys.stderr)
+        return 1
+    return 0
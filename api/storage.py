@@ -0,0 +1,147 @@
+import asyncio
+import os
+import time
+from typing import Optional
+
+# Applied to every SQLite connection that touches the sessions database.
+# WAL lets readers proceed while a session row is being written, and
+# busy_timeout makes concurrent writers wait instead of failing with
+# "database is locked".
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": "5000",
+    "cache_size": "-16000",
+    "temp_store": "MEMORY",
+    "mmap_size": "134217728",
+}
+
+
+def apply_sqlite_pragmas(connection):
+    """Applies SQLITE_PRAGMAS to a DB-API connection."""
+    cursor = connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, str(default)))
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, str(default)))
+
+
+class ServingDbMixin:
+    """Makes an agno async DB safe and cheap to share between concurrent runs.
+
+    - Table lookups are serialized per table type. agno reflects tables lazily
+      into a shared MetaData on first use, and concurrent first requests can
+      otherwise observe a half-loaded table and drop their session write.
+    - Span rows are buffered and written in one transaction per batch by a
+      background flusher, and metrics roll-ups run in the background on a
+      fixed interval, with concurrent refresh requests sharing one
+      computation. Session and memory writes are left untouched so the next
+      turn always sees them.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.span_batch_size = _env_int("DOABLE_SPAN_BATCH_SIZE", 100)
+        self.flush_interval = _env_float("DOABLE_SPAN_FLUSH_INTERVAL", 2.0)
+        self.metrics_interval = _env_float("DOABLE_METRICS_INTERVAL", 300)
+        self._pending_spans: list = []
+        self._flusher: Optional[asyncio.Task] = None
+        self._metrics_run: Optional[asyncio.Task] = None
+        self._metrics_at = time.monotonic()
+        self._table_locks: dict[str, asyncio.Lock] = {}
+
+    async def _get_table(self, table_type: str, create_table_if_not_found: Optional[bool] = False):
+        lock = self._table_locks.setdefault(table_type, asyncio.Lock())
+        async with lock:
+            return await super()._get_table(table_type, create_table_if_not_found=create_table_if_not_found)
+
+    def _ensure_flusher(self):
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.get_running_loop().create_task(self._flush_loop())
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+            if self.metrics_interval and time.monotonic() - self._metrics_at >= self.metrics_interval:
+                await self.calculate_metrics()
+
+    async def flush(self):
+        """Writes all buffered span rows."""
+        while self._pending_spans:
+            batch = self._pending_spans[: self.span_batch_size]
+            del self._pending_spans[: self.span_batch_size]
+            await super().create_spans(batch)
+
+    async def create_span(self, span) -> None:
+        await self.create_spans([span])
+
+    async def create_spans(self, spans) -> None:
+        self._pending_spans.extend(spans)
+        self._ensure_flusher()
+
+    async def upsert_session(self, *args, **kwargs):
+        self._ensure_flusher()
+        return await super().upsert_session(*args, **kwargs)
+
+    async def calculate_metrics(self):
+        if self._metrics_run is None or self._metrics_run.done():
+            self._metrics_at = time.monotonic()
+            self._metrics_run = asyncio.get_running_loop().create_task(super().calculate_metrics())
+        return await asyncio.shield(self._metrics_run)
+
+    async def close(self) -> None:
+        if self._flusher is not None:
+            self._flusher.cancel()
+        await self.flush()
+        await super().close()
+
+
+def create_db():
+    """Builds the AgentOS sessions database from the environment.
+
+    `DOABLE_DB_URL` selects Postgres (e.g. `postgresql+psycopg://...`), which
+    is what multi-worker deployments should use. Otherwise a WAL-mode SQLite
+    file at `DOABLE_DB_FILE` (default `my_os.db`) is used. Both go through a
+    bounded SQLAlchemy connection pool sized by `DOABLE_DB_POOL_SIZE`,
+    `DOABLE_DB_MAX_OVERFLOW` and `DOABLE_DB_POOL_TIMEOUT`.
+    """
+    from sqlalchemy import event
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    pool = {
+        "pool_size": _env_int("DOABLE_DB_POOL_SIZE", 5),
+        "max_overflow": _env_int("DOABLE_DB_MAX_OVERFLOW", 10),
+        "pool_timeout": _env_float("DOABLE_DB_POOL_TIMEOUT", 30),
+    }
+
+    db_url = os.getenv("DOABLE_DB_URL")
+    if db_url:
+        from agno.db.postgres import AsyncPostgresDb
+
+        class ServingPostgresDb(ServingDbMixin, AsyncPostgresDb):
+            pass
+
+        engine = create_async_engine(db_url, pool_pre_ping=True, pool_recycle=1800, **pool)
+        return ServingPostgresDb(db_engine=engine)
+
+    from agno.db.sqlite import AsyncSqliteDb
+
+    class ServingSqliteDb(ServingDbMixin, AsyncSqliteDb):
+        pass
+
+    db_file = os.path.abspath(os.getenv("DOABLE_DB_FILE", "my_os.db"))
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{db_file}",
+        connect_args={"timeout": 30},
+        **pool,
+    )
+    event.listen(engine.sync_engine, "connect", lambda connection, _: apply_sqlite_pragmas(connection))
+    return ServingSqliteDb(db_engine=engine, db_file=db_file)
@@ -0,0 +1,177 @@
+import re
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional
+
+from calendar_store import format_time
+
+# Python port of `parseTaskInput` in lib/task-parser.ts, the quick-add grammar:
+#   "Write report +Work #writing @fri 4pm 1h30m"
+# +project, #tag, @date with an optional time, and a time estimate. Naive
+# dates and times are UTC, like everywhere else on the Python side.
+
+# One pass over the input: each match is the first alternative that fits at
+# that position, and whatever no token claims is the title. A time after
+# @date needs ":MM" or am/pm ("4pm", "10:30"), as in the TypeScript parser, so
+# "@tomorrow 15 min" is a date plus an estimate, not 15:00.
+_TOKEN = re.compile(
+    r"\+(?P<project>\S+)"
+    r"|#(?P<tag>\w+)"
+    r"|@(?P<date>\d{4}-\d{2}-\d{2}|\w+)"
+    r"(?:\s+(?=\d{1,2}(?::\d{2}|\s*(?:am|pm)\b))(?P<hour>\d{1,2})(?::(?P<minute>\d{2}))?(?!:)\s*(?P<period>am|pm)?\b"
+    r"(?!\s*(?:h|hrs?|hours?|m|mins?|minutes?)(?![a-z])))?"
+    r"|\b(?P<amount>\d+)\s*(?P<unit>h|hrs?|hours?|m|mins?|minutes?)(?![a-z])"
+    r"(?:\s*(?P<extra>\d+)\s*(?:m|mins?|minutes?)(?![a-z]))?",
+    re.IGNORECASE,
+)
+# List markers of pasted backlogs: "- ", "* ", "1. ", "[ ] ", "- [x] ".
+_BULLET = re.compile(r"^\s*(?:[-*\u2022]|\d+[.)])?\s*(?:\[[ xX]?\]\s*)?")
+_SPACES = re.compile(r"\s{2,}")
+
+DAY_NAMES = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+
+@dataclass
+class ParsedTask:
+    title: str
+    project_id: Optional[str] = None
+    due_date: Optional[datetime] = None
+    # Whether a time of day was given, not just a date.
+    has_time: bool = False
+    effort_estimate_mins: Optional[int] = None
+    tags: list[str] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        """Returns the task with the field names of the `Task` model."""
+        data = {"title": self.title, "tags": self.tags}
+        if self.project_id is not None:
+            data["projectId"] = self.project_id
+        if self.due_date is not None:
+            data["dueDate"] = format_time(self.due_date.timestamp())
+        if self.effort_estimate_mins is not None:
+            data["effortEstimateMins"] = self.effort_estimate_mins
+        return data
+
+
+class ProjectIndex:
+    """Case-insensitive project title -> id lookup, built once per batch."""
+
+    def __init__(self, projects: Iterable[dict] = ()):
+        self._ids = {project["title"].casefold(): project["_id"] for project in projects}
+
+    def get(self, name: str) -> Optional[str]:
+        return self._ids.get(name.casefold())
+
+
+def midnight(now: Optional[datetime] = None) -> datetime:
+    """Start of the day of `now`, in its time zone (UTC if `now` is omitted or naive)."""
+    now = now or datetime.now(timezone.utc)
+    if now.tzinfo is None:
+        now = now.replace(tzinfo=timezone.utc)
+    return now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def parse_date(value: str, today: datetime) -> Optional[datetime]:
+    """Resolves "today", "tomorrow", a day name (next occurrence) or YYYY-MM-DD to midnight in `today`'s time zone."""
+    lower = value.lower()
+    if lower == "today":
+        return today
+    if lower == "tomorrow":
+        return today + timedelta(days=1)
+    for index, name in enumerate(DAY_NAMES):
+        if lower == name or (len(lower) > 3 and lower.startswith(name) and lower.endswith("day")):
+            return today + timedelta(days=(index - today.weekday() - 1) % 7 + 1)
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").replace(tzinfo=today.tzinfo)
+    except ValueError:
+        return None
+
+
+def to_hours(hour: str, minute: Optional[str], period: Optional[str]) -> Optional[tuple[int, int]]:
+    hours, minutes = int(hour), int(minute or 0)
+    period = (period or "").lower()
+    if period == "pm" and hours != 12:
+        hours += 12
+    if period == "am" and hours == 12:
+        hours = 0
+    if hours > 23 or minutes > 59:
+        return None
+    return hours, minutes
+
+
+def _parse(text: str, projects: ProjectIndex, today: datetime) -> ParsedTask:
+    task = ParsedTask(title="")
+    seen_project = seen_date = seen_estimate = False
+    title, last = [], 0
+    for match in _TOKEN.finditer(text):
+        if match.group("project"):
+            # Like the TypeScript parser, only the first of each is taken; later ones stay in the title.
+            if seen_project:
+                continue
+            seen_project = True
+            task.project_id = projects.get(match.group("project"))
+        elif match.group("tag"):
+            task.tags.append(match.group("tag"))
+        elif match.group("date"):
+            if seen_date:
+                continue
+            seen_date = True
+            date = parse_date(match.group("date"), today)
+            if date is not None:
+                if match.group("hour"):
+                    time_of_day = to_hours(match.group("hour"), match.group("minute"), match.group("period"))
+                    if time_of_day is not None:
+                        date = date.replace(hour=time_of_day[0], minute=time_of_day[1])
+                        task.has_time = True
+                task.due_date = date
+        else:
+            if seen_estimate:
+                continue
+            seen_estimate = True
+            amount = int(match.group("amount"))
+            if match.group("unit")[0] in "hH":
+                task.effort_estimate_mins = amount * 60 + int(match.group("extra") or 0)
+            else:
+                task.effort_estimate_mins = amount
+        title.append(text[last: match.start()])
+        last = match.end()
+    title.append(text[last:])
+    task.title = _SPACES.sub(" ", "".join(title)).strip() or "Untitled Task"
+    return task
+
+
+def parse_task_input(
+    text: str,
+    projects: Iterable[dict] | ProjectIndex = (),
+    now: Optional[datetime] = None,
+) -> ParsedTask:
+    """Parses one quick-add line.
+
+    Args:
+        text (str): The raw input, e.g. "Standup @tomorrow 10am 15m #team".
+        projects (Iterable[dict] | ProjectIndex): Known projects with `_id` and `title`; "+name" matches a title case-insensitively.
+        now (datetime): Reference time for relative dates, in the user's time zone. Defaults to the current UTC time.
+    """
+    if not isinstance(projects, ProjectIndex):
+        projects = ProjectIndex(projects)
+    return _parse(text.strip(), projects, midnight(now))
+
+
+def parse_tasks(
+    lines: Iterable[str],
+    projects: Iterable[dict] | ProjectIndex = (),
+    now: Optional[datetime] = None,
+) -> list[ParsedTask]:
+    """Parses many quick-add lines, e.g. a pasted backlog; list markers and blank lines are skipped.
+
+    The project index and the reference date are built once for the whole batch.
+    """
+    if not isinstance(projects, ProjectIndex):
+        projects = ProjectIndex(projects)
+    today = midnight(now)
+    tasks = []
+    for line in lines:
+        line = _BULLET.sub("", line, count=1).strip()
+        if line:
+            tasks.append(_parse(line, projects, today))
+    return tasks
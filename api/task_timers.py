@@ -0,0 +1,464 @@
+import asyncio
+import heapq
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Iterable, Optional
+
+from calendar_store import DEFAULT_USER, format_time, parse_time
+from storage import apply_sqlite_pragmas
+from telemetry import span
+
+# Deadline engine for delayed tasks and the Reverse Pomodoro.
+#
+# Every tracked task has at most one pending transition:
+#   pending --(dueDate passes)--> delayed --(+1 day)--> reverse_pomodoro --(+2 days)--> overdue
+# The next transition of each task sits in a min-heap keyed by when it is due,
+# and a single timer sleeps until the earliest one. Nothing scans the task
+# list: tracking or firing a task costs O(log n). State lives in SQLite, so
+# timers survive restarts; transitions missed while the server was down fire
+# right after it comes back.
+#
+# Each transition is stored as an event (with a short motivational message)
+# that clients read with a cursor, and is passed to `subscribe` callbacks.
+#
+# Other processes (the MCP server, other workers) track tasks in the same
+# table. Triggers append every changed task id to a change log; when
+# `PRAGMA data_version` says another connection wrote, only the rows logged
+# since the last refresh are re-read. Whichever process fires first handles
+# every transition the table says is due.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS doable_task_timers (
+    task_id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    title TEXT NOT NULL,
+    due_ts REAL,
+    delayed_ts REAL,
+    state TEXT NOT NULL,
+    next_ts REAL
+);
+CREATE INDEX IF NOT EXISTS doable_task_timers_next ON doable_task_timers (next_ts) WHERE next_ts IS NOT NULL;
+CREATE TABLE IF NOT EXISTS doable_task_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    task_id TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    type TEXT NOT NULL,
+    at REAL NOT NULL,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS doable_task_events_user ON doable_task_events (user_id, id);
+CREATE TABLE IF NOT EXISTS doable_task_timer_changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    task_id TEXT NOT NULL
+);
+CREATE TRIGGER IF NOT EXISTS doable_task_timers_insert AFTER INSERT ON doable_task_timers
+BEGIN INSERT INTO doable_task_timer_changes (task_id) VALUES (new.task_id); END;
+CREATE TRIGGER IF NOT EXISTS doable_task_timers_update AFTER UPDATE ON doable_task_timers
+BEGIN INSERT INTO doable_task_timer_changes (task_id) VALUES (new.task_id); END;
+CREATE TRIGGER IF NOT EXISTS doable_task_timers_delete AFTER DELETE ON doable_task_timers
+BEGIN INSERT INTO doable_task_timer_changes (task_id) VALUES (old.task_id); END;
+"""
+
+PENDING, DELAYED, REVERSE_POMODORO, OVERDUE = "pending", "delayed", "reverse_pomodoro", "overdue"
+DAY = 24 * 3600.0
+# Events older than this are dropped when new ones are written.
+EVENT_RETENTION = 30 * DAY
+# Change log entries kept for other processes; one that falls further behind reloads everything.
+CHANGE_LOG_SIZE = 10_000
+# Task ids per `IN (...)` query.
+CHUNK = 500
+
+MESSAGES = {
+    DELAYED: "'{title}' slipped past its due date. A small step today keeps it from piling up.",
+    REVERSE_POMODORO: "'{title}' has been waiting a day. Reverse Pomodoro is on: work 5 minutes, rest 20.",
+    OVERDUE: "'{title}' is {days} days late. What is the one thing standing in its way?",
+}
+
+
+class TaskTimers:
+    """Min-heap of per-task deadlines with SQLite persistence.
+
+    Args:
+        db_file (str): SQLite file holding the timer and event tables.
+        activate_after (float): Seconds after a task is delayed at which the Reverse Pomodoro starts.
+        active_for (float): Seconds the Reverse Pomodoro stays on before the task counts as overdue.
+        poll_interval (float): Seconds between checks for timers changed by other processes.
+    """
+
+    def __init__(
+        self,
+        db_file: str,
+        activate_after: float = DAY,
+        active_for: float = 2 * DAY,
+        poll_interval: float = 1.0,
+    ):
+        self.activate_after = activate_after
+        self.active_for = active_for
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_file, check_same_thread=False, timeout=30)
+        apply_sqlite_pragmas(self._conn)
+        self._conn.executescript(SCHEMA)
+        self._heap: list[tuple[float, str]] = []
+        # Pending deadline per task; heap entries that disagree with it are stale.
+        self._next: dict[str, float] = {}
+        self._listeners: list[Callable[[list[dict]], None]] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        # Last change log entry reflected in the heap.
+        self._seen = 0
+        self._load()
+
+    @classmethod
+    def from_env(cls) -> "TaskTimers":
+        """Builds the engine from DOABLE_DB_FILE and DOABLE_REVERSE_POMODORO_AFTER_HOURS / _HOURS."""
+        return cls(
+            os.getenv("DOABLE_DB_FILE", "my_os.db"),
+            activate_after=float(os.getenv("DOABLE_REVERSE_POMODORO_AFTER_HOURS", "24")) * 3600,
+            active_for=float(os.getenv("DOABLE_REVERSE_POMODORO_HOURS", "48")) * 3600,
+        )
+
+    def _log_head(self) -> int:
+        return self._conn.execute("SELECT COALESCE(MAX(seq), 0) FROM doable_task_timer_changes").fetchone()[0]
+
+    def _load(self):
+        """Rebuilds the heap from the whole table; only needed at startup or after falling far behind."""
+        with self._conn:
+            self._seen = self._log_head()
+            rows = self._conn.execute(
+                "SELECT next_ts, task_id FROM doable_task_timers WHERE next_ts IS NOT NULL"
+            ).fetchall()
+        self._heap = [(next_ts, task_id) for next_ts, task_id in rows]
+        heapq.heapify(self._heap)
+        self._next = {task_id: next_ts for next_ts, task_id in rows}
+
+    def _deadlines(self, task_ids: list[str]) -> dict[str, Optional[float]]:
+        """Stored next_ts of tasks (None for finished or deleted ones), in chunked lookups."""
+        found = dict.fromkeys(task_ids)
+        for start in range(0, len(task_ids), CHUNK):
+            chunk = task_ids[start : start + CHUNK]
+            found.update(
+                self._conn.execute(
+                    f"SELECT task_id, next_ts FROM doable_task_timers WHERE task_id IN ({', '.join('?' * len(chunk))})",
+                    chunk,
+                )
+            )
+        return found
+
+    def refresh(self) -> bool:
+        """Applies the timers other connections changed since the last refresh.
+
+        Only the rows named in the change log are read, so the cost follows
+        the number of changes, not the number of tracked tasks.
+
+        Returns:
+            bool: Whether anything changed.
+        """
+        with self._lock:
+            data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if data_version == self._data_version:
+                return False
+            self._data_version = data_version
+            with self._conn:
+                logged = self._conn.execute(
+                    "SELECT seq, task_id FROM doable_task_timer_changes WHERE seq > ? ORDER BY seq", (self._seen,)
+                ).fetchall()
+                if not logged:
+                    return False
+                if logged[0][0] > self._seen + 1:
+                    # The entries we missed were pruned already.
+                    self._load()
+                    return True
+                deadlines = self._deadlines(list({task_id for _, task_id in logged}))
+            self._seen = logged[-1][0]
+            for task_id, next_ts in deadlines.items():
+                if self._next.get(task_id) != next_ts:
+                    self._schedule(task_id, next_ts)
+            return True
+
+    def _begin_write(self) -> bool:
+        """Takes the write lock; returns whether the heap reflects every change logged so far."""
+        self._conn.execute("BEGIN IMMEDIATE")
+        return self._log_head() == self._seen
+
+    def _end_write(self, caught_up: bool):
+        """Marks our own logged changes as seen (unless others' are still pending) and prunes the log."""
+        head = self._log_head()
+        if caught_up:
+            self._seen = head
+        self._conn.execute("DELETE FROM doable_task_timer_changes WHERE seq <= ?", (head - CHANGE_LOG_SIZE,))
+
+    def subscribe(self, callback: Callable[[list[dict]], None]):
+        """Registers a callback invoked with each batch of fired events."""
+        self._listeners.append(callback)
+
+    def _schedule(self, task_id: str, next_ts: Optional[float]):
+        if next_ts is None:
+            self._next.pop(task_id, None)
+            return
+        self._next[task_id] = next_ts
+        heapq.heappush(self._heap, (next_ts, task_id))
+        if len(self._heap) > 2 * len(self._next) + 1024:
+            # Mostly stale entries from re-tracked tasks: rebuild from the live deadlines.
+            self._heap = [(ts, key) for key, ts in self._next.items()]
+            heapq.heapify(self._heap)
+
+    def _plan(self, delayed_ts: Optional[float], now: float) -> tuple[str, Optional[float]]:
+        """Current state and time of the next transition of a task delayed at `delayed_ts`."""
+        if delayed_ts is None:
+            return PENDING, None
+        if now < delayed_ts:
+            return PENDING, delayed_ts
+        if now < delayed_ts + self.activate_after:
+            return DELAYED, delayed_ts + self.activate_after
+        if now < delayed_ts + self.activate_after + self.active_for:
+            return REVERSE_POMODORO, delayed_ts + self.activate_after + self.active_for
+        return OVERDUE, None
+
+    # -- tracking ------------------------------------------------------------
+
+    def track(self, tasks: Iterable[dict], user_id: Optional[str] = None, now: Optional[float] = None) -> int:
+        """Adds or updates tasks shaped like the `Task` model.
+
+        A task counts as delayed from `lastDelayedAt`, or else from its
+        `dueDate`. Completed tasks and tasks with neither are dropped. A task
+        that is already past due gets the event of its current state right
+        away, unless that state was reported before.
+
+        Returns:
+            int: Tasks that now have a pending timer.
+        """
+        now = time.time() if now is None else now
+        upserts, removals = [], []
+        for task in tasks:
+            task_id = str(task["_id"])
+            due_ts = parse_time(task["dueDate"]).timestamp() if task.get("dueDate") else None
+            delayed_ts = parse_time(task["lastDelayedAt"]).timestamp() if task.get("lastDelayedAt") else due_ts
+            if task.get("isCompleted") or delayed_ts is None:
+                removals.append(task_id)
+                continue
+            state, next_ts = self._plan(delayed_ts, now)
+            owner = str(task.get("userId") or user_id or DEFAULT_USER)
+            upserts.append((task_id, owner, task.get("title", ""), due_ts, delayed_ts, state, next_ts))
+        with self._lock:
+            caught_up = self._begin_write()
+            try:
+                previous = self._states([row[0] for row in upserts])
+                self._conn.executemany(
+                    "INSERT INTO doable_task_timers (task_id, user_id, title, due_ts, delayed_ts, state, next_ts)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)"
+                    " ON CONFLICT (task_id) DO UPDATE SET user_id = excluded.user_id, title = excluded.title,"
+                    " due_ts = excluded.due_ts, delayed_ts = excluded.delayed_ts, state = excluded.state,"
+                    " next_ts = excluded.next_ts",
+                    upserts,
+                )
+                self._conn.executemany("DELETE FROM doable_task_timers WHERE task_id = ?", [(t,) for t in removals])
+                events = self._record_events(
+                    [
+                        self._transition(task_id, owner, title, state, delayed_ts, now)
+                        for task_id, owner, title, _, delayed_ts, state, _ in upserts
+                        if state != PENDING and state != previous.get(task_id)
+                    ],
+                    now,
+                )
+                self._end_write(caught_up)
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                raise
+            earliest = self._heap[0][0] if self._heap else None
+            for task_id in removals:
+                self._schedule(task_id, None)
+            for task_id, *_, next_ts in upserts:
+                self._schedule(task_id, next_ts)
+        if self._loop is not None and self._heap and (earliest is None or self._heap[0][0] < earliest):
+            # A new earliest deadline: the timer has to wake up sooner. Tools call this from worker threads.
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+        self._notify(events)
+        return sum(1 for row in upserts if row[-1] is not None)
+
+    def untrack(self, task_ids: Iterable[str]) -> int:
+        """Stops tracking tasks, e.g. once they are completed or deleted."""
+        keys = [(str(task_id),) for task_id in task_ids]
+        with self._lock:
+            caught_up = self._begin_write()
+            try:
+                removed = self._conn.executemany("DELETE FROM doable_task_timers WHERE task_id = ?", keys).rowcount
+                self._end_write(caught_up)
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                raise
+            for (task_id,) in keys:
+                self._schedule(task_id, None)
+        return removed
+
+    def status(self, task_ids: Iterable[str]) -> list[dict]:
+        """Current state of tracked tasks, including `reversePomodoroActive`."""
+        ids = [str(task_id) for task_id in task_ids]
+        if not ids:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT task_id, user_id, title, state, delayed_ts, next_ts FROM doable_task_timers"
+                f" WHERE task_id IN ({', '.join('?' * len(ids))})",
+                ids,
+            ).fetchall()
+        return [
+            {
+                "_id": task_id,
+                "userId": owner,
+                "title": title,
+                "state": state,
+                "lastDelayedAt": format_time(delayed_ts) if delayed_ts is not None and state != PENDING else None,
+                "reversePomodoroActive": state == REVERSE_POMODORO,
+                "nextTransitionAt": format_time(next_ts) if next_ts is not None else None,
+            }
+            for task_id, owner, title, state, delayed_ts, next_ts in rows
+        ]
+
+    def events(self, user_id: Optional[str] = None, since: int = 0, limit: int = 100) -> dict:
+        """Fired transitions after the `since` cursor, oldest first.
+
+        Returns:
+            dict: `events` and the `cursor` to pass as `since` next time.
+        """
+        sql = "SELECT id, task_id, user_id, type, at, payload FROM doable_task_events WHERE id > ?"
+        params: tuple = (since,)
+        if user_id is not None:
+            sql += " AND user_id = ?"
+            params += (user_id,)
+        with self._lock:
+            rows = self._conn.execute(sql + " ORDER BY id LIMIT ?", params + (limit,)).fetchall()
+        events = [_event_to_dict(row) for row in rows]
+        return {"events": events, "cursor": events[-1]["id"] if events else since}
+
+    # -- firing --------------------------------------------------------------
+
+    def fire_due(self, now: Optional[float] = None) -> list[dict]:
+        """Fires every transition due by `now` in one transaction and returns the events."""
+        now = time.time() if now is None else now
+        with self._lock:
+            due = set()
+            while self._heap and self._heap[0][0] <= now:
+                next_ts, task_id = heapq.heappop(self._heap)
+                if self._next.get(task_id) == next_ts:
+                    del self._next[task_id]
+                    due.add(task_id)
+            if not due:
+                return []
+            # The write lock is taken up front, so two processes never fire the same transition:
+            # whoever comes second no longer finds it due. The table decides what is due, which
+            # also covers timers added by other processes since the last refresh.
+            caught_up = self._begin_write()
+            try:
+                rows = self._conn.execute(
+                    "SELECT task_id, user_id, title, state, delayed_ts FROM doable_task_timers WHERE next_ts <= ?",
+                    (now,),
+                ).fetchall()
+                # Heap entries another process already moved on (or re-tracked): follow the stored deadline.
+                for task_id, next_ts in self._deadlines(list(due.difference(row[0] for row in rows))).items():
+                    self._schedule(task_id, next_ts)
+                updates, fired = [], []
+                for task_id, owner, title, state, delayed_ts in rows:
+                    # After downtime this may skip intermediate states; only the current one is reported.
+                    new_state, following = self._plan(delayed_ts, now)
+                    updates.append((new_state, following, task_id))
+                    self._schedule(task_id, following)
+                    if new_state != state:
+                        fired.append(self._transition(task_id, owner, title, new_state, delayed_ts, now))
+                self._conn.executemany("UPDATE doable_task_timers SET state = ?, next_ts = ? WHERE task_id = ?", updates)
+                events = self._record_events(fired, now)
+                self._end_write(caught_up)
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                raise
+        self._notify(events)
+        return events
+
+    def _states(self, task_ids: list[str]) -> dict[str, str]:
+        found = {}
+        for start in range(0, len(task_ids), CHUNK):
+            chunk = task_ids[start : start + CHUNK]
+            found.update(
+                self._conn.execute(
+                    f"SELECT task_id, state FROM doable_task_timers WHERE task_id IN ({', '.join('?' * len(chunk))})",
+                    chunk,
+                )
+            )
+        return found
+
+    @staticmethod
+    def _transition(task_id: str, owner: str, title: str, state: str, delayed_ts: float, now: float) -> tuple:
+        payload = {
+            "title": title,
+            "lastDelayedAt": format_time(delayed_ts),
+            "reversePomodoroActive": state == REVERSE_POMODORO,
+            "message": MESSAGES[state].format(title=title, days=round((now - delayed_ts) / DAY)),
+        }
+        return (task_id, owner, state, now, json.dumps(payload))
+
+    def _record_events(self, fired: list[tuple], now: float) -> list[dict]:
+        """Stores transitions (inside the caller's transaction) and returns them as events."""
+        if not fired:
+            return []
+        cursor = self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM doable_task_events").fetchone()[0]
+        self._conn.executemany(
+            "INSERT INTO doable_task_events (task_id, user_id, type, at, payload) VALUES (?, ?, ?, ?, ?)",
+            fired,
+        )
+        self._conn.execute("DELETE FROM doable_task_events WHERE at < ?", (now - EVENT_RETENTION,))
+        rows = self._conn.execute(
+            "SELECT id, task_id, user_id, type, at, payload FROM doable_task_events WHERE id > ? ORDER BY id",
+            (cursor,),
+        ).fetchall()
+        return [_event_to_dict(row) for row in rows]
+
+    def _notify(self, events: list[dict]):
+        if events:
+            for callback in self._listeners:
+                callback(events)
+
+    def start(self):
+        """Starts the timer on the running event loop."""
+        if self._task is None:
+            self._loop = asyncio.get_running_loop()
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = self._loop = None
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            await asyncio.to_thread(self.refresh)
+            if self._heap and self._heap[0][0] <= time.time():
+                with span("timer", "task_deadlines"):
+                    await asyncio.to_thread(self.fire_due)
+                continue
+            # Sleep until the earliest deadline, but look for other processes' timers now and then.
+            timeout = self.poll_interval
+            if self._heap:
+                timeout = min(timeout, self._heap[0][0] - time.time())
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+
+def _event_to_dict(row: tuple) -> dict:
+    event_id, task_id, user_id, kind, at, payload = row
+    return {"id": event_id, "taskId": task_id, "userId": user_id, "type": kind, "at": format_time(at), **json.loads(payload)}
+
+
+task_timers = TaskTimers.from_env()
@@ -0,0 +1,297 @@
+import functools
+import os
+import time
+from contextlib import contextmanager
+from threading import Lock
+from typing import Iterable
+
+# Local instrumentation: every span feeds a Prometheus histogram served by the
+# agent server, and is also exported as an OpenTelemetry span when the OTel
+# SDK is installed and OTEL_EXPORTER_OTLP_ENDPOINT points at a collector.
+# Nothing leaves the host unless that endpoint is configured.
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labels: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._values: dict[tuple, float] = {}
+        self._lock = Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(labels.get(name, "") for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> Iterable[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+        for key, value in values:
+            yield f"{self.name}{_label_text(self.labels, key)} {value}"
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = buckets
+        # key -> [per-bucket counts..., count, sum]
+        self._values: dict[tuple, list] = {}
+        self._lock = Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels.get(name, "") for name in self.labels)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0] * len(self.buckets) + [0, 0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    row[i] += 1
+            row[-2] += 1
+            row[-1] += value
+
+    def render(self) -> Iterable[str]:
+        with self._lock:
+            values = sorted((key, list(row)) for key, row in self._values.items())
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        for key, row in values:
+            for bound, count in zip(self.buckets, row):
+                le = 'le="%s"' % bound
+                yield f"{self.name}_bucket{_label_text(self.labels, key, le)} {count}"
+            le = 'le="+Inf"'
+            yield f"{self.name}_bucket{_label_text(self.labels, key, le)} {row[-2]}"
+            yield f"{self.name}_count{_label_text(self.labels, key)} {row[-2]}"
+            yield f"{self.name}_sum{_label_text(self.labels, key)} {row[-1]}"
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: list = []
+
+    def counter(self, *args, **kwargs) -> Counter:
+        metric = Counter(*args, **kwargs)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, *args, **kwargs) -> Histogram:
+        metric = Histogram(*args, **kwargs)
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Renders every metric in the Prometheus text exposition format."""
+        return "\n".join(line for metric in self.metrics for line in metric.render()) + "\n"
+
+
+registry = Registry()
+
+SPAN_SECONDS = registry.histogram(
+    "doable_span_seconds",
+    "Duration of instrumented operations (model calls, tools, DB, serialization).",
+    ("kind", "name"),
+)
+SPAN_ERRORS = registry.counter(
+    "doable_span_errors_total",
+    "Instrumented operations that raised.",
+    ("kind", "name"),
+)
+HTTP_SECONDS = registry.histogram(
+    "doable_http_request_seconds",
+    "HTTP request duration by route.",
+    ("method", "route", "status"),
+)
+
+
+def _build_tracer():
+    if not os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT"):
+        return None
+    try:
+        from opentelemetry import trace
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError:
+        return None
+    provider = TracerProvider(resource=Resource.create({"service.name": os.getenv("OTEL_SERVICE_NAME", "doable-agent")}))
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    trace.set_tracer_provider(provider)
+    return trace.get_tracer("doable")
+
+
+tracer = _build_tracer()
+
+
+@contextmanager
+def span(kind: str, name: str, detached: bool = False, **attributes):
+    """Times the block into doable_span_seconds{kind, name} and emits an OTel span if enabled.
+
+    Args:
+        kind (str): Operation kind, e.g. "model" or "tool".
+        name (str): Operation name.
+        detached (bool): Do not make the OTel span the current one. Use it around
+            blocks that yield (async generators): code running between the yields
+            would otherwise see it as its parent, and the context could be reset
+            from another task.
+    """
+    started = time.perf_counter()
+    otel = None
+    if tracer is not None:
+        if detached:
+            otel = tracer.start_span(f"{kind} {name}", attributes=attributes)
+        else:
+            otel = tracer.start_as_current_span(f"{kind} {name}", attributes=attributes)
+            otel.__enter__()
+    error = None
+    try:
+        yield
+    except BaseException as exc:
+        error = exc
+        SPAN_ERRORS.inc(kind=kind, name=name)
+        raise
+    finally:
+        SPAN_SECONDS.observe(time.perf_counter() - started, kind=kind, name=name)
+        if otel is not None and detached:
+            if error is not None:
+                otel.record_exception(error)
+                otel.set_status(_error_status(error))
+            otel.end()
+        elif otel is not None:
+            if error is None:
+                otel.__exit__(None, None, None)
+            else:
+                otel.__exit__(type(error), error, error.__traceback__)
+
+
+def _error_status(error: BaseException):
+    from opentelemetry.trace import Status, StatusCode
+
+    return Status(StatusCode.ERROR, f"{type(error).__name__}: {error}")
+
+
+async def tool_span(function_name: str, function_call, arguments: dict):
+    """agno tool hook that wraps every tool call in a span. Requires async runs (`arun`)."""
+    with span("tool", function_name):
+        return await function_call(**arguments)
+
+
+def instrument_model(model):
+    """Wraps the model's async calls in `model` spans; streams also record time to first chunk."""
+    name = model.id
+    ainvoke = model.ainvoke
+    ainvoke_stream = model.ainvoke_stream
+
+    @functools.wraps(ainvoke)
+    async def timed_ainvoke(*args, **kwargs):
+        with span("model", name):
+            return await ainvoke(*args, **kwargs)
+
+    @functools.wraps(ainvoke_stream)
+    async def timed_ainvoke_stream(*args, **kwargs):
+        started = time.perf_counter()
+        first = True
+        with span("model", name, detached=True):
+            async for chunk in ainvoke_stream(*args, **kwargs):
+                if first:
+                    SPAN_SECONDS.observe(time.perf_counter() - started, kind="model_first_chunk", name=name)
+                    first = False
+                yield chunk
+
+    model.ainvoke = timed_ainvoke
+    model.ainvoke_stream = timed_ainvoke_stream
+    return model
+
+
+# Session-DB methods on the request path.
+DB_METHODS = ("get_session", "upsert_session", "get_user_memories", "upsert_user_memory")
+
+
+def instrument_db(db, methods: Iterable[str] = DB_METHODS):
+    """Wraps the given async DB methods in `db` spans."""
+    for method in methods:
+        original = getattr(db, method, None)
+        if original is None:
+            continue
+
+        def bind(method=method, original=original):
+            @functools.wraps(original)
+            async def timed(*args, **kwargs):
+                with span("db", method):
+                    return await original(*args, **kwargs)
+
+            return timed
+
+        setattr(db, method, bind())
+    return db
+
+
+class HttpMetrics:
+    """ASGI middleware recording request duration per route template.
+
+    The clock stops when the last body chunk has been sent, so streamed
+    responses (SSE, NDJSON) are timed to the end of the stream rather than to
+    their headers. Requests that fail or are abandoned mid-stream are recorded
+    when the app returns.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = 500
+        recorded = False
+
+        def record():
+            nonlocal recorded
+            if recorded:
+                return
+            recorded = True
+            # The router stores the matched route in the shared scope.
+            route = scope.get("route")
+            HTTP_SECONDS.observe(
+                time.perf_counter() - started,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=status,
+            )
+
+        async def timed_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                record()
+
+        try:
+            await self.app(scope, receive, timed_send)
+        finally:
+            record()
+
+
+def add_http_metrics(app):
+    """Records request duration per route template on a FastAPI app."""
+    app.add_middleware(HttpMetrics)
@@ -0,0 +1,10 @@
+import os
+import tempfile
+
+# Several modules open their SQLite file (and the vector index its directory)
+# at import, so point them at a scratch location before anything is imported.
+_scratch = tempfile.mkdtemp(prefix="doable-tests-")
+os.environ.setdefault("DOABLE_DB_FILE", os.path.join(_scratch, "doable.db"))
+os.environ.setdefault("DOABLE_VECTOR_DIR", os.path.join(_scratch, "vectors"))
+os.environ.setdefault("DOABLE_NOTIFY_FILE", "")
+os.environ.setdefault("GOOGLE_API_KEY", "test")
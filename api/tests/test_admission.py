@@ -0,0 +1,214 @@
+import asyncio
+import time
+
+import pytest
+
+from admission import AdmissionController, Overloaded
+
+
+def test_waiters_are_served_by_lane_then_arrival():
+    controller = AdmissionController(max_concurrency=1)
+    order = []
+
+    async def call(name: str, lane: str):
+        async with controller.slot(lane):
+            order.append(name)
+            await asyncio.sleep(0)
+
+    async def main():
+        gate = asyncio.Event()
+
+        async def holder():
+            async with controller.slot():
+                await gate.wait()
+
+        first = asyncio.create_task(holder())
+        await asyncio.sleep(0)
+        waiting = [
+            asyncio.create_task(call("bg1", "background")),
+            asyncio.create_task(call("bg2", "background")),
+            asyncio.create_task(call("chat1", "interactive")),
+            asyncio.create_task(call("chat2", "interactive")),
+        ]
+        await asyncio.sleep(0)
+        assert controller.stats()["queued"] == {"interactive": 2, "background": 2}
+        gate.set()
+        await asyncio.gather(first, *waiting)
+
+    asyncio.run(main())
+    assert order == ["chat1", "chat2", "bg1", "bg2"]
+    assert controller.active == 0
+
+
+def test_concurrency_is_bounded():
+    controller = AdmissionController(max_concurrency=3)
+    running = peak = 0
+
+    async def call():
+        nonlocal running, peak
+        async with controller.slot():
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+    async def main():
+        await asyncio.gather(*(call() for _ in range(10)))
+
+    asyncio.run(main())
+    assert peak == 3
+    assert controller.stats()["admitted"] == 10
+
+
+def test_full_queue_rejects_new_callers():
+    controller = AdmissionController(max_concurrency=1, max_queue=2)
+
+    async def main():
+        gate = asyncio.Event()
+
+        async def call():
+            async with controller.slot():
+                await gate.wait()
+
+        tasks = [asyncio.create_task(call()) for _ in range(3)]
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded):
+            async with controller.slot():
+                pass
+        gate.set()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+    assert controller.stats()["rejected"] == 1
+    assert controller.active == 0
+
+
+def test_cancelled_waiter_gives_its_place_away():
+    controller = AdmissionController(max_concurrency=1)
+    served = []
+
+    async def main():
+        gate = asyncio.Event()
+
+        async def holder():
+            async with controller.slot():
+                await gate.wait()
+
+        async def call(name):
+            async with controller.slot():
+                served.append(name)
+
+        first = asyncio.create_task(holder())
+        await asyncio.sleep(0)
+        dropped = asyncio.create_task(call("dropped"))
+        kept = asyncio.create_task(call("kept"))
+        await asyncio.sleep(0)
+        dropped.cancel()
+        await asyncio.sleep(0)
+        gate.set()
+        await asyncio.gather(first, kept)
+
+    asyncio.run(main())
+    assert served == ["kept"]
+    assert controller.active == 0 and controller.stats()["queued"] == {"interactive": 0, "background": 0}
+
+
+def test_token_bucket_spaces_calls_after_the_burst():
+    controller = AdmissionController(max_concurrency=10, rate_per_second=20, burst=2)
+    stamps = []
+
+    async def call():
+        async with controller.slot():
+            stamps.append(time.monotonic())
+
+    async def main():
+        await asyncio.gather(*(call() for _ in range(4)))
+
+    asyncio.run(main())
+    # Two calls ride the burst; each further one waits for a refill (50 ms at 20/s).
+    assert stamps[1] - stamps[0] < 0.02
+    assert stamps[3] - stamps[0] >= 0.09
+
+
+def test_identical_calls_share_one_upstream_call():
+    controller = AdmissionController()
+    calls = []
+
+    async def upstream():
+        calls.append(True)
+        await asyncio.sleep(0.01)
+        return "reply"
+
+    async def main():
+        return await asyncio.gather(*(controller.run("same prompt", upstream) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["reply"] * 5
+    assert len(calls) == 1
+    assert controller.stats()["coalesced"] == 4
+    # Finished calls are not reused.
+    assert asyncio.run(controller.run("same prompt", upstream)) == "reply" and len(calls) == 2
+
+
+def test_followers_get_the_leaders_error():
+    controller = AdmissionController()
+
+    async def upstream():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("quota")
+
+    async def main():
+        return await asyncio.gather(*(controller.run("k", upstream) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert controller.active == 0
+
+
+def test_cancelling_the_leader_keeps_the_call_for_followers():
+    controller = AdmissionController()
+    cancelled = []
+
+    async def upstream():
+        try:
+            await asyncio.sleep(0.05)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+        return "reply"
+
+    async def main():
+        leader = asyncio.create_task(controller.run("k", upstream))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(controller.run("k", upstream))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        assert await follower == "reply"
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+
+    asyncio.run(main())
+    assert cancelled == []
+
+
+def test_upstream_call_is_cancelled_with_its_last_caller():
+    controller = AdmissionController()
+    cancelled = []
+
+    async def upstream():
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def main():
+        callers = [asyncio.create_task(controller.run("k", upstream)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.sleep(0)
+
+    asyncio.run(main())
+    assert cancelled == [True]
+    assert controller.active == 0
@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta, timezone
+
+from calendar_store import LONG_EVENT_SECONDS, CalendarEvent, CalendarStore, _UserIndex
+
+HOUR = 3600.0
+
+
+def event(event_id: int, start: float, hours: float) -> CalendarEvent:
+    return CalendarEvent(event_id, "u", f"e{event_id}", start, start + hours * HOUR)
+
+
+def brute_force(events: list[CalendarEvent], lo: float, hi: float) -> list[int]:
+    return [e.id for e in sorted(events, key=lambda e: (e.start_ts, e.id)) if e.start_ts < hi and e.end_ts > lo]
+
+
+def test_overlapping_matches_a_full_scan():
+    events = [event(i, i * 5 * HOUR, hours=(i % 7) + 0.5) for i in range(200)]
+    events += [event(1000, 3 * HOUR, hours=100), event(1001, 400 * HOUR, hours=72)]
+    index = _UserIndex()
+    for e in events:
+        index.add(e)
+    for lo in range(0, 1100, 37):
+        lo_ts, hi_ts = lo * HOUR, (lo + 9) * HOUR
+        assert [e.id for e in index.overlapping(lo_ts, hi_ts)] == brute_force(events, lo_ts, hi_ts)
+
+
+def test_long_events_do_not_widen_the_window():
+    index = _UserIndex()
+    index.add(event(1, 0, hours=1))
+    index.add(event(2, 0, hours=24 * 30))
+    assert index.max_duration == HOUR
+    assert LONG_EVENT_SECONDS < 24 * 30 * HOUR
+
+
+def test_max_duration_shrinks_on_removal():
+    index = _UserIndex()
+    index.add(event(1, 0, hours=1))
+    index.add(event(2, 10 * HOUR, hours=8))
+    assert index.max_duration == 8 * HOUR
+    index.remove(2)
+    assert index.max_duration == HOUR
+    index.remove(1)
+    assert index.max_duration == 0.0
+
+
+def test_free_slots_around_a_multi_day_event(tmp_path):
+    store = CalendarStore(str(tmp_path / "calendar.db"))
+    monday = datetime(2030, 1, 7, tzinfo=timezone.utc)
+    store.add_event("Offsite", monday, 3 * 24 * 60, "u")
+    store.add_event("Call", monday + timedelta(days=4, hours=9), 60, "u")
+
+    slots = store.free_slots(monday + timedelta(days=1), monday + timedelta(days=5), 30, "u")
+    assert slots == [
+        (monday + timedelta(days=3), monday + timedelta(days=4, hours=9)),
+        (monday + timedelta(days=4, hours=10), monday + timedelta(days=5)),
+    ]
+
+
+def test_list_events_pages(tmp_path):
+    store = CalendarStore(str(tmp_path / "calendar.db"))
+    start = datetime(2030, 1, 1, tzinfo=timezone.utc)
+    for hour in range(5):
+        store.add_event(f"e{hour}", start + timedelta(hours=hour), 30, "u")
+    page = store.list_events("u", limit=2, offset=2)
+    assert [e["event"] for e in page["events"]] == ["e2", "e3"]
+    assert page["total"] == 5 and page["next_offset"] == 4
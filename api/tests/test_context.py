@@ -0,0 +1,136 @@
+import asyncio
+from types import SimpleNamespace
+
+from agno.models.google import Gemini
+from agno.models.message import Message
+from agno.session.summary import SessionSummary
+
+from context import (
+    _STATE_KEY,
+    ContextBudget,
+    drop_superseded_results,
+    estimate_tokens,
+    MAX_TURNS_PER_UPDATE,
+    split_turns,
+    SUPERSEDED,
+)
+
+
+def turn(text: str, words: int = 1, history: bool = True) -> list[Message]:
+    reply = " ".join([text] * words)
+    return [
+        Message(role="user", content=text, from_history=history),
+        Message(role="assistant", content=reply, from_history=history),
+    ]
+
+
+def calendar_result(content: str, start: str = "2026-03-02") -> Message:
+    return Message(
+        role="tool", content=content, tool_name="get_calendar_events", tool_args={"start": start}, from_history=True
+    )
+
+
+def test_estimate_tokens():
+    assert estimate_tokens(Message(role="user", content="x" * 400)) == 104
+    assert estimate_tokens(Message(role="assistant", content=None)) == 4
+    call = Message(role="assistant", content="", tool_calls=[{"id": "1", "function": {"name": "f", "arguments": "{}"}}])
+    assert estimate_tokens(call) > 4
+
+
+def test_split_turns_skips_system_messages():
+    messages = [Message(role="system", content="rules"), *turn("a"), Message(role="tool", content="r"), *turn("b")]
+    turns = split_turns(messages)
+    assert [[message.role for message in t] for t in turns] == [["user", "assistant", "tool"], ["user", "assistant"]]
+
+
+def test_only_the_latest_repeated_result_is_kept():
+    old, new, other = calendar_result("old"), calendar_result("new"), calendar_result("other", "2026-03-09")
+    turns = [[Message(role="user", content="list"), old, other], [Message(role="user", content="again"), new]]
+    compacted = drop_superseded_results(turns)
+    assert [message.content for message in compacted[0]] == ["list", SUPERSEDED, "other"]
+    assert compacted[1][1].content == "new"
+    # The stored messages are not changed.
+    assert old.content == "old"
+
+
+def test_window_keeps_the_latest_turns_that_fit():
+    turns = [turn(f"t{i}", words=100) for i in range(6)]
+    cost = sum(estimate_tokens(message) for message in turns[0])
+    window = ContextBudget(max_tokens=cost * 2 + 1, max_turns=10).window(turns)
+    assert [t[0].content for t in window] == ["t4", "t5"]
+    assert len(ContextBudget(max_tokens=10**6, max_turns=3).window(turns)) == 3
+
+
+def test_compact_replaces_only_the_history():
+    system = Message(role="system", content="rules")
+    history = [message for i in range(5) for message in turn(f"old{i}", words=200)]
+    current = Message(role="user", content="now")
+    compacted = ContextBudget(max_tokens=300, max_turns=10).compact([system, *history, current])
+    assert compacted[0] is system and compacted[-1] is current
+    assert [message.content for message in compacted[1:-1] if message.role == "user"] == ["old4"]
+    assert ContextBudget().compact([system, current]) == [system, current]
+
+
+def test_wrap_model_compacts_every_call():
+    seen = []
+
+    class Model:
+        async def ainvoke(self, messages):
+            seen.append(len(messages))
+
+        async def ainvoke_stream(self, messages):
+            seen.append(len(messages))
+            yield "chunk"
+
+    async def main():
+        model = ContextBudget(max_tokens=10**6, max_turns=1).wrap_model(Model())
+        messages = [message for i in range(4) for message in turn(f"t{i}")] + [Message(role="user", content="now")]
+        await model.ainvoke(messages)
+        assert [chunk async for chunk in model.ainvoke_stream(messages)] == ["chunk"]
+
+    asyncio.run(main())
+    assert seen == [3, 3]
+
+
+def test_disabled_budget():
+    assert not ContextBudget(max_tokens=0).enabled
+    assert not ContextBudget(max_turns=0).enabled
+    assert ContextBudget.from_env().enabled
+
+
+def session(turns: int, summarized: int = 0, summary: str | None = None):
+    messages = [message for i in range(turns) for message in turn(f"t{i}", history=False)]
+    return SimpleNamespace(
+        get_messages=lambda: messages,
+        session_data={_STATE_KEY: {"summarized_turns": summarized}},
+        summary=SessionSummary(summary=summary) if summary else None,
+    )
+
+
+def test_summary_waits_for_evicted_turns():
+    manager = ContextBudget(max_tokens=10**6, max_turns=4).summary_manager()
+    assert manager._prepare_summary_messages(session(4)) is None
+    # Turns already folded into the summary are not summarized again.
+    assert manager._prepare_summary_messages(session(6, summarized=2)) is None
+
+
+def test_summary_folds_only_new_evictions_into_the_previous_summary():
+    manager = ContextBudget(max_tokens=10**6, max_turns=4).summary_manager()
+    manager.model = Gemini(id="gemini-2.0-flash")
+    state = session(9, summarized=2, summary="Earlier: planning a trip.")
+    system, request = manager._prepare_summary_messages(state)
+    assert "t2" in system.content and "t4" in system.content
+    assert "t1" not in system.content and "t5" not in system.content
+    assert "Earlier: planning a trip." in request.content
+    assert state.session_data[_STATE_KEY]["pending_turns"] == 5
+
+    manager._mark_summarized(state)
+    assert state.session_data[_STATE_KEY] == {"summarized_turns": 5}
+
+
+def test_first_summary_of_a_long_session_is_capped():
+    manager = ContextBudget(max_tokens=10**6, max_turns=2).summary_manager()
+    manager.model = Gemini(id="gemini-2.0-flash")
+    state = session(MAX_TURNS_PER_UPDATE + 12)
+    system, _ = manager._prepare_summary_messages(state)
+    assert "t9" not in system.content and "t10" in system.content and "t29" in system.content
@@ -0,0 +1,157 @@
+import asyncio
+
+import pytest
+
+import jobs
+from jobs import FAILED, SUCCEEDED, InvalidJobPayload, JobQueue, UnknownJobKind
+
+
+def make_queue(tmp_path, **options) -> JobQueue:
+    return JobQueue(str(tmp_path / "jobs.db"), workers=1, backoff=0, poll_interval=0.05, **options)
+
+
+async def run_until_finished(queue: JobQueue, job_id: str) -> dict:
+    queue.start()
+    try:
+        seen = [job async for job in queue.watch(job_id)]
+    finally:
+        await queue.stop()
+    return seen[-1]
+
+
+def test_submit_puts_the_submitting_user_into_the_payload(tmp_path):
+    queue = make_queue(tmp_path)
+    queue.register("echo", lambda payload, report: asyncio.sleep(0, payload))
+
+    job = asyncio.run(queue.submit("echo", {"x": 1}, "alice"))
+    assert job["user_id"] == "alice"
+    assert job["payload"] == {"x": 1, "user_id": "alice"}
+
+    # The submitter wins over a user named in the payload.
+    job = asyncio.run(queue.submit("echo", {"user_id": "mallory"}, "alice"))
+    assert job["payload"]["user_id"] == "alice"
+
+    job = asyncio.run(queue.submit("echo", {}))
+    assert job["user_id"] == jobs.DEFAULT_USER
+
+
+def test_unknown_kind_is_rejected(tmp_path):
+    with pytest.raises(UnknownJobKind):
+        asyncio.run(make_queue(tmp_path).submit("nope", {}))
+
+
+def test_job_runs_and_reports_progress(tmp_path):
+    queue = make_queue(tmp_path)
+
+    async def handler(payload, report):
+        report(stage="working")
+        return {"double": payload["n"] * 2}
+
+    queue.register("double", handler)
+
+    async def main():
+        job = await queue.submit("double", {"n": 21}, "alice")
+        return await run_until_finished(queue, job["id"])
+
+    job = asyncio.run(main())
+    assert job["status"] == SUCCEEDED
+    assert job["result"] == {"double": 42}
+    assert job["progress"] == {"stage": "working"}
+
+
+def test_failing_job_is_retried_then_failed(tmp_path):
+    queue = make_queue(tmp_path)
+    calls = []
+
+    async def handler(payload, report):
+        calls.append(True)
+        raise RuntimeError("boom")
+
+    queue.register("flaky", handler)
+
+    async def main():
+        job = await queue.submit("flaky", {}, max_attempts=3)
+        return await run_until_finished(queue, job["id"])
+
+    job = asyncio.run(main())
+    assert job["status"] == FAILED
+    assert job["attempts"] == 3
+    assert "RuntimeError: boom" in job["error"]
+    assert len(calls) == 3
+
+
+@pytest.mark.parametrize("name", ["timezone", "timezone_name"])
+def test_plan_job_maps_both_timezone_arguments(monkeypatch, name):
+    import tools
+
+    received = {}
+
+    def plan_tasks(user_id, **arguments):
+        received.update(arguments, user_id=user_id)
+        return {"scheduled": []}
+
+    monkeypatch.setattr(tools, "plan_tasks", plan_tasks)
+    payload = {"tasks": [{"title": "Write"}], name: "Europe/Berlin", "commit": True, "user_id": "alice"}
+    asyncio.run(jobs._plan_job(payload, lambda **progress: None))
+
+    assert received == {"tasks": [{"title": "Write"}], "tz": "Europe/Berlin", "commit": True, "user_id": "alice"}
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [
+        {"tasks": [{"title": "Write"}], "hours": "9-5"},
+        {"tasks": "Write"},
+        {"tasks": [{"title": "Write"}], "working_hours": "late"},
+        {"tasks": [{"title": "Write"}], "timezone": "Mars/Olympus"},
+        {"tasks": [{"title": "Write"}], "timezone": "UTC", "timezone_name": "UTC"},
+        {"tasks": [{"title": "Write"}], "mode": "fast"},
+    ],
+)
+def test_bad_plan_payload_is_rejected_at_submit(payload):
+    with pytest.raises(InvalidJobPayload):
+        asyncio.run(jobs.job_queue.submit("plan_schedule", payload))
+
+
+def test_bad_parse_and_ask_payloads_are_rejected_at_submit():
+    with pytest.raises(InvalidJobPayload):
+        asyncio.run(jobs.job_queue.submit("parse_tasks", {"text": ["a", "b"]}))
+    with pytest.raises(InvalidJobPayload):
+        asyncio.run(jobs.job_queue.submit("ask", {"session_id": "s"}))
+
+
+def test_invalid_payload_fails_without_retries(tmp_path):
+    queue = make_queue(tmp_path)
+    calls = []
+
+    async def handler(payload, report):
+        calls.append(True)
+        raise InvalidJobPayload("no such task list")
+
+    queue.register("strict", handler)
+
+    async def main():
+        job = await queue.submit("strict", {}, max_attempts=3)
+        return await run_until_finished(queue, job["id"])
+
+    job = asyncio.run(main())
+    assert job["status"] == FAILED
+    assert job["attempts"] == 1 and len(calls) == 1
+
+
+def test_parse_job_runs_off_the_event_loop(monkeypatch):
+    import threading
+
+    import task_parser
+
+    threads = []
+    parse_tasks = task_parser.parse_tasks
+
+    def recording_parse(*args):
+        threads.append(threading.current_thread())
+        return parse_tasks(*args)
+
+    monkeypatch.setattr(task_parser, "parse_tasks", recording_parse)
+    result = asyncio.run(jobs._parse_job({"text": "- Write report 1h\n\n- Call Sam"}, lambda **progress: None))
+    assert [task["title"] for task in result] == ["Write report", "Call Sam"]
+    assert threads and threads[0] is not threading.main_thread()
@@ -0,0 +1,65 @@
+import numpy as np
+
+from matching import _completion_rates, assign, match_tasks
+
+
+def employee(_id: str, strengths: list[str], rate: float = 0, capacity: float | None = None) -> dict:
+    return {
+        "_id": _id,
+        "name": _id.title(),
+        "psychology": {"strengths": strengths},
+        "pastCompletionRate": rate,
+        "capacityMins": capacity,
+    }
+
+
+def test_completion_rate_is_a_percentage():
+    rates = _completion_rates([{"pastCompletionRate": 1}, {"pastCompletionRate": 50}, {"pastCompletionRate": 100}, {}])
+    np.testing.assert_allclose(rates, [0.01, 0.5, 1.0, 0.0])
+
+
+def test_completion_rate_is_clipped():
+    np.testing.assert_allclose(_completion_rates([{"pastCompletionRate": 250}, {"pastCompletionRate": -5}]), [1.0, 0.0])
+
+
+def test_track_record_breaks_ties_between_equal_fits():
+    result = match_tasks(
+        [{"_id": "t1", "title": "Audit", "recommendedTraits": ["analytical"]}],
+        [employee("low", ["analytical"], rate=1), employee("high", ["analytical"], rate=90)],
+    )
+    assert result["assignments"][0]["assignee"]["_id"] == "high"
+
+
+def test_owner_follows_trait_fit():
+    result = match_tasks(
+        [
+            {"_id": "t1", "title": "Design", "recommendedTraits": ["creative", "visual"]},
+            {"_id": "t2", "title": "Audit", "recommendedTraits": ["analytical", "detail"]},
+        ],
+        [employee("ana", ["analytical", "detail"]), employee("cris", ["creative", "visual"])],
+    )
+    owners = [item["assignee"]["_id"] for item in result["assignments"]]
+    assert owners == ["cris", "ana"]
+
+
+def test_assign_respects_capacity():
+    scores = np.array([[0.9, 0.1], [0.8, 0.2], [0.7, 0.3]])
+    owners = assign(scores, efforts=np.array([60, 60, 60]), capacities=np.array([120, 60]))
+    assert owners.tolist() == [0, 0, 1]
+
+
+def test_task_without_room_is_left_unassigned():
+    owners = assign(np.array([[0.5]]), efforts=np.array([90]), capacities=np.array([60]))
+    assert owners.tolist() == [-1]
+
+
+def test_workload_sums_assigned_effort():
+    result = match_tasks(
+        [{"_id": "t1", "title": "A", "effortEstimateMins": 30}, {"_id": "t2", "title": "B", "effortEstimateMins": 45}],
+        [employee("solo", ["focused"])],
+    )
+    assert result["workload"] == [{"_id": "solo", "name": "Solo", "assigned_mins": 75}]
+
+
+def test_empty_inputs():
+    assert match_tasks([], [employee("a", [])]) == {"assignments": [], "workload": []}
@@ -0,0 +1,86 @@
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import mcp_server
+from calendar_store import calendar_store
+from mcp_server import run_batch
+
+
+def test_results_keep_the_input_order():
+    def call(item):
+        # Later items finish first.
+        time.sleep(item["delay"])
+        return item["name"]
+
+    items = [{"name": name, "delay": delay} for name, delay in (("a", 0.03), ("b", 0.02), ("c", 0.01), ("d", 0))]
+    results = asyncio.run(run_batch(call, items))
+    assert results == [{"index": i, "ok": True, "result": item["name"]} for i, item in enumerate(items)]
+
+
+def test_failing_items_do_not_fail_the_batch():
+    def call(item):
+        return 10 // item["n"]
+
+    results = asyncio.run(run_batch(call, [{"n": 2}, {"n": 0}, {}, {"n": 5}]))
+    assert results == [
+        {"index": 0, "ok": True, "result": 5},
+        {"index": 1, "ok": False, "error": "ZeroDivisionError: integer division or modulo by zero"},
+        {"index": 2, "ok": False, "error": "KeyError: 'n'"},
+        {"index": 3, "ok": True, "result": 2},
+    ]
+
+
+def test_concurrency_is_bounded(monkeypatch):
+    monkeypatch.setattr(mcp_server, "BATCH_CONCURRENCY", 2)
+    lock = threading.Lock()
+    running = peak = 0
+
+    def call(item):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.01)
+        with lock:
+            running -= 1
+        return item
+
+    assert len(asyncio.run(run_batch(call, [{}] * 8))) == 8
+    assert peak == 2
+
+
+def test_empty_batch():
+    assert asyncio.run(run_batch(lambda item: item, [])) == []
+
+
+def test_schedule_tasks_reports_each_event():
+    user = "mcp-batch"
+    results = asyncio.run(
+        mcp_server.schedule_tasks(
+            [
+                {"title": "Standup", "start_time": "2031-06-02T09:00:00+00:00", "duration": 15},
+                {"title": "No time"},
+                {"title": "Review", "start_time": "2031-06-02T10:00:00+00:00"},
+            ],
+            user,
+        )
+    )
+    assert [result["ok"] for result in results] == [True, False, True]
+    assert results[1]["error"] == "KeyError: 'start_time'"
+    assert [event["event"] for event in calendar_store.list_events(user)["events"]] == ["Standup", "Review"]
+
+
+def test_import_leaves_the_core_and_stores_alone():
+    heavy = ("agno", "calendar_store", "core", "jobs", "reflection", "task_timers", "tools")
+    loaded = subprocess.run(
+        [sys.executable, "-c", f"import sys, mcp_server; print([m for m in {heavy!r} if m in sys.modules])"],
+        cwd=os.path.dirname(mcp_server.__file__),
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.strip()
+    assert loaded == "[]"
@@ -0,0 +1,81 @@
+import asyncio
+import os
+
+from notifications import CopyWriter, FileSink, Notification, NotificationPipeline
+
+
+class FakeResponse:
+    def __init__(self, content):
+        self.content = content
+
+
+class FakeModel:
+    id = "fake-notify-model"
+
+    def __init__(self):
+        self.calls = 0
+
+    async def aresponse(self, messages):
+        self.calls += 1
+        items = messages[-1].content.splitlines()
+        return FakeResponse("[" + ", ".join(f'"copy {n}"' for n in range(1, len(items) + 1)) + "]")
+
+
+def notification(task_id: str, title: str) -> Notification:
+    return Notification(user_id="u", task_id=task_id, kind="delayed", title=title)
+
+
+def test_model_factory_is_resolved_on_first_write():
+    built = []
+    model = FakeModel()
+
+    def factory():
+        built.append(True)
+        return model
+
+    writer = CopyWriter(factory, items_per_prompt=10)
+    assert built == [] and writer.model is None
+
+    batch = [notification("1", "Write report"), notification("2", "Call Sam")]
+    asyncio.run(writer.write(batch))
+
+    assert built == [True]
+    assert writer.model is model
+    assert [n.message for n in batch] == ["copy 1", "copy 2"]
+
+
+def test_factory_failure_falls_back_and_retries():
+    attempts = []
+
+    def factory():
+        attempts.append(True)
+        raise RuntimeError("no credentials")
+
+    writer = CopyWriter(factory)
+    first = [notification("1", "Write report")]
+    asyncio.run(writer.write(first))
+    asyncio.run(writer.write([notification("2", "Call Sam")]))
+
+    assert first[0].message == "'Write report' is waiting for you."
+    assert len(attempts) == 2
+
+
+def test_repeated_copy_comes_from_the_template_cache():
+    model = FakeModel()
+    writer = CopyWriter(model)
+    asyncio.run(writer.write([notification("1", "Write report")]))
+    again = [notification("1", "Write report")]
+    asyncio.run(writer.write(again))
+
+    assert model.calls == 1
+    assert writer.cache_hits == 1
+    assert again[0].message == "copy 1"
+
+
+def test_file_sink_defaults_next_to_the_database(monkeypatch, tmp_path):
+    monkeypatch.setenv("DOABLE_DB_FILE", str(tmp_path / "data" / "doable.db"))
+    monkeypatch.delenv("DOABLE_NOTIFY_FILE")
+    sinks = [sink for sink in NotificationPipeline.from_env().sinks if isinstance(sink, FileSink)]
+    assert [sink.path for sink in sinks] == [os.path.join(str(tmp_path), "data", "notifications.jsonl")]
+    monkeypatch.setenv("DOABLE_NOTIFY_FILE", "")
+    assert not any(isinstance(sink, FileSink) for sink in NotificationPipeline.from_env().sinks)
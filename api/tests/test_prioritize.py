@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from prioritize import QUADRANTS, rank_tasks, score_tasks
+
+NOW = datetime(2026, 3, 4, 12, 0, tzinfo=timezone.utc)
+
+
+def due_in(hours: float) -> str:
+    return (NOW + timedelta(hours=hours)).isoformat()
+
+
+def test_quadrants():
+    tasks = [
+        {"_id": "a", "title": "Tax return", "priority": 5, "dueDate": due_in(6)},
+        {"_id": "b", "title": "Learn Spanish", "priority": 5},
+        {"_id": "c", "title": "Reply to newsletter", "priority": 1, "dueDate": due_in(2)},
+        {"_id": "d", "title": "Sort photos", "priority": 1},
+    ]
+    ranked = rank_tasks(tasks, now=NOW)
+    assert [task["_id"] for task in ranked] == ["a", "b", "c", "d"]
+    assert [task["eisenhowerQuadrant"] for task in ranked] == list(QUADRANTS)
+    assert [task["priority"] for task in ranked] == [5, 4, 2, 1]
+    assert [task["rank"] for task in ranked] == [1, 2, 3, 4]
+
+
+def test_urgency_rises_as_the_due_date_nears():
+    tasks = [{"title": f"t{hours}", "dueDate": due_in(hours)} for hours in (240, 72, 24, 1, -5)]
+    urgency = score_tasks(tasks, now=NOW)["urgency"]
+    assert np.all(np.diff(urgency) > 0)
+    assert urgency[0] < 0.1 and urgency[-1] > 0.9
+
+
+def test_effort_eats_into_the_slack():
+    tasks = [
+        {"title": "short", "dueDate": due_in(48), "effortEstimateMins": 30},
+        {"title": "long", "dueDate": due_in(48), "effortEstimateMins": 20 * 60},
+    ]
+    urgency = score_tasks(tasks, now=NOW)["urgency"]
+    assert urgency[1] > urgency[0]
+
+
+def test_recent_delay_fades():
+    tasks = [
+        {"title": "fresh", "lastDelayedAt": (NOW - timedelta(hours=1)).isoformat()},
+        {"title": "old", "lastDelayedAt": (NOW - timedelta(days=30)).isoformat()},
+        {"title": "never"},
+    ]
+    urgency = score_tasks(tasks, now=NOW)["urgency"]
+    assert urgency[0] > urgency[1] > urgency[2]
+
+
+def test_alignment_with_the_users_why():
+    tasks = [
+        {"title": "Run 5k training", "why": "marathon fitness", "priority": 3},
+        {"title": "Clean garage", "why": "tidy house", "priority": 3},
+    ]
+    importance = score_tasks(tasks, user_why="Finish a marathon and build fitness", now=NOW)["importance"]
+    assert importance[0] > importance[1]
+
+
+def test_completed_tasks_and_limit():
+    tasks = [
+        {"_id": "done", "title": "Done", "priority": 5, "isCompleted": True},
+        {"_id": "x", "title": "X", "priority": 2},
+        {"_id": "y", "title": "Y", "priority": 4},
+    ]
+    ranked = rank_tasks(tasks, now=NOW, limit=1)
+    assert [task["_id"] for task in ranked] == ["y"]
+
+
+def test_ties_keep_input_order():
+    tasks = [{"_id": str(i), "title": "Same"} for i in range(5)]
+    assert [task["_id"] for task in rank_tasks(tasks, now=NOW)] == ["0", "1", "2", "3", "4"]
+
+
+def test_empty_list():
+    assert rank_tasks([], "anything", NOW) == []
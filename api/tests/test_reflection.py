@@ -0,0 +1,60 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from calendar_store import calendar_store
+from reflection import ReflectionStore, extract_claim
+
+
+@pytest.mark.parametrize(
+    "step",
+    [
+        "I added a note to 'Project plan'",
+        "Add more detail to 'Launch' before 2030-01-02T09:00:00Z",
+        "Reviewed the schedule for 'Q3 roadmap'",
+        "Looked up free time for the team",
+    ],
+)
+def test_steps_without_a_booking_claim(step):
+    assert extract_claim(step) is None
+
+
+@pytest.mark.parametrize(
+    "step, title",
+    [
+        ("Scheduled 'Design review' for 2030-01-02T09:00:00Z", "Design review"),
+        ("Booked \"Dentist\"", "Dentist"),
+        ("Added 'Gym' to your calendar", "Gym"),
+        ("Called schedule_meeting for 'Standup'", "Standup"),
+    ],
+)
+def test_booking_claims(step, title):
+    assert extract_claim(step)["title"] == title
+
+
+def test_claim_time_is_parsed():
+    claim = extract_claim("Rescheduled 'Sync' to 2030-01-02 15:30+02:00")
+    assert claim["start"] == datetime(2030, 1, 2, 13, 30, tzinfo=timezone.utc).timestamp()
+
+
+def test_verify_checks_claims_against_the_calendar(tmp_path):
+    store = ReflectionStore(str(tmp_path / "reflections.db"))
+    user = "reflection-user"
+    calendar_store.add_event("Planning", datetime(2030, 3, 1, 9, tzinfo=timezone.utc), 30, user)
+
+    verdict = store.verify("Plan the week", ["Scheduled 'Planning' for 2030-03-01T09:00:00Z"], user)
+    assert verdict["verified"] is True
+
+    verdict = store.verify("Plan the week", ["Booked 'Retro' for 2030-03-01T10:00:00Z"], user)
+    assert verdict["verified"] is False
+    assert verdict["total_steps"] == 2 and verdict["checked_steps"] == 1
+    assert any("Retro" in issue for issue in verdict["issues"])
+
+
+def test_unchanged_steps_return_the_cached_verdict(tmp_path):
+    store = ReflectionStore(str(tmp_path / "reflections.db"))
+    steps = ["I added a note to 'Project plan'"]
+    first = store.verify("Write docs", steps, "cache-user")
+    again = store.verify("Write docs", steps, "cache-user")
+    assert first["verified"] is True
+    assert again["cached"] is True and again["checked_steps"] == 0
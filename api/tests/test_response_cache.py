@@ -0,0 +1,90 @@
+import threading
+from datetime import datetime, timedelta, timezone
+
+import core
+from response_cache import ResponseCache, hashing_embedder, normalize_prompt
+
+
+def test_normalized_prompts_share_an_entry():
+    cache = ResponseCache()
+    cache.put("What's on my calendar today?", "Nothing.", scope="u1")
+    assert normalize_prompt("  what's on my CALENDAR today ") == normalize_prompt("What's on my calendar today?")
+    assert cache.get("what's on my calendar today", scope="u1") == "Nothing."
+    assert cache.get("what's on my calendar today", scope="u2") is None
+
+
+def test_invalidate_drops_entries_and_in_flight_replies():
+    cache = ResponseCache()
+    cache.put("hi", "hello")
+    generation = cache.generation
+    cache.invalidate()
+    assert cache.get("hi") is None
+    cache.put("hi", "stale", generation=generation)
+    assert cache.get("hi") is None
+
+
+def test_similar_prompt_hits_with_an_embedder():
+    cache = ResponseCache(embedder=hashing_embedder, similarity_threshold=0.8)
+    cache.put("show my calendar events for today please", "Two meetings.")
+    assert cache.get("show my calendar events for today") == "Two meetings."
+    assert cache.get("book a flight to Lisbon") is None
+
+
+def test_lru_eviction():
+    cache = ResponseCache(max_entries=2)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    cache.get("a")
+    cache.put("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+
+
+def test_invalidate_from_another_thread_during_lookups():
+    cache = ResponseCache(max_entries=256, embedder=hashing_embedder)
+    errors = []
+    done = threading.Event()
+
+    def invalidate():
+        while not done.is_set():
+            cache.invalidate()
+
+    def use():
+        try:
+            for i in range(500):
+                cache.put(f"prompt {i % 300}", "reply")
+                cache.get(f"prompt {(i * 7) % 300} again")
+        except Exception as exc:  # pragma: no cover - the failure being tested for
+            errors.append(exc)
+
+    invalidator = threading.Thread(target=invalidate)
+    users = [threading.Thread(target=use) for _ in range(4)]
+    invalidator.start()
+    for thread in users:
+        thread.start()
+    for thread in users:
+        thread.join()
+    done.set()
+    invalidator.join()
+    assert errors == []
+
+
+def test_scope_changes_at_the_users_midnight(monkeypatch):
+    now = [datetime(2030, 1, 7, 23, 30, tzinfo=timezone.utc)]
+
+    class Clock(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return now[0].astimezone(tz)
+
+    monkeypatch.setattr(core, "datetime", Clock)
+    assert core.cache_scope("u1", None, "Europe/Berlin") == "u1:2030-01-08"
+    assert core.cache_scope("u1", None) == "u1:2030-01-07"
+    assert core.cache_scope("u1", None, "Mars/Olympus") == "u1:2030-01-07"
+    now[0] += timedelta(hours=1)
+    assert core.cache_scope("u1", None) == "u1:2030-01-08"
+    assert core.cache_scope("u2", None) != core.cache_scope("u1", None)
+
+
+def test_turns_within_a_session_are_not_cached():
+    assert core.cache_scope("u1", "s1") is None
@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import pytest
+
+import router
+from calendar_store import calendar_store
+
+
+@pytest.fixture
+def user(request):
+    return f"router-{request.node.name}"
+
+
+def test_booking_goes_to_the_agent_without_commit(user):
+    assert router.route("schedule Standup tomorrow at 10am for 15m", user) is None
+    assert calendar_store.list_events(user)["total"] == 0
+
+
+def test_booking_with_commit_uses_the_users_time_zone(user, monkeypatch):
+    zone = ZoneInfo("America/Los_Angeles")
+    # 23:30 on Jan 7 in Los Angeles is already Jan 8 in UTC.
+    now = datetime(2030, 1, 7, 23, 30, tzinfo=zone)
+
+    class Clock(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return now.astimezone(tz) if tz else now.replace(tzinfo=None)
+
+    monkeypatch.setattr(router, "datetime", Clock)
+    reply = router.route("schedule Standup tomorrow at 10am for 15m", user, "America/Los_Angeles", commit=True)
+    assert "Standup" in reply and "2030-01-08T10:00:00-08:00" in reply
+    event = calendar_store.list_events(user)["events"][0]
+    assert datetime.fromisoformat(event["time"]) == datetime(2030, 1, 8, 10, 0, tzinfo=zone)
+    assert event["duration_minutes"] == 15
+
+
+def test_booking_without_a_clock_time_goes_to_the_agent(user):
+    for message in ("schedule standup tomorrow for 15 min", "schedule review tomorrow for 30 min"):
+        assert router.route(message, user, "Europe/Berlin", commit=True) is None
+    assert calendar_store.list_events(user)["total"] == 0
+
+
+def test_today_is_the_users_day(user, monkeypatch):
+    zone = ZoneInfo("Asia/Tokyo")
+    now = datetime(2030, 1, 7, 8, 0, tzinfo=zone)  # still Jan 6 in UTC
+    calendar_store.add_event("Breakfast", now + timedelta(hours=1), 30, user)
+    calendar_store.add_event("Yesterday", now - timedelta(days=1), 30, user)
+
+    class Clock(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return now.astimezone(tz) if tz else now.replace(tzinfo=None)
+
+    monkeypatch.setattr(router, "datetime", Clock)
+    reply = router.route("what's on my calendar today?", user, "Asia/Tokyo")
+    assert "Breakfast" in reply and "Yesterday" not in reply
+    assert "2030-01-07T09:00:00+09:00" in reply
+
+
+def test_unknown_time_zone_goes_to_the_agent(user):
+    assert router.route("list my calendar today", user, "Mars/Olympus") is None
+
+
+def test_other_messages_go_to_the_agent(user):
+    assert router.route("help me plan my week", user) is None
+    assert router.route("schedule a meeting with Sam", user, commit=True) is None
@@ -0,0 +1,96 @@
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from scheduler import _greedy, free_intervals, parse_workdays, plan, PlanTask
+
+# A Monday.
+MONDAY = datetime(2026, 3, 2, tzinfo=timezone.utc)
+
+
+def test_parse_workdays():
+    assert parse_workdays("mon-fri") == {0, 1, 2, 3, 4}
+    assert parse_workdays("Sun-Thu") == {6, 0, 1, 2, 3}
+    assert parse_workdays("mon, wed,friday") == {0, 2, 4}
+    with pytest.raises(ValueError):
+        parse_workdays("weekdays")
+    with pytest.raises(ValueError):
+        parse_workdays("")
+
+
+def test_free_intervals_follow_workdays():
+    free = free_intervals(MONDAY, MONDAY + timedelta(days=7), [], "09:00-17:00", "UTC", parse_workdays("sat,sun"))
+    starts = [datetime.fromtimestamp(a, timezone.utc) for a, _ in free]
+    assert [start.weekday() for start in starts] == [5, 6]
+
+
+def test_plan_uses_the_requested_workdays():
+    tasks = [{"title": "Write report", "effortEstimateMins": 60}]
+    weekdays = plan(tasks, MONDAY - timedelta(days=2), MONDAY + timedelta(days=5))
+    assert weekdays["scheduled"][0]["start"].startswith("2026-03-02T09:00")
+    weekend = plan(tasks, MONDAY - timedelta(days=2), MONDAY + timedelta(days=5), workdays="sat-sun")
+    assert weekend["scheduled"][0]["start"].startswith("2026-02-28T09:00")
+
+
+def test_plan_skips_busy_time():
+    busy = [(MONDAY.replace(hour=9).timestamp(), MONDAY.replace(hour=10).timestamp())]
+    result = plan([{"title": "Focus", "effortEstimateMins": 90}], MONDAY, MONDAY + timedelta(days=1), busy)
+    assert result["scheduled"][0]["start"].startswith("2026-03-02T10:00")
+
+
+def test_greedy_takes_the_earliest_gap_that_fits():
+    day = MONDAY.timestamp()
+    free = [[day, day + 1800], [day + 3600, day + 3 * 3600], [day + 4 * 3600, day + 8 * 3600]]
+    tasks = [PlanTask("a", 60), PlanTask("b", 20), PlanTask("c", 120), PlanTask("d", 300)]
+    placed, unplaced = _greedy(tasks, free)
+    assert [(task.title, start - day) for task, start, _ in placed] == [("a", 3600), ("b", 0), ("c", 4 * 3600)]
+    assert [task.title for task in unplaced] == ["d"]
+    # The caller's gaps are left as they were.
+    assert free[0] == [day, day + 1800]
+
+
+def test_greedy_matches_a_linear_first_fit():
+    rng = random.Random(7)
+    free, cursor = [], MONDAY.timestamp()
+    for _ in range(200):
+        cursor += rng.randint(1, 120) * 60
+        length = rng.randint(10, 240) * 60
+        free.append([cursor, cursor + length])
+        cursor += length
+    tasks = [PlanTask(str(i), rng.randint(10, 180)) for i in range(300)]
+
+    expected, gaps = [], [slot[:] for slot in free]
+    for task in tasks:
+        needed = task.minutes * 60
+        for slot in gaps:
+            if slot[1] - slot[0] >= needed:
+                expected.append((task.title, slot[0]))
+                slot[0] += needed
+                break
+    placed, _ = _greedy(tasks, free)
+    assert [(task.title, start) for task, start, _ in placed] == expected
+
+
+def test_optimize_does_not_lose_to_greedy():
+    tasks = [
+        {"title": "Low", "effortEstimateMins": 240, "priority": 1},
+        {"title": "High", "effortEstimateMins": 240, "priority": 5, "dueDate": "2026-03-02T13:00:00Z"},
+        {"title": "Mid", "effortEstimateMins": 120, "priority": 3},
+    ]
+    greedy = plan(tasks, MONDAY, MONDAY + timedelta(days=1))
+    optimized = plan(tasks, MONDAY, MONDAY + timedelta(days=1), mode="optimize")
+    assert optimized["score"] >= greedy["score"]
+
+
+def test_optimize_is_bounded_by_time():
+    rng = random.Random(3)
+    tasks = [
+        {"title": f"Task {i}", "effortEstimateMins": rng.randint(15, 120), "priority": rng.randint(1, 5)}
+        for i in range(400)
+    ]
+    started = time.perf_counter()
+    result = plan(tasks, MONDAY, MONDAY + timedelta(days=30), mode="optimize", max_iterations=10**9, max_seconds=0.2)
+    assert time.perf_counter() - started < 2
+    assert len(result["scheduled"]) + len(result["unscheduled"]) == 400
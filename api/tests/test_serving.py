@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+from serving import InFlightRuns, parse_args
+
+
+def test_drain_waits_for_runs_in_flight():
+    runs = InFlightRuns()
+    finished = []
+
+    async def run(seconds: float):
+        async with runs.track():
+            await asyncio.sleep(seconds)
+            finished.append(seconds)
+
+    async def main():
+        tasks = [asyncio.create_task(run(0.01)), asyncio.create_task(run(0.03))]
+        await asyncio.sleep(0)
+        assert runs.count == 2
+        assert await runs.drain(1)
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+    assert finished == [0.01, 0.03]
+    assert runs.count == 0
+
+
+def test_drain_gives_up_after_the_timeout():
+    runs = InFlightRuns()
+
+    async def main():
+        gate = asyncio.Event()
+
+        async def run():
+            async with runs.track():
+                await gate.wait()
+
+        task = asyncio.create_task(run())
+        await asyncio.sleep(0)
+        assert not await runs.drain(0.01)
+        assert runs.count == 1
+        gate.set()
+        await task
+        assert await runs.drain(0.01)
+
+    asyncio.run(main())
+
+
+def test_drain_returns_at_once_when_idle():
+    assert asyncio.run(InFlightRuns().drain(0))
+
+
+def test_failed_run_is_no_longer_in_flight():
+    runs = InFlightRuns()
+
+    async def main():
+        with pytest.raises(RuntimeError):
+            async with runs.track():
+                raise RuntimeError("model error")
+        return await runs.drain(0)
+
+    assert asyncio.run(main())
+    assert runs.count == 0
+
+
+def test_drain_timeout_comes_from_the_environment(monkeypatch):
+    monkeypatch.setenv("DOABLE_DRAIN_TIMEOUT", "12.5")
+    assert parse_args([]).drain_timeout == 12.5
+    assert parse_args(["--drain-timeout", "3"]).drain_timeout == 3
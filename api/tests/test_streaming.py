@@ -0,0 +1,117 @@
+import asyncio
+import json
+from uuid import uuid4
+
+import pytest
+from fastapi.testclient import TestClient
+
+import index
+from benchmark import StubGemini
+from core import cache_scope, prepare_model, response_cache
+
+
+@pytest.fixture(scope="module")
+def client():
+    original = index.assistant.model
+    index.assistant.model = prepare_model(StubGemini(first_token_ms=0, tokens_per_second=10_000, reply_tokens=3))
+    yield TestClient(index.app)
+    index.assistant.model = original
+
+
+@pytest.fixture
+def session():
+    return {"user_id": "stream-user", "session_id": f"stream-{uuid4().hex[:8]}"}
+
+
+def _sse_events(body: str) -> list[tuple[str, dict]]:
+    events = []
+    for frame in body.split("\n\n"):
+        if not frame:
+            continue
+        kind, data = frame.split("\n")
+        assert kind.startswith("event: ") and data.startswith("data: ")
+        events.append((kind[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+
+def test_sse_stream_relays_the_run(client, session):
+    response = client.post("/chat/stream", json={"message": "help me plan my afternoon", **session})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = _sse_events(response.text)
+    assert all(kind == payload["type"] for kind, payload in events)
+    kinds = [kind for kind, _ in events]
+    assert kinds[0] == "start" and kinds[-1] == "done"
+    assert "".join(payload["content"] for kind, payload in events if kind == "content") == "token0 token1 token2 "
+    assert len({payload["run_id"] for _, payload in events}) == 1
+
+
+def test_ndjson_stream_has_one_event_per_line(client, session):
+    response = client.post("/chat/stream?format=ndjson", json={"message": "help me plan my evening", **session})
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert response.text.endswith("\n")
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert events[0]["type"] == "start" and events[-1]["type"] == "done"
+    assert any(event["type"] == "content" for event in events)
+
+
+def test_completed_reply_is_served_from_the_cache(client):
+    body = {"message": f"what should I focus on? {uuid4().hex}", "user_id": "stream-user"}
+    first = client.post("/chat/stream?format=ndjson", json=body)
+    reply = "".join(json.loads(line).get("content", "") for line in first.text.splitlines())
+    second = [json.loads(line) for line in client.post("/chat/stream?format=ndjson", json=body).text.splitlines()]
+    assert second == [
+        {"type": "content", "run_id": None, "content": reply, "cached": True},
+        {"type": "done", "run_id": None, "cached": True},
+    ]
+
+
+def test_cached_reply_skips_the_model(client, monkeypatch):
+    response_cache.put("any news?", "Nothing new.", cache_scope("stream-user", None))
+    monkeypatch.setattr(index.assistant, "arun", lambda *args, **kwargs: pytest.fail("model was called"))
+    events = _sse_events(client.post("/chat/stream", json={"message": "any news?", "user_id": "stream-user"}).text)
+    assert [payload for _, payload in events] == [
+        {"type": "content", "run_id": None, "content": "Nothing new.", "cached": True},
+        {"type": "done", "run_id": None, "cached": True},
+    ]
+
+
+def test_turns_in_a_session_are_not_cached(client, session):
+    body = {"message": "what next?", **session}
+    for _ in range(2):
+        events = [json.loads(line) for line in client.post("/chat/stream?format=ndjson", json=body).text.splitlines()]
+        assert events[0]["type"] == "start" and not any(event.get("cached") for event in events)
+    stored = asyncio.run(index.assistant.aget_session(session_id=session["session_id"]))
+    assert len(stored.runs) == 2
+
+
+def test_routed_command_skips_the_model(client, session, monkeypatch):
+    monkeypatch.setattr(index.assistant, "arun", lambda *args, **kwargs: pytest.fail("model was called"))
+    response = client.post("/chat/stream?format=ndjson", json={"message": "list my calendar today", **session})
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert [event["type"] for event in events] == ["content", "done"]
+    assert events[0]["routed"] and events[0]["content"] == "Your calendar is clear today."
+
+
+def test_client_disconnect_cancels_the_run(client, session, monkeypatch):
+    cancelled = []
+    monkeypatch.setattr(index.assistant, "cancel_run", cancelled.append)
+
+    class Request:
+        def __init__(self):
+            self.polls = 0
+
+        async def is_disconnected(self):
+            self.polls += 1
+            return self.polls > 1
+
+    async def main():
+        request = index.ChatRequest(message="write me a long plan", **session)
+        stream = index._stream_chat(Request(), request, "ndjson")
+        frames = [frame async for frame in stream]
+        assert [json.loads(frame)["type"] for frame in frames] == ["start"]
+        return json.loads(frames[0])["run_id"]
+
+    run_id = asyncio.run(main())
+    assert cancelled == [run_id]
+    assert index.in_flight.count == 0
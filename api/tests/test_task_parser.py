@@ -0,0 +1,95 @@
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+from task_parser import parse_date, parse_task_input, parse_tasks, ProjectIndex
+
+# A Wednesday.
+NOW = datetime(2026, 3, 4, 15, 30, tzinfo=timezone.utc)
+PROJECTS = [{"_id": "p1", "title": "Work"}, {"_id": "p2", "title": "Home"}]
+
+
+def test_all_tokens():
+    task = parse_task_input("Write report +work #writing #q1 @fri 4pm 1h30m", PROJECTS, NOW)
+    assert task.title == "Write report"
+    assert task.project_id == "p1"
+    assert task.tags == ["writing", "q1"]
+    assert task.due_date == datetime(2026, 3, 6, 16, 0, tzinfo=timezone.utc)
+    assert task.has_time
+    assert task.effort_estimate_mins == 90
+
+
+def test_plain_text_is_the_title():
+    task = parse_task_input("  Call the bank  ", PROJECTS, NOW)
+    assert task.title == "Call the bank"
+    assert (task.project_id, task.due_date, task.effort_estimate_mins, task.tags) == (None, None, None, [])
+
+
+def test_only_the_first_project_date_and_estimate_count():
+    task = parse_task_input("Plan +home +work @today @tomorrow 20m then 45m", PROJECTS, NOW)
+    assert task.project_id == "p2"
+    assert task.due_date == datetime(2026, 3, 4, tzinfo=timezone.utc)
+    assert task.effort_estimate_mins == 20
+    assert task.title == "Plan +work @tomorrow then 45m"
+
+
+def test_unknown_project_and_date():
+    task = parse_task_input("Sort +garden @someday", PROJECTS, NOW)
+    assert task.project_id is None
+    assert task.due_date is None
+    assert task.title == "Sort"
+
+
+def test_empty_title():
+    assert parse_task_input("#misc 15m", (), NOW).title == "Untitled Task"
+
+
+def test_parse_date():
+    today = datetime(2026, 3, 4, tzinfo=timezone.utc)
+    assert parse_date("tomorrow", today).day == 5
+    # Day names are the next occurrence, never today.
+    assert parse_date("wed", today).day == 11
+    assert parse_date("Monday", today).day == 9
+    assert parse_date("2026-04-01", today) == datetime(2026, 4, 1, tzinfo=timezone.utc)
+    assert parse_date("04/01", today) is None
+
+
+def test_times_of_day():
+    assert parse_task_input("A @today 12am", (), NOW).due_date.hour == 0
+    assert parse_task_input("A @today 12pm", (), NOW).due_date.hour == 12
+    assert parse_task_input("A @today 10:45am", (), NOW).due_date.minute == 45
+    late = parse_task_input("A @today 25:00", (), NOW)
+    assert not late.has_time and late.due_date.hour == 0
+
+
+def test_a_number_after_the_date_is_a_time_only_with_minutes_or_am_pm():
+    assert parse_task_input("A @today 10:30", (), NOW).due_date.hour == 10
+    assert parse_task_input("A @today 4 pm", (), NOW).due_date.hour == 16
+    task = parse_task_input("Call 5 people @today 4 people", (), NOW)
+    assert not task.has_time and task.title == "Call 5 people 4 people"
+
+
+def test_date_followed_by_a_duration():
+    for text, minutes in (("Standup @tomorrow 15 min", 15), ("Review @tomorrow 30 min", 30)):
+        task = parse_tasks([text], (), NOW)[0]
+        assert task.due_date == datetime(2026, 3, 5, tzinfo=timezone.utc)
+        assert not task.has_time
+        assert task.effort_estimate_mins == minutes
+        assert task.title == text.split(" @")[0]
+    task = parse_task_input("Sync @tomorrow 10am 2 hours", (), NOW)
+    assert (task.due_date.hour, task.effort_estimate_mins) == (10, 120)
+
+
+def test_dates_follow_the_callers_time_zone():
+    # Already Thursday in Tokyo while it is still Wednesday in UTC.
+    now = datetime(2026, 3, 4, 20, 0, tzinfo=timezone.utc).astimezone(ZoneInfo("Asia/Tokyo"))
+    task = parse_task_input("Standup @today 10am", (), now)
+    assert task.due_date.isoformat() == "2026-03-05T10:00:00+09:00"
+    assert task.to_dict()["dueDate"] == "2026-03-05T01:00:00+00:00"
+
+
+def test_batch_skips_list_markers_and_blank_lines():
+    lines = ["- [ ] Email Sam +work", "", "2. Buy milk @tomorrow", "* [x] Done already", "   "]
+    tasks = parse_tasks(lines, ProjectIndex(PROJECTS), NOW)
+    assert [task.title for task in tasks] == ["Email Sam", "Buy milk", "Done already"]
+    assert tasks[0].to_dict() == {"title": "Email Sam", "tags": [], "projectId": "p1"}
+    assert tasks[1].to_dict()["dueDate"] == "2026-03-05T00:00:00+00:00"
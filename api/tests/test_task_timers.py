@@ -0,0 +1,108 @@
+from calendar_store import format_time
+import task_timers
+from task_timers import DAY, DELAYED, OVERDUE, REVERSE_POMODORO, TaskTimers
+
+T0 = 1_800_000_000.0
+
+
+def task(task_id: str, due: float, **fields) -> dict:
+    return {"_id": task_id, "title": f"Task {task_id}", "dueDate": format_time(due), **fields}
+
+
+def test_transitions_fire_in_order(tmp_path):
+    timers = TaskTimers(str(tmp_path / "timers.db"))
+    timers.track([task("a", T0)], user_id="u", now=T0 - 60)
+
+    assert timers.fire_due(now=T0 - 1) == []
+    assert [e["type"] for e in timers.fire_due(now=T0)] == [DELAYED]
+    assert [e["type"] for e in timers.fire_due(now=T0 + DAY)] == [REVERSE_POMODORO]
+    assert [e["type"] for e in timers.fire_due(now=T0 + 3 * DAY)] == [OVERDUE]
+    assert timers.status(["a"])[0]["nextTransitionAt"] is None
+    assert [e["type"] for e in timers.events("u")["events"]] == [DELAYED, REVERSE_POMODORO, OVERDUE]
+
+
+def test_catch_up_reports_only_the_current_state(tmp_path):
+    timers = TaskTimers(str(tmp_path / "timers.db"))
+    timers.track([task("a", T0)], now=T0 - 60)
+    events = timers.fire_due(now=T0 + 1.5 * DAY)
+    assert [e["type"] for e in events] == [REVERSE_POMODORO]
+    assert events[0]["reversePomodoroActive"] is True
+
+
+def test_completed_and_untracked_tasks_never_fire(tmp_path):
+    timers = TaskTimers(str(tmp_path / "timers.db"))
+    timers.track([task("a", T0), task("b", T0)], now=T0 - 60)
+    timers.track([task("a", T0, isCompleted=True)], now=T0 - 30)
+    timers.untrack(["b"])
+    assert timers.fire_due(now=T0 + 10 * DAY) == []
+
+
+def test_timer_tracked_by_another_process_fires_here(tmp_path):
+    db = str(tmp_path / "timers.db")
+    here, other = TaskTimers(db), TaskTimers(db)
+    other.track([task("a", T0)], now=T0 - 60)
+
+    assert here.refresh() is True
+    assert [e["taskId"] for e in here.fire_due(now=T0)] == ["a"]
+    # Nothing left for the other process to fire.
+    assert other.fire_due(now=T0) == []
+
+
+def test_deadline_moved_by_another_process_is_rescheduled(tmp_path):
+    db = str(tmp_path / "timers.db")
+    here, other = TaskTimers(db), TaskTimers(db)
+    here.track([task("a", T0)], now=T0 - 60)
+    other.refresh()
+
+    # The other process fires first; our heap still has the old deadline.
+    assert [e["type"] for e in other.fire_due(now=T0)] == [DELAYED]
+    assert here.fire_due(now=T0) == []
+    # The entry now follows the stored deadline instead of being dropped.
+    assert [e["type"] for e in here.fire_due(now=T0 + DAY)] == [REVERSE_POMODORO]
+
+
+def test_own_writes_do_not_trigger_a_reload(tmp_path):
+    timers = TaskTimers(str(tmp_path / "timers.db"))
+    timers.track([task("a", T0)], now=T0 - 60)
+    timers.fire_due(now=T0)
+    assert timers.refresh() is False
+
+
+def test_past_due_task_reports_its_state_when_tracked(tmp_path):
+    timers = TaskTimers(str(tmp_path / "timers.db"))
+    seen = []
+    timers.subscribe(seen.extend)
+    assert timers.track([task("a", T0)], user_id="u", now=T0 + 1.5 * DAY) == 1
+    assert [e["type"] for e in seen] == [REVERSE_POMODORO]
+    assert timers.status(["a"])[0]["reversePomodoroActive"] is True
+    # Tracking it again in the same state reports nothing new.
+    timers.track([task("a", T0)], user_id="u", now=T0 + 1.6 * DAY)
+    assert [e["type"] for e in timers.events("u")["events"]] == [REVERSE_POMODORO]
+    assert [e["type"] for e in timers.fire_due(now=T0 + 3 * DAY)] == [OVERDUE]
+
+
+def test_refresh_reads_only_changed_rows(tmp_path, monkeypatch):
+    db = str(tmp_path / "timers.db")
+    here, other = TaskTimers(db), TaskTimers(db)
+    other.track([task(str(i), T0 + i) for i in range(1000)], now=T0 - 60)
+    assert here.refresh() is True
+
+    def full_reload():
+        raise AssertionError("full reload")
+
+    monkeypatch.setattr(here, "_load", full_reload)
+    other.track([task("late", T0 - 30)], now=T0 - 60)
+    other.untrack(["0"])
+    assert here.refresh() is True
+    assert here.refresh() is False
+    assert [e["taskId"] for e in here.fire_due(now=T0)] == ["late"]
+
+
+def test_refresh_reloads_after_falling_behind_the_log(tmp_path, monkeypatch):
+    monkeypatch.setattr(task_timers, "CHANGE_LOG_SIZE", 10)
+    db = str(tmp_path / "timers.db")
+    here, other = TaskTimers(db), TaskTimers(db)
+    for i in range(30):
+        other.track([task(str(i), T0 + i)], now=T0 - 60)
+    assert here.refresh() is True
+    assert len(here.fire_due(now=T0 + 100)) == 30
@@ -0,0 +1,98 @@
+import asyncio
+import threading
+
+import pytest
+
+from telemetry import Counter, Histogram, HttpMetrics, Registry, span
+import telemetry
+
+
+def test_counter_and_histogram_render():
+    registry = Registry()
+    calls = registry.counter("calls_total", "Calls.", ("tool",))
+    latency = registry.histogram("latency_seconds", "Latency.", ("tool",), buckets=(0.1, 1.0))
+    calls.inc(tool="a")
+    calls.inc(2, tool="a")
+    latency.observe(0.5, tool="a")
+    text = registry.render()
+    assert 'calls_total{tool="a"} 3.0' in text
+    assert 'latency_seconds_bucket{tool="a",le="0.1"} 0' in text
+    assert 'latency_seconds_bucket{tool="a",le="1.0"} 1' in text
+    assert 'latency_seconds_count{tool="a"} 1' in text
+
+
+def test_render_while_other_threads_add_series():
+    counter = Counter("c", "C.", ("key",))
+    histogram = Histogram("h", "H.", ("key",))
+    done = threading.Event()
+    errors = []
+
+    def write():
+        for i in range(3000):
+            if done.is_set():
+                return
+            counter.inc(key=str(i))
+            histogram.observe(0.1, key=str(i))
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    try:
+        for _ in range(10):
+            try:
+                list(counter.render())
+                list(histogram.render())
+            except RuntimeError as exc:  # dictionary changed size during iteration
+                errors.append(exc)
+    finally:
+        done.set()
+        writer.join()
+    assert errors == []
+
+
+def test_span_counts_errors():
+    with pytest.raises(ValueError):
+        with span("test", "fails"):
+            raise ValueError("boom")
+    assert telemetry.SPAN_ERRORS._values[("test", "fails")] == 1.0
+
+
+class Route:
+    path = "/stream"
+
+
+async def streaming_app(scope, receive, send):
+    scope["route"] = Route()
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    for _ in range(3):
+        await asyncio.sleep(0.05)
+        await send({"type": "http.response.body", "body": b"x", "more_body": True})
+    await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+def observed(route: str) -> list:
+    return telemetry.HTTP_SECONDS._values.get(("GET", route, 200))
+
+
+def test_http_metrics_time_streams_to_their_end():
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(HttpMetrics(streaming_app)({"type": "http", "method": "GET"}, None, send))
+    row = observed("/stream")
+    assert row[-2] == 1
+    assert row[-1] >= 0.15
+    assert len(sent) == 5
+
+
+def test_http_metrics_record_failed_requests():
+    async def failing_app(scope, receive, send):
+        raise RuntimeError("boom")
+
+    async def send(message):
+        pass
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(HttpMetrics(failing_app)({"type": "http", "method": "POST"}, None, send))
+    assert telemetry.HTTP_SECONDS._values[("POST", "unmatched", 500)][-2] >= 1
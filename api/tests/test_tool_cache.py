@@ -0,0 +1,70 @@
+import os
+
+import pytest
+
+import tool_cache
+from calendar_store import calendar_store, CalendarStore, format_time, parse_time
+from tool_cache import ToolCache
+from tools import book_meeting, calendar_page, free_time
+
+DAY_START, DAY_END = "2031-05-05T09:00:00+00:00", "2031-05-05T17:00:00+00:00"
+
+
+@pytest.fixture
+def user(request):
+    return f"cache-{request.node.name}"
+
+
+def test_booking_invalidates_cached_reads(user):
+    assert calendar_page(user, DAY_START, DAY_END)["total"] == 0
+    assert free_time(user, DAY_START, DAY_END) == [{"start": DAY_START, "end": DAY_END, "minutes": 480}]
+    hits = calendar_page.cache.hits
+    assert calendar_page(user, DAY_START, DAY_END)["total"] == 0
+    assert calendar_page.cache.hits == hits + 1
+
+    version = calendar_store.version
+    book_meeting(user, "Standup", "2031-05-05T09:00:00+00:00", 30)
+    assert calendar_store.version > version
+
+    assert [event["event"] for event in calendar_page(user, DAY_START, DAY_END)["events"]] == ["Standup"]
+    assert free_time(user, DAY_START, DAY_END)[0]["start"] == "2031-05-05T09:30:00+00:00"
+
+
+def test_another_process_writing_invalidates_cached_reads(user):
+    assert free_time(user, DAY_START, DAY_END)[0]["minutes"] == 480
+    other = CalendarStore(os.environ["DOABLE_DB_FILE"])
+    other.add_event("Dentist", parse_time("2031-05-05T09:00:00+00:00"), 60, user)
+    assert free_time(user, DAY_START, DAY_END)[0]["start"] == "2031-05-05T10:00:00+00:00"
+
+
+def test_result_computed_during_a_write_is_not_stored():
+    cache = ToolCache("test", ttl_seconds=60, max_entries=10)
+    version = calendar_store.version
+    calendar_store.add_event("Racing write", parse_time(format_time(0)), 1, "cache-race")
+    cache.put("key", "stale", version)
+    assert cache.get("key", calendar_store.version) == (False, None)
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(tool_cache.time, "monotonic", lambda: now[0])
+    cache = ToolCache("test", ttl_seconds=60, max_entries=10)
+    version = calendar_store.version
+    cache.put("key", "value", version)
+    now[0] += 59
+    assert cache.get("key", version) == (True, "value")
+    now[0] += 2
+    assert cache.get("key", version) == (False, None)
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ToolCache("test", ttl_seconds=60, max_entries=2)
+    version = calendar_store.version
+    cache.put("a", 1, version)
+    cache.put("b", 2, version)
+    assert cache.get("a", version) == (True, 1)
+    cache.put("c", 3, version)
+    assert cache.get("b", version) == (False, None)
+    assert cache.get("a", version) == (True, 1) and cache.get("c", version) == (True, 3)
+    assert cache.stats()["evictions"] == 1
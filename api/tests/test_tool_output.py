@@ -0,0 +1,133 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+import tool_output
+from tool_output import (
+    OutputStats,
+    RelativeClock,
+    count_tokens,
+    encode_events,
+    encode_plan,
+    encode_search,
+    encode_slots,
+    encode_verdict,
+    render,
+)
+
+NOW = datetime(2030, 1, 7, 8, 15, tzinfo=timezone.utc)
+
+
+def at(**delta) -> str:
+    return (NOW + timedelta(**delta)).isoformat()
+
+
+def test_relative_clock():
+    clock = RelativeClock(NOW)
+    assert clock.legend == "times UTC, d0=2030-01-07"
+    assert clock(at(hours=1)) == "d0 09:15"
+    assert clock(at(days=1, minutes=15)) == "d+1 08:30"
+    assert clock(at(days=-1)) == "d-1 08:15"
+    assert clock((NOW + timedelta(seconds=5)).timestamp()) == "d0 08:15:05"
+
+
+def page(count: int, total: int, next_offset):
+    events = [
+        {"id": i, "event": f"Meeting | {i}", "time": at(hours=i), "duration_minutes": 30}
+        for i in range(count)
+    ]
+    return {"events": events, "total": total, "next_offset": next_offset}
+
+
+def test_events_table_with_store_cursor():
+    text = encode_events(page(3, 10, 3))
+    lines = text.splitlines()
+    assert lines[0].startswith("events 1-3 of 10;")
+    assert lines[1] == "id|event|start|min"
+    # Cell separators inside values are escaped.
+    assert lines[2].startswith("0|Meeting / 0|")
+    assert lines[-1] == "more: call again with offset=3"
+
+
+def test_events_stop_at_the_budget():
+    text = encode_events(page(200, 200, None), budget=100)
+    assert count_tokens(text) < 150
+    shown = len(text.splitlines()) - 3
+    assert text.splitlines()[-1] == f"more: call again with offset={shown}"
+
+
+def test_no_events():
+    assert encode_events({"events": [], "total": 0, "next_offset": None}) == "no events (total 0)"
+
+
+def test_slots_cursor_resumes_after_the_last_shown_slot():
+    slots = [{"start": at(hours=2 * i), "end": at(hours=2 * i + 1), "minutes": 60} for i in range(100)]
+    lines = encode_slots(slots, budget=60).splitlines()
+    shown = len(lines) - 3
+    assert lines[-1] == f"more: {100 - shown} not shown; call again with start={slots[shown - 1]['end']}"
+
+
+def plan(blocks: int, committed: bool) -> dict:
+    return {
+        "scheduled": [
+            {"title": f"Task {i}", "start": at(hours=i), "duration_minutes": 30, "priority": 3, "late": False}
+            for i in range(blocks)
+        ],
+        "unscheduled": [{"title": "Huge", "reason": "no free slot long enough"}],
+        "score": 12.5,
+        "committed": committed,
+    }
+
+
+def test_truncated_plan_has_a_cursor():
+    lines = encode_plan(plan(100, False), start=NOW.isoformat(), budget=120).splitlines()
+    more = next(line for line in lines if line.startswith("more:"))
+    shown = sum(1 for line in lines if line.startswith("Task "))
+    assert more == f"more: call again with the same tasks, start={NOW.isoformat()}, offset={shown}"
+    assert lines[0].startswith(f"plan: 100 scheduled, 1 unscheduled, score 12.5, committed n; blocks 1-{shown};")
+    assert lines[-1] == "unscheduled: Huge (no free slot long enough)"
+
+
+def test_plan_offset_continues_where_the_cursor_pointed():
+    lines = encode_plan(plan(10, False), start=NOW.isoformat(), offset=8).splitlines()
+    assert [line.split("|")[0] for line in lines if line.startswith("Task ")] == ["Task 8", "Task 9"]
+    assert not any(line.startswith("more:") for line in lines)
+
+
+def test_committed_plan_points_to_the_calendar():
+    lines = encode_plan(plan(100, True), start=NOW.isoformat(), budget=120).splitlines()
+    assert any(line.endswith("they are booked, list them with get_calendar_events") for line in lines)
+
+
+def test_search_clips_long_text():
+    text = encode_search([{"score": 0.9, "kind": "memory", "text": "word " * 100}])
+    row = text.splitlines()[2]
+    assert row.endswith("...") and len(row.split("|")[2]) == tool_output.MAX_TEXT_CHARS
+
+
+def test_verdict():
+    verdict = {"verified": False, "total_steps": 4, "checked_steps": 1, "issues": ["'Retro' not in calendar"], "cached": False}
+    assert encode_verdict(verdict) == "verified: n; steps 4 (+1 new)\n- 'Retro' not in calendar"
+
+
+def test_render_only_serializes_sampled_calls(monkeypatch):
+    monkeypatch.setattr(tool_output, "stats", OutputStats())
+    dumps = []
+    real = json.dumps
+    monkeypatch.setattr(tool_output.json, "dumps", lambda *a, **k: dumps.append(1) or real(*a, **k))
+
+    monkeypatch.setattr(tool_output, "SAMPLE_RATE", 0.0)
+    assert render("t", {"a": 1}, lambda: "a=1") == "a=1"
+    assert dumps == []
+
+    monkeypatch.setattr(tool_output, "SAMPLE_RATE", 1.0)
+    render("t", {"a": 1}, lambda: "a=1")
+    report = tool_output.stats.report()["t"]
+    assert len(dumps) == 1
+    assert report["calls"] == 2 and report["sampled_calls"] == 1
+    assert report["json_tokens_per_result"] == count_tokens(real({"a": 1}))
+
+
+def test_json_mode_returns_the_result(monkeypatch):
+    monkeypatch.setattr(tool_output, "MODE", "json")
+    result = {"a": 1}
+    assert render("t", result, lambda: "unused") is result
@@ -0,0 +1,69 @@
+import asyncio
+import inspect
+import threading
+import time
+
+import pytest
+
+from tools import TOOLS, find_free_slots, run_in_pool
+
+
+def test_pooled_tool_runs_off_the_event_loop():
+    def whoami(name: str) -> str:
+        return f"{name}@{threading.current_thread().name}"
+
+    async def main():
+        return await run_in_pool(whoami)("lookup")
+
+    assert asyncio.run(main()).startswith("lookup@doable-tool")
+
+
+def test_slow_tools_do_not_block_each_other_or_the_loop():
+    def slow():
+        time.sleep(0.1)
+        return "done"
+
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.01)
+
+    async def main():
+        tick = asyncio.create_task(ticker())
+        started = time.perf_counter()
+        results = await asyncio.gather(*(run_in_pool(slow)() for _ in range(4)))
+        elapsed = time.perf_counter() - started
+        tick.cancel()
+        return results, elapsed
+
+    results, elapsed = asyncio.run(main())
+    assert results == ["done"] * 4
+    assert elapsed < 0.3
+    assert ticks >= 5
+
+
+def test_pooled_tool_keeps_its_schema():
+    pooled = run_in_pool(find_free_slots)
+    assert inspect.iscoroutinefunction(pooled)
+    assert pooled.__name__ == "find_free_slots"
+    assert pooled.__doc__ == find_free_slots.__doc__
+    assert inspect.signature(pooled) == inspect.signature(find_free_slots)
+    assert all(inspect.iscoroutinefunction(tool) for tool in TOOLS)
+
+
+def test_coroutine_tools_are_returned_unchanged():
+    async def already_async():
+        return 1
+
+    assert run_in_pool(already_async) is already_async
+
+
+def test_pooled_tool_raises_the_tools_error():
+    def broken():
+        raise ValueError("bad start time")
+
+    with pytest.raises(ValueError, match="bad start time"):
+        asyncio.run(run_in_pool(broken)())
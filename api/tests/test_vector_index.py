@@ -0,0 +1,118 @@
+import asyncio
+from types import SimpleNamespace
+
+import numpy as np
+
+import vector_index
+from vector_index import VectorIndex, backfill_memories, memory_item
+
+TOPICS = ["garden tomatoes compost", "python asyncio sqlite", "marathon training plan", "french cooking butter"]
+
+
+def items(count: int, user: str, kind: str = "memory", offset: int = 0) -> list[dict]:
+    return [
+        {"key": f"{user}:{i}", "text": f"{TOPICS[i % len(TOPICS)]} note {i}", "kind": kind, "user_id": user}
+        for i in range(offset, offset + count)
+    ]
+
+
+def test_search_finds_the_closest_item(tmp_path):
+    index = VectorIndex(str(tmp_path), lists=4)
+    index.upsert(items(8, "u"))
+    results = index.search("asyncio sqlite in python", limit=2, user_id="u")
+    assert "asyncio" in results[0]["text"]
+    assert index.search("anything", user_id="nobody") == []
+
+
+def test_kind_and_user_filters(tmp_path):
+    index = VectorIndex(str(tmp_path), lists=4)
+    index.upsert(items(8, "u") + items(8, "u", kind="task", offset=8) + items(8, "other"))
+    results = index.search("marathon training", limit=20, user_id="u", kinds=["task"])
+    assert results and all(r["kind"] == "task" and r["user_id"] == "u" for r in results)
+
+
+def test_small_user_is_searched_exactly_after_training(tmp_path, monkeypatch):
+    index = VectorIndex(str(tmp_path), lists=4, probes=1)
+    index.upsert(items(4 * vector_index.TRAIN_PER_LIST, "big"))
+    assert index.stats()["trained"]
+    index.upsert(items(3, "small"))
+
+    probed = []
+    monkeypatch.setattr(index, "_candidates", lambda query, probes: probed.append(probes))
+    results = index.search("french cooking", limit=5, user_id="small")
+    assert probed == []
+    assert {r["key"] for r in results} == {"small:0", "small:1", "small:2"}
+
+
+def test_filtered_search_never_probes_every_list(tmp_path, monkeypatch):
+    monkeypatch.setattr(vector_index, "MAX_PROBE_FACTOR", 4)
+    index = VectorIndex(str(tmp_path), lists=64, probes=1)
+    index.upsert(items(64 * vector_index.TRAIN_PER_LIST, "big"))
+    assert index.stats()["trained"]
+
+    original = index._candidates
+    probed = []
+
+    def candidates(query, probes):
+        probed.append(probes)
+        return original(query, probes)
+
+    monkeypatch.setattr(index, "_candidates", candidates)
+    index.search("garden", limit=5, kinds=["no-such-kind"])
+    assert max(probed) == 4
+
+
+def test_contains_compares_text(tmp_path):
+    index = VectorIndex(str(tmp_path), lists=4)
+    index.upsert(items(2, "u"))
+    stored = items(2, "u")
+    stored[1]["text"] = "changed"
+    assert index.contains(stored + items(1, "u", offset=5)) == {"u:0"}
+
+
+class FakeMemoryDb:
+    memory_table_name = "agno_memories"
+
+    def __init__(self, memories, exists=True):
+        self.memories = memories
+        self.exists = exists
+        self.reads = 0
+
+    async def table_exists(self, name):
+        return self.exists
+
+    async def get_user_memories(self, limit, page):
+        self.reads += 1
+        return self.memories[(page - 1) * limit : page * limit]
+
+
+def memory(memory_id: str, text: str) -> SimpleNamespace:
+    return SimpleNamespace(memory_id=memory_id, memory=text, user_id="u")
+
+
+def test_backfill_skips_indexed_memories(tmp_path, monkeypatch):
+    index = VectorIndex(str(tmp_path), lists=4)
+    monkeypatch.setattr(vector_index, "get_index", lambda: index)
+    memories = [memory(str(i), f"memory number {i}") for i in range(5)]
+    index.upsert([memory_item(m) for m in memories[:3]])
+
+    embedded = []
+    embed = index.embed
+    monkeypatch.setattr(index, "embed", lambda texts: embedded.extend(texts) or embed(texts))
+    assert asyncio.run(backfill_memories(FakeMemoryDb(memories), page_size=2)) == 2
+    assert embedded == ["memory number 3", "memory number 4"]
+    assert asyncio.run(backfill_memories(FakeMemoryDb(memories), page_size=2)) == 0
+
+
+def test_backfill_on_a_fresh_database(tmp_path, monkeypatch):
+    monkeypatch.setattr(vector_index, "get_index", lambda: VectorIndex(str(tmp_path), lists=4))
+    db = FakeMemoryDb([], exists=False)
+    assert asyncio.run(backfill_memories(db)) == 0
+    assert db.reads == 0
+
+
+def test_index_defaults_next_to_the_database(monkeypatch, tmp_path):
+    monkeypatch.setenv("DOABLE_DB_FILE", str(tmp_path / "doable.db"))
+    monkeypatch.delenv("DOABLE_VECTOR_DIR")
+    VectorIndex.from_env()
+    assert (tmp_path / "vectors" / "index.db").exists()
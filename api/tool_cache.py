@@ -0,0 +1,124 @@
+import functools
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from calendar_store import calendar_store
+
+# Memoization for read-only calendar tools. An agent run tends to ask for the
+# same events or free slots several times; repeats are answered from here.
+#
+# Entries are keyed on the call's arguments and remember the calendar version
+# they were computed at. Any calendar write (local, or another process's
+# picked up by `calendar_store.refresh()`) drops every entry, and a result
+# computed while a write happened is not stored. Cached results are shared
+# between callers and must be treated as read-only.
+
+ENABLED = os.getenv("DOABLE_TOOL_CACHE", "1") != "0"
+
+
+class ToolCache:
+    """LRU + TTL cache of one tool's results."""
+
+    def __init__(self, name: str, ttl_seconds: float, max_entries: int):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, tuple[float, int, object]]" = OrderedDict()
+
+    def get(self, key: str, version: int) -> tuple[bool, object]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[0] <= now or entry[1] != version):
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[2]
+
+    def put(self, key: str, value, version: int):
+        with self._lock:
+            if version != calendar_store.version:
+                # The calendar changed while the result was computed.
+                return
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self):
+        with self._lock:
+            if self._entries:
+                self.invalidations += 1
+                self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "ttl_seconds": self.ttl_seconds,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "evictions": self.evictions,
+        }
+
+
+_caches: dict[str, ToolCache] = {}
+
+
+def cached_tool(ttl_seconds: float = 60.0, max_entries: int = 256):
+    """Memoizes a read-only calendar helper.
+
+    Args:
+        ttl_seconds (float): How long a result stays valid if the calendar does not change.
+        max_entries (int): Results kept, least recently used first out.
+    """
+
+    def decorate(func):
+        if not ENABLED:
+            return func
+        cache = _caches[func.__name__] = ToolCache(func.__name__, ttl_seconds, max_entries)
+
+        @functools.wraps(func)
+        def memoized(*args, **kwargs):
+            calendar_store.refresh()
+            version = calendar_store.version
+            key = json.dumps([args, kwargs], sort_keys=True, default=str)
+            hit, value = cache.get(key, version)
+            if hit:
+                return value
+            value = func(*args, **kwargs)
+            cache.put(key, value, version)
+            return value
+
+        memoized.cache = cache
+        return memoized
+
+    return decorate
+
+
+def invalidate_all():
+    for cache in _caches.values():
+        cache.invalidate()
+
+
+def all_stats() -> dict:
+    return {name: cache.stats() for name, cache in _caches.items()}
+
+
+calendar_store.subscribe(invalidate_all)
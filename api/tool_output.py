@@ -0,0 +1,211 @@
+import json
+import os
+import random
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional
+
+from calendar_store import parse_time
+from context import CHARS_PER_TOKEN
+
+# Compact encodings of agent tool results.
+#
+# Tool results go into the model context on every later turn of a run, so
+# the agent tools return short text tables instead of JSON: column names
+# appear once, times are "d<offset> HH:MM" relative to a day given in the
+# header, and a result stops at a per-call token budget with a cursor telling
+# the model how to get the rest. The MCP tools keep returning JSON for
+# programs. `report()` compares the tokens sent with what the JSON would
+# have cost, measured on a sample of calls so the JSON is not built each time.
+
+MODE = os.getenv("DOABLE_TOOL_OUTPUT", "compact")
+TOKEN_BUDGET = int(os.getenv("DOABLE_TOOL_OUTPUT_TOKENS", "600"))
+# Share of calls whose JSON size is measured for `report()`; 1 measures every call.
+SAMPLE_RATE = float(os.getenv("DOABLE_TOOL_OUTPUT_SAMPLE", "0.01"))
+# Longest memory/task text shown per search result.
+MAX_TEXT_CHARS = 160
+
+
+def count_tokens(text: str) -> int:
+    """Rough token count (about four characters per token), as in context.py."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+class RelativeClock:
+    """Formats timestamps as day offsets from a reference day, e.g. "d+1 09:30"."""
+
+    def __init__(self, now: Optional[datetime] = None):
+        now = (now or datetime.now(timezone.utc)).astimezone(timezone.utc)
+        self.day0 = now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    @property
+    def legend(self) -> str:
+        return f"times UTC, d0={self.day0.date().isoformat()}"
+
+    def __call__(self, value: str | float) -> str:
+        moment = parse_time(value) if isinstance(value, str) else datetime.fromtimestamp(value, timezone.utc)
+        moment = moment.astimezone(timezone.utc)
+        days = (moment - self.day0) // timedelta(days=1)
+        clock = moment.strftime("%H:%M:%S" if moment.second else "%H:%M")
+        return f"d{days:+d} {clock}" if days else f"d0 {clock}"
+
+
+def _cell(value) -> str:
+    if value is None:
+        return "-"
+    if isinstance(value, bool):
+        return "y" if value else "n"
+    return str(value).replace("|", "/").replace("\n", " / ")
+
+
+def table(header: list[str], columns: list[str], rows: list[list], budget: int) -> tuple[list[str], int]:
+    """Header lines, a column line and as many rows as fit in `budget` tokens.
+
+    Returns:
+        tuple[list[str], int]: The lines and how many rows made it in.
+    """
+    lines = header + ["|".join(columns)]
+    used = sum(count_tokens(line) for line in lines)
+    shown = 0
+    for row in rows:
+        line = "|".join(_cell(value) for value in row)
+        used += count_tokens(line)
+        if used > budget and shown:
+            break
+        lines.append(line)
+        shown += 1
+    return lines, shown
+
+
+def encode_events(page: dict, offset: int = 0, budget: int = TOKEN_BUDGET) -> str:
+    """Encodes a `calendar_page` result."""
+    total = page["total"]
+    if not page["events"]:
+        return f"no events (total {total})"
+    clock = RelativeClock()
+    rows = [[e["id"], e["event"], clock(e["time"]), e["duration_minutes"]] for e in page["events"]]
+    lines, shown = table([], ["id", "event", "start", "min"], rows, budget)
+    lines.insert(0, f"events {offset + 1}-{offset + shown} of {total}; {clock.legend}")
+    next_offset = offset + shown if shown < len(rows) else page["next_offset"]
+    if next_offset is not None:
+        lines.append(f"more: call again with offset={next_offset}")
+    return "\n".join(lines)
+
+
+def encode_slots(slots: list[dict], budget: int = TOKEN_BUDGET) -> str:
+    """Encodes a `free_time` result."""
+    if not slots:
+        return "no free slots"
+    clock = RelativeClock()
+    rows = [[clock(s["start"]), clock(s["end"]), s["minutes"]] for s in slots]
+    lines, shown = table([f"free slots {len(slots)}; {clock.legend}"], ["start", "end", "min"], rows, budget)
+    if shown < len(slots):
+        lines.append(f"more: {len(slots) - shown} not shown; call again with start={slots[shown - 1]['end']}")
+    return "\n".join(lines)
+
+
+def encode_plan(result: dict, start: str, offset: int = 0, budget: int = TOKEN_BUDGET) -> str:
+    """Encodes a `plan_tasks` result, blocks from `offset` on.
+
+    Args:
+        result (dict): The plan.
+        start (str): Window start the plan was made for; the same tasks and start give the same plan again.
+        offset (int): First block shown.
+        budget (int): Token budget.
+    """
+    clock = RelativeClock()
+    scheduled, unscheduled = result["scheduled"], result["unscheduled"]
+    rows = [[b["title"], clock(b["start"]), b["duration_minutes"], b["priority"], b["late"]] for b in scheduled[offset:]]
+    lines, shown = table([], ["title", "start", "min", "prio", "late"], rows, budget - budget // 4)
+    lines.insert(
+        0,
+        f"plan: {len(scheduled)} scheduled, {len(unscheduled)} unscheduled, score {result['score']}, "
+        f"committed {_cell(result.get('committed'))}; blocks {offset + 1}-{offset + shown}; {clock.legend}",
+    )
+    if shown < len(rows):
+        if result.get("committed"):
+            lines.append(f"more: {len(rows) - shown} blocks not shown; they are booked, list them with get_calendar_events")
+        else:
+            lines.append(f"more: call again with the same tasks, start={start}, offset={offset + shown}")
+    if unscheduled:
+        reasons = sorted({item["reason"] for item in unscheduled})
+        titles = ", ".join(item["title"] for item in unscheduled)
+        text = f"unscheduled: {titles} ({'; '.join(reasons)})"
+        lines.append(text[: (budget // 4) * CHARS_PER_TOKEN])
+    return "\n".join(lines)
+
+
+def encode_search(results: list[dict], budget: int = TOKEN_BUDGET) -> str:
+    """Encodes a vector index search result."""
+    if not results:
+        return "no matches"
+    rows = []
+    for item in results:
+        text = " ".join(item["text"].split())
+        if len(text) > MAX_TEXT_CHARS:
+            text = text[: MAX_TEXT_CHARS - 3] + "..."
+        rows.append([item["score"], item["kind"], text])
+    lines, shown = table([f"matches {len(results)}"], ["score", "kind", "text"], rows, budget)
+    if shown < len(rows):
+        lines.append(f"more: {len(rows) - shown} lower-scored matches not shown")
+    return "\n".join(lines)
+
+
+def encode_verdict(verdict: dict) -> str:
+    """Encodes a `ReflectionStore.verify` verdict."""
+    line = (
+        f"verified: {_cell(verdict['verified'])}; steps {verdict['total_steps']} "
+        f"(+{verdict['checked_steps']} new)" + ("; cached" if verdict.get("cached") else "")
+    )
+    return "\n".join([line] + [f"- {issue}" for issue in verdict["issues"]])
+
+
+class OutputStats:
+    """Tokens per result, encoded vs. what the JSON result would have cost.
+
+    Every call counts towards `tokens_per_result`; the JSON comparison only
+    covers the sampled calls.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # tool -> [calls, encoded tokens, sampled calls, their JSON tokens, their encoded tokens]
+        self._tools: dict[str, list[int]] = {}
+
+    def record(self, tool: str, encoded_tokens: int, json_tokens: Optional[int] = None):
+        with self._lock:
+            totals = self._tools.setdefault(tool, [0, 0, 0, 0, 0])
+            totals[0] += 1
+            totals[1] += encoded_tokens
+            if json_tokens is not None:
+                totals[2] += 1
+                totals[3] += json_tokens
+                totals[4] += encoded_tokens
+
+    def report(self) -> dict:
+        with self._lock:
+            return {
+                tool: {
+                    "calls": calls,
+                    "tokens_per_result": round(encoded / calls, 1),
+                    "sampled_calls": sampled,
+                    "json_tokens_per_result": round(sampled_json / sampled, 1) if sampled else None,
+                    "saved": round(1 - sampled_encoded / sampled_json, 3) if sampled_json else None,
+                }
+                for tool, (calls, encoded, sampled, sampled_json, sampled_encoded) in self._tools.items()
+            }
+
+
+stats = OutputStats()
+
+
+def render(tool: str, result, encode: Callable[[], str]):
+    """Returns the compact encoding of a tool result (or the result itself in "json" mode) and records its size."""
+    if MODE == "json":
+        return result
+    text = encode()
+    json_tokens = None
+    if SAMPLE_RATE > 0 and random.random() < SAMPLE_RATE:
+        json_tokens = count_tokens(json.dumps(result, default=str))
+    stats.record(tool, count_tokens(text), json_tokens)
+    return text
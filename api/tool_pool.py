@@ -0,0 +1,30 @@
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from inspect import iscoroutinefunction
+
+# Sync tools run on this bounded pool so a slow lookup never blocks the event
+# loop serving every other request. Async tools are awaited as they are.
+# Kept apart from tools.py so the MCP server can wrap its tools without
+# importing agno or opening the stores.
+TOOL_POOL = ThreadPoolExecutor(
+    max_workers=int(os.getenv("DOABLE_TOOL_THREADS", "8")),
+    thread_name_prefix="doable-tool",
+)
+
+
+def run_in_pool(func):
+    """Turns a sync tool into an async one executed on `TOOL_POOL`.
+
+    The signature and docstring are kept, so agno and FastMCP derive the same
+    tool schema. Coroutine functions are returned unchanged.
+    """
+    if iscoroutinefunction(func):
+        return func
+
+    @functools.wraps(func)
+    async def pooled(*args, **kwargs):
+        return await asyncio.get_running_loop().run_in_executor(TOOL_POOL, functools.partial(func, *args, **kwargs))
+
+    return pooled
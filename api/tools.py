@@ -0,0 +1,205 @@
+from datetime import datetime, timedelta, timezone
+
+from agno.run import RunContext
+from calendar_store import DEFAULT_USER, calendar_store, parse_time, slot_to_dict
+from scheduler import DEFAULT_WORKDAYS, plan
+from tool_cache import cached_tool
+from tool_output import encode_events, encode_plan, encode_search, encode_slots, encode_verdict, render
+from tool_pool import TOOL_POOL, run_in_pool
+
+# Calendar tools are backed by `calendar_store` (SQLite + in-memory index).
+# The plain helpers take an explicit user and are shared with the MCP server;
+# the agent tools resolve the user from the run context. Read-only helpers are
+# memoized until the calendar changes (see tool_cache.py). Agent tools return
+# compact text tables rather than JSON (see tool_output.py). Sync tools run on
+# `TOOL_POOL` (see tool_pool.py).
+
+
+def _user_id(run_context: RunContext | None) -> str:
+    return (run_context.user_id if run_context else None) or DEFAULT_USER
+
+
+def book_meeting(user_id: str, event_name: str, start_time: str, duration_minutes: int = 30) -> str:
+    start = parse_time(start_time)
+    clashes = calendar_store.conflicts(start, start + timedelta(minutes=duration_minutes), user_id)
+    calendar_store.add_event(event_name, start, duration_minutes, user_id)
+    message = f"Meeting '{event_name}' scheduled for {start_time} (Duration: {duration_minutes} mins)."
+    if clashes:
+        message += " Note: overlaps with " + ", ".join(f"'{event.title}'" for event in clashes) + "."
+    return message
+
+
+@cached_tool(ttl_seconds=60, max_entries=512)
+def calendar_page(
+    user_id: str,
+    start: str | None = None,
+    end: str | None = None,
+    limit: int = 20,
+    offset: int = 0,
+) -> dict:
+    return calendar_store.list_events(
+        user_id,
+        start=parse_time(start) if start else None,
+        end=parse_time(end) if end else None,
+        limit=limit,
+        offset=offset,
+    )
+
+
+@cached_tool(ttl_seconds=60, max_entries=256)
+def free_time(user_id: str, start: str, end: str, min_minutes: int = 30) -> list[dict]:
+    slots = calendar_store.free_slots(parse_time(start), parse_time(end), min_minutes, user_id)
+    return [slot_to_dict(slot) for slot in slots]
+
+
+def plan_tasks(
+    user_id: str,
+    tasks: list[dict],
+    start: str | None = None,
+    days: int = 7,
+    working_hours: str = "09:00-17:00",
+    tz: str = "UTC",
+    mode: str = "greedy",
+    commit: bool = False,
+    workdays: str = DEFAULT_WORKDAYS,
+) -> dict:
+    window_start = parse_time(start) if start else datetime.now(timezone.utc)
+    window_end = window_start + timedelta(days=days)
+    busy = [(e.start_ts, e.end_ts) for e in calendar_store.conflicts(window_start, window_end, user_id)]
+    result = plan(tasks, window_start, window_end, busy, working_hours, tz, mode, workdays=workdays)
+    if commit:
+        for block in result["scheduled"]:
+            calendar_store.add_event(block["title"], parse_time(block["start"]), block["duration_minutes"], user_id)
+    result["committed"] = commit
+    return result
+
+
+def schedule_meeting(
+    event_name: str,
+    start_time: str,
+    duration_minutes: int = 30,
+    run_context: RunContext | None = None,
+):
+    """Schedules a meeting in the calendar.
+    Args:
+        event_name (str): Name of the event.
+        start_time (str): Start time of the event (ISO format).
+        duration_minutes (int): Duration in minutes.
+    """
+    return book_meeting(_user_id(run_context), event_name, start_time, duration_minutes)
+
+
+def get_calendar_events(
+    start: str | None = None,
+    end: str | None = None,
+    limit: int = 20,
+    offset: int = 0,
+    run_context: RunContext | None = None,
+):
+    """Retrieves calendar events, optionally only those starting in [start, end).
+    Args:
+        start (str): Range start (ISO format). Omit for no lower bound.
+        end (str): Range end (ISO format). Omit for no upper bound.
+        limit (int): Maximum number of events to return.
+        offset (int): Pass the offset from the "more:" line to fetch the next page.
+    """
+    page = calendar_page(_user_id(run_context), start, end, limit, offset)
+    return render("get_calendar_events", page, lambda: encode_events(page, offset))
+
+
+def find_free_slots(
+    start: str,
+    end: str,
+    min_minutes: int = 30,
+    run_context: RunContext | None = None,
+):
+    """Finds free time between calendar events.
+    Args:
+        start (str): Start of the search window (ISO format).
+        end (str): End of the search window (ISO format).
+        min_minutes (int): Minimum length of a free slot in minutes.
+    """
+    slots = free_time(_user_id(run_context), start, end, min_minutes)
+    return render("find_free_slots", slots, lambda: encode_slots(slots))
+
+
+def plan_schedule(
+    tasks: list[dict],
+    start: str | None = None,
+    days: int = 7,
+    working_hours: str = "09:00-17:00",
+    timezone_name: str = "UTC",
+    mode: str = "greedy",
+    commit: bool = False,
+    offset: int = 0,
+    workdays: str = DEFAULT_WORKDAYS,
+    run_context: RunContext | None = None,
+):
+    """Plans many tasks into free calendar time in one call.
+    Args:
+        tasks (list[dict]): Tasks with `title`, and optionally `effortEstimateMins`, `priority` (1-5, 5 is highest) and `dueDate` (ISO format).
+        start (str): Start of the planning window (ISO format). Defaults to now.
+        days (int): Length of the planning window in days.
+        working_hours (str): Daily working hours as "HH:MM-HH:MM".
+        timezone_name (str): IANA time zone of the working hours, e.g. "Europe/Berlin".
+        mode (str): "greedy" for a fast first-fit plan, "optimize" to search for a better ordering.
+        commit (bool): If true, the planned blocks are added to the calendar.
+        offset (int): Pass the offset from the "more:" line (with the same tasks and start) to see the rest of the plan.
+        workdays (str): Days the user works, e.g. "mon-fri", "sun-thu" or "mon,wed,fri".
+    """
+    # A fixed start makes the plan repeatable, so the "more:" cursor can page through it.
+    # Paging only shows more of a plan; it never books it a second time.
+    start = start or datetime.now(timezone.utc).replace(second=0, microsecond=0).isoformat()
+    commit = commit and not offset
+    result = plan_tasks(_user_id(run_context), tasks, start, days, working_hours, timezone_name, mode, commit, workdays)
+    return render("plan_schedule", result, lambda: encode_plan(result, start, offset))
+
+
+def search_memory(
+    query: str,
+    limit: int = 5,
+    kinds: list[str] | None = None,
+    run_context: RunContext | None = None,
+):
+    """Searches the user's saved memories and tasks for entries related to the query.
+    Args:
+        query (str): What to look for, in natural language.
+        limit (int): Maximum number of results.
+        kinds (list[str]): Restrict to "memory" and/or "task". Omit for both.
+    """
+    from vector_index import get_index
+
+    results = get_index().search(query, limit, _user_id(run_context), kinds)
+    return render("search_memory", results, lambda: encode_search(results))
+
+
+def verify_task_completion(
+    task_description: str,
+    steps_taken: list[str],
+    run_context: RunContext | None = None,
+):
+    """Self-reflection tool to verify if all steps of a task were completed.
+    Steps claiming a meeting was scheduled are checked against the calendar.
+    Args:
+        task_description (str): The initial task; use the same text on every check of it.
+        steps_taken (list[str]): The steps performed since the last check of this task; earlier ones are remembered.
+    """
+    from reflection import reflection_store
+
+    verdict = reflection_store.verify(task_description, steps_taken, _user_id(run_context))
+    return render("verify_task_completion", verdict, lambda: encode_verdict(verdict))
+
+
+# Everything the assistant can call, in the order it is offered to the model.
+# agno runs the tool calls of one model turn concurrently.
+TOOLS = [
+    run_in_pool(tool)
+    for tool in (
+        schedule_meeting,
+        get_calendar_events,
+        find_free_slots,
+        plan_schedule,
+        search_memory,
+        verify_task_completion,
+    )
+]
@@ -0,0 +1,464 @@
+import asyncio
+import functools
+import os
+import sqlite3
+import threading
+from typing import Callable, Iterable, Optional, Sequence
+
+import numpy as np
+
+from response_cache import hashing_embedder
+from storage import apply_sqlite_pragmas
+
+# Local vector index for retrieval over memories and tasks.
+#
+# Vectors live in a memory-mapped float32 matrix (`vectors.f32`), one row per
+# slot; keys, owners and text live in SQLite next to it. Up to
+# `lists * TRAIN_PER_LIST` items, search is a flat scan. Past that an IVF
+# structure is trained: spherical k-means centroids split the rows into
+# `lists` inverted lists and a query only scans the `probes` lists nearest to
+# it. Inserts are assigned to their nearest centroid and deletes drop the row
+# from its list, so the index stays incremental; `rebuild` retrains it.
+# Searches for one user's items scan only that user's rows when they are
+# fewer than a probe would touch.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS doable_vectors (
+    slot INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    user_id TEXT,
+    kind TEXT NOT NULL,
+    text TEXT NOT NULL,
+    list INTEGER NOT NULL DEFAULT -1
+);
+"""
+
+DIMENSIONS = 256
+# Items per inverted list at which the IVF structure is trained.
+TRAIN_PER_LIST = 32
+KMEANS_ITERATIONS = 8
+# Rows assigned to centroids per matrix product while training.
+ASSIGN_CHUNK = 65536
+# How far a filtered search may widen its probe before settling for fewer results.
+MAX_PROBE_FACTOR = 16
+
+
+def _unit(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32)
+
+
+class VectorIndex:
+    """On-disk vector index with incremental inserts and deletes.
+
+    Like `CalendarStore`, SQLite is the source of truth for what is indexed;
+    changes made by other processes are picked up through `PRAGMA
+    data_version`, which reloads the in-memory lists.
+
+    Args:
+        directory (str): Where `vectors.f32`, `centroids.npy` and `index.db` are kept.
+        embedder (Callable[[str], Sequence[float]]): Text embedder producing `dimensions` values.
+        dimensions (int): Vector size.
+        lists (int): Number of inverted lists once the index is trained.
+        probes (int): Lists scanned per query.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        embedder: Callable[[str], Sequence[float]] = hashing_embedder,
+        dimensions: int = DIMENSIONS,
+        lists: int = 1024,
+        probes: int = 8,
+    ):
+        self.directory = directory
+        self.embedder = embedder
+        self.dimensions = dimensions
+        self.lists = lists
+        self.probes = probes
+        os.makedirs(directory, exist_ok=True)
+        self._vectors_file = os.path.join(directory, "vectors.f32")
+        self._centroids_file = os.path.join(directory, "centroids.npy")
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(os.path.join(directory, "index.db"), check_same_thread=False, timeout=30)
+        apply_sqlite_pragmas(self._conn)
+        self._conn.executescript(SCHEMA)
+        self._load()
+
+    @classmethod
+    def from_env(cls) -> "VectorIndex":
+        """Builds an index from the DOABLE_VECTOR_* environment variables.
+
+        DOABLE_VECTOR_DIR defaults to a `vectors` directory next to DOABLE_DB_FILE.
+        """
+        data_dir = os.path.dirname(os.path.abspath(os.getenv("DOABLE_DB_FILE", "my_os.db")))
+        return cls(
+            os.getenv("DOABLE_VECTOR_DIR", os.path.join(data_dir, "vectors")),
+            lists=int(os.getenv("DOABLE_VECTOR_LISTS", "1024")),
+            probes=int(os.getenv("DOABLE_VECTOR_PROBES", "8")),
+        )
+
+    # -- in-memory state ---------------------------------------------------
+
+    def _load(self):
+        self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        self._centroids = np.load(self._centroids_file) if os.path.exists(self._centroids_file) else None
+        rows = self._conn.execute("SELECT slot, user_id, kind, list FROM doable_vectors").fetchall()
+        self._capacity = 0
+        self._vectors = None
+        self._alive = np.zeros(0, dtype=bool)
+        self._owner = np.zeros(0, dtype=np.int32)
+        self._kind = np.zeros(0, dtype=np.int32)
+        self._list = np.zeros(0, dtype=np.int32)
+        self._codes: dict[Optional[str], int] = {}
+        self._members: dict[int, set[int]] = {}
+        self._member_arrays: dict[int, np.ndarray] = {}
+        # Slots per owner code, so a user's items can be scanned without the rest.
+        self._owned: dict[int, set[int]] = {}
+        self._owned_arrays: dict[int, np.ndarray] = {}
+        self._reserve(max((slot for slot, _, _, _ in rows), default=-1) + 1)
+        for slot, user_id, kind, list_id in rows:
+            self._place(slot, user_id, kind, list_id)
+
+    def _code(self, value: Optional[str]) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self._codes)
+        return code
+
+    def _reserve(self, rows: int):
+        """Makes the vector file and the per-slot arrays hold at least `rows` slots."""
+        on_disk = os.path.getsize(self._vectors_file) // (4 * self.dimensions) if os.path.exists(self._vectors_file) else 0
+        capacity = max(on_disk, self._capacity)
+        if rows > capacity:
+            capacity = max(rows, 2 * capacity, 1024)
+            with open(self._vectors_file, "ab") as handle:
+                handle.truncate(capacity * 4 * self.dimensions)
+        if capacity != self._capacity or self._vectors is None:
+            if capacity:
+                self._vectors = np.memmap(self._vectors_file, dtype=np.float32, mode="r+", shape=(capacity, self.dimensions))
+            grow = capacity - self._capacity
+            self._alive = np.concatenate([self._alive, np.zeros(grow, dtype=bool)])
+            self._owner = np.concatenate([self._owner, np.zeros(grow, dtype=np.int32)])
+            self._kind = np.concatenate([self._kind, np.zeros(grow, dtype=np.int32)])
+            self._list = np.concatenate([self._list, np.full(grow, -1, dtype=np.int32)])
+            self._capacity = capacity
+
+    def _place(self, slot: int, user_id: Optional[str], kind: str, list_id: int):
+        self._unplace(slot)
+        self._alive[slot] = True
+        owner = self._owner[slot] = self._code(user_id)
+        self._kind[slot] = self._code(kind)
+        self._list[slot] = list_id
+        self._members.setdefault(list_id, set()).add(slot)
+        self._member_arrays.pop(list_id, None)
+        self._owned.setdefault(owner, set()).add(slot)
+        self._owned_arrays.pop(owner, None)
+
+    def _unplace(self, slot: int):
+        if self._alive[slot]:
+            list_id = int(self._list[slot])
+            self._members[list_id].discard(slot)
+            self._member_arrays.pop(list_id, None)
+            owner = int(self._owner[slot])
+            self._owned[owner].discard(slot)
+            self._owned_arrays.pop(owner, None)
+            self._alive[slot] = False
+
+    def _members_of(self, list_id: int) -> np.ndarray:
+        members = self._member_arrays.get(list_id)
+        if members is None:
+            members = self._member_arrays[list_id] = np.fromiter(self._members.get(list_id, ()), dtype=np.int64)
+        return members
+
+    def _owned_by(self, owner: int) -> np.ndarray:
+        owned = self._owned_arrays.get(owner)
+        if owned is None:
+            owned = self._owned_arrays[owner] = np.fromiter(self._owned.get(owner, ()), dtype=np.int64)
+        return owned
+
+    def contains(self, items: Iterable[dict]) -> set[str]:
+        """Keys of the given items that are indexed with exactly the same text."""
+        items = list(items)
+        found = set()
+        with self._lock:
+            for start in range(0, len(items), 500):
+                chunk = items[start : start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                stored = dict(
+                    self._conn.execute(
+                        f"SELECT key, text FROM doable_vectors WHERE key IN ({placeholders})", [item["key"] for item in chunk]
+                    )
+                )
+                found.update(item["key"] for item in chunk if stored.get(item["key"]) == item["text"])
+        return found
+
+    def _sync(self):
+        """Reloads if another connection changed the index."""
+        if self._conn.execute("PRAGMA data_version").fetchone()[0] != self._data_version:
+            self._load()
+
+    # -- writes --------------------------------------------------------------
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        return _unit(np.array([self.embedder(text) for text in texts], dtype=np.float32).reshape(len(texts), -1))
+
+    def upsert(self, items: Iterable[dict]) -> int:
+        """Adds or replaces items, each with `key`, `text`, `kind` and optionally `user_id`."""
+        items = list(items)
+        if not items:
+            return 0
+        return self.add(items, self.embed([item["text"] for item in items]))
+
+    def add(self, items: list[dict], vectors: np.ndarray) -> int:
+        """Adds or replaces items with precomputed vectors (one row per item)."""
+        if not items:
+            return 0
+        vectors = _unit(np.asarray(vectors, dtype=np.float32))
+        with self._lock:
+            self._sync()
+            list_ids = self._nearest(vectors) if self._centroids is not None else np.full(len(items), -1)
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                slots = [
+                    self._conn.execute(
+                        "INSERT INTO doable_vectors (key, user_id, kind, text, list) VALUES (?, ?, ?, ?, ?) "
+                        "ON CONFLICT(key) DO UPDATE SET user_id = excluded.user_id, kind = excluded.kind, "
+                        "text = excluded.text, list = excluded.list RETURNING slot",
+                        (item["key"], item.get("user_id"), item["kind"], item["text"], int(list_id)),
+                    ).fetchone()[0]
+                    for item, list_id in zip(items, list_ids)
+                ]
+                self._reserve(max(slots) + 1)
+                self._vectors[slots] = vectors
+                self._vectors.flush()
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            for slot, item, list_id in zip(slots, items, list_ids):
+                self._place(slot, item.get("user_id"), item["kind"], int(list_id))
+            if self._centroids is None and int(self._alive.sum()) >= self.lists * TRAIN_PER_LIST:
+                self._train()
+        return len(items)
+
+    def remove(self, keys: Iterable[str]) -> int:
+        """Removes items by key; unknown keys are ignored."""
+        keys = list(keys)
+        removed = 0
+        with self._lock:
+            self._sync()
+            with self._conn:
+                for key in keys:
+                    row = self._conn.execute("DELETE FROM doable_vectors WHERE key = ? RETURNING slot", (key,)).fetchone()
+                    if row is not None:
+                        self._unplace(row[0])
+                        removed += 1
+        return removed
+
+    # -- IVF -----------------------------------------------------------------
+
+    def _nearest(self, vectors: np.ndarray) -> np.ndarray:
+        return np.argmax(vectors @ self._centroids.T, axis=1)
+
+    def _train(self):
+        alive = np.flatnonzero(self._alive)
+        rng = np.random.default_rng(0)
+        sample = np.sort(rng.choice(alive, min(len(alive), self.lists * TRAIN_PER_LIST), replace=False))
+        data = np.asarray(self._vectors[sample])
+        centroids = data[rng.choice(len(data), self.lists, replace=False)].copy()
+        for _ in range(KMEANS_ITERATIONS):
+            assignment = np.argmax(data @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, data)
+            filled = np.bincount(assignment, minlength=self.lists) > 0
+            centroids[filled] = _unit(sums[filled])
+        self._centroids = centroids
+        list_ids = np.concatenate(
+            [self._nearest(np.asarray(self._vectors[alive[i: i + ASSIGN_CHUNK]])) for i in range(0, len(alive), ASSIGN_CHUNK)]
+        )
+        with self._conn:
+            self._conn.executemany(
+                "UPDATE doable_vectors SET list = ? WHERE slot = ?",
+                zip(list_ids.tolist(), alive.tolist()),
+            )
+        np.save(self._centroids_file, centroids)
+        self._members = {}
+        self._member_arrays = {}
+        for slot, list_id in zip(alive.tolist(), list_ids.tolist()):
+            self._list[slot] = list_id
+            self._members.setdefault(list_id, set()).add(slot)
+
+    def rebuild(self):
+        """Retrains the centroids on the current items, e.g. after the index grew a lot."""
+        with self._lock:
+            self._sync()
+            if int(self._alive.sum()) >= self.lists:
+                self._train()
+
+    # -- reads ---------------------------------------------------------------
+
+    def _candidates(self, query: np.ndarray, probes: int) -> np.ndarray:
+        if self._centroids is None:
+            return np.flatnonzero(self._alive)
+        nearest = np.argpartition(-(self._centroids @ query), min(probes, self.lists) - 1)[:probes]
+        return np.concatenate([self._members_of(int(list_id)) for list_id in nearest])
+
+    def search(
+        self,
+        query: str,
+        limit: int = 5,
+        user_id: Optional[str] = None,
+        kinds: Optional[Sequence[str]] = None,
+    ) -> list[dict]:
+        """Returns the `limit` items closest to `query`, best first.
+
+        Args:
+            query (str): Text to search for.
+            limit (int): Number of results.
+            user_id (str): Only return this user's items.
+            kinds (Sequence[str]): Only return items of these kinds, e.g. ["memory", "task"].
+        """
+        vector = self.embed([query])[0]
+        with self._lock:
+            self._sync()
+            if user_id is not None and user_id not in self._codes:
+                return []
+            owner = self._codes[user_id] if user_id is not None else None
+            codes = [self._codes[kind] for kind in kinds if kind in self._codes] if kinds else None
+            owned = self._owned_by(owner) if owner is not None else None
+            # A user with no more items than one probe scans is searched exactly, through their items only.
+            scanned_per_probe = int(self._alive.sum()) * self.probes / self.lists
+            if owned is not None and (self._centroids is None or len(owned) <= scanned_per_probe):
+                candidates = owned
+                if codes is not None:
+                    candidates = candidates[np.isin(self._kind[candidates], codes)]
+            else:
+                probes = self.probes
+                widest = min(self.lists, self.probes * MAX_PROBE_FACTOR)
+                while True:
+                    candidates = self._candidates(vector, probes)
+                    if owner is not None:
+                        candidates = candidates[self._owner[candidates] == owner]
+                    if codes is not None:
+                        candidates = candidates[np.isin(self._kind[candidates], codes)]
+                    # Filters can leave the nearest lists short: widen the probe a few times, never to a full scan.
+                    if len(candidates) >= limit or self._centroids is None or probes >= widest:
+                        break
+                    probes = min(probes * 4, widest)
+            if not len(candidates):
+                return []
+            candidates.sort()
+            scores = self._vectors[candidates] @ vector
+            top = np.argpartition(-scores, min(limit, len(scores)) - 1)[:limit]
+            top = top[np.argsort(-scores[top])]
+            slots = candidates[top].tolist()
+            placeholders = ",".join("?" * len(slots))
+            rows = {
+                row[0]: row[1:]
+                for row in self._conn.execute(
+                    f"SELECT slot, key, kind, user_id, text FROM doable_vectors WHERE slot IN ({placeholders})", slots
+                )
+            }
+        return [
+            {"key": rows[slot][0], "kind": rows[slot][1], "user_id": rows[slot][2], "text": rows[slot][3], "score": round(float(score), 4)}
+            for slot, score in zip(slots, scores[top].tolist())
+            if slot in rows
+        ]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "items": int(self._alive.sum()),
+                "trained": self._centroids is not None,
+                "lists": self.lists if self._centroids is not None else 0,
+            }
+
+
+@functools.lru_cache(maxsize=None)
+def get_index() -> VectorIndex:
+    """Opens the shared index on first call."""
+    return VectorIndex.from_env()
+
+
+def memory_item(memory, memory_id: Optional[str] = None) -> dict:
+    memory_id = memory_id or memory.memory_id
+    return {"key": f"memory:{memory_id}", "text": memory.memory, "kind": "memory", "user_id": memory.user_id}
+
+
+def task_item(task: dict, user_id: Optional[str] = None) -> dict:
+    """Indexes a task shaped like the `Task` model by title, description, why and substeps."""
+    parts = [task.get("title", ""), task.get("description") or "", task.get("why") or ""]
+    parts += [step.get("title", "") for step in task.get("substeps") or []]
+    return {
+        "key": f"task:{task['_id']}",
+        "text": "\n".join(part for part in parts if part),
+        "kind": "task",
+        "user_id": task.get("userId") or user_id,
+    }
+
+
+def mirror_memories(db):
+    """Keeps the index in step with agno's user memories written through `db`."""
+    upsert = db.upsert_user_memory
+    delete = db.delete_user_memory
+    delete_many = db.delete_user_memories
+
+    async def in_thread(call, *args):
+        await asyncio.get_running_loop().run_in_executor(None, call, *args)
+
+    @functools.wraps(upsert)
+    async def upsert_user_memory(memory, *args, **kwargs):
+        result = await upsert(memory, *args, **kwargs)
+        # The DB may assign the id; the result carries it as an object or a dict.
+        memory_id = memory.memory_id
+        if result is not None:
+            memory_id = result.get("memory_id") if isinstance(result, dict) else result.memory_id
+        if memory_id:
+            await in_thread(get_index().upsert, [memory_item(memory, memory_id)])
+        return result
+
+    @functools.wraps(delete)
+    async def delete_user_memory(memory_id, *args, **kwargs):
+        result = await delete(memory_id, *args, **kwargs)
+        await in_thread(get_index().remove, [f"memory:{memory_id}"])
+        return result
+
+    @functools.wraps(delete_many)
+    async def delete_user_memories(memory_ids, *args, **kwargs):
+        result = await delete_many(memory_ids, *args, **kwargs)
+        await in_thread(get_index().remove, [f"memory:{memory_id}" for memory_id in memory_ids])
+        return result
+
+    db.upsert_user_memory = upsert_user_memory
+    db.delete_user_memory = delete_user_memory
+    db.delete_user_memories = delete_user_memories
+    return db
+
+
+async def backfill_memories(db, page_size: int = 500) -> int:
+    """Indexes memories stored in `db` that the index does not have yet (e.g. on first start).
+
+    Memories already indexed with the same text are not embedded again.
+
+    Returns:
+        int: Memories (re)indexed.
+    """
+    if not await db.table_exists(db.memory_table_name):
+        # Fresh database: agno creates the table with the first memory, which is mirrored anyway.
+        return 0
+    loop = asyncio.get_running_loop()
+    indexed = 0
+    page = 1
+    while True:
+        memories = await db.get_user_memories(limit=page_size, page=page)
+        if not memories:
+            return indexed
+        items = [memory_item(memory) for memory in memories if memory.memory_id]
+        known = await loop.run_in_executor(None, get_index().contains, items)
+        items = [item for item in items if item["key"] not in known]
+        indexed += await loop.run_in_executor(None, get_index().upsert, items)
+        if len(memories) < page_size:
+            return indexed
+        page += 1